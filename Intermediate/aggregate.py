@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import engine
+import importer
+
+# Headless aggregation of many saved workbooks (or CSV logs) into one report.
+# Every file is read by a worker process, which streams its history rows in
+# chunks and folds them into a Summary: outcome and choice counts, the choice
+# matrix, the time span and a streak summary. Summaries are mergeable, so
+# workers send back only a few small arrays per file and the parent adds them
+# up as they arrive. Files are grouped by the rule set their Statistics sheet
+# records (CSV logs use --rules).
+# Streaks are merged with the run at each end of a summary: two chunks of
+# the same session join their boundary runs (then), separate sessions never
+# do (add).
+
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "aggregate_results.json")
+
+
+class Summary:
+    def __init__(self, rules_name):
+        self.rules_name = rules_name  # a name, so summaries pickle without copying the rule set
+        size = self.rules.size
+        self.rounds = 0
+        self.skipped = 0
+        self.outcomes = np.zeros(3, dtype=np.int64)  # indexed by engine.DRAW/WIN/LOSE
+        self.players = np.zeros(size, dtype=np.int64)
+        self.computers = np.zeros(size, dtype=np.int64)
+        self.matrix = np.zeros((size, size), dtype=np.int64)  # [player][computer]
+        self.first_time = 0
+        self.last_time = 0
+        self.longest = np.zeros(3, dtype=np.int64)  # longest streak of each outcome
+        self.head = None  # (outcome, length) of the first run, for joining with the summary before
+        self.tail = None  # (outcome, length) of the last run, for joining with the summary after
+
+    @property
+    def rules(self):
+        return engine.RULESETS[self.rules_name]
+
+    # Function to summarize a chunk of rounds (importer.ImportedRounds)
+    @classmethod
+    def from_rounds(cls, rules, rounds):
+        summary = cls(rules.name)
+        summary.skipped = rounds.skipped
+        count = len(rounds)
+        if count == 0:
+            return summary
+        size = rules.size
+        players = rounds.players.astype(np.intp)
+        computers = rounds.computers.astype(np.intp)
+        outcomes = rounds.outcomes.astype(np.intp)
+        summary.rounds = count
+        summary.outcomes = np.bincount(outcomes, minlength=3)
+        summary.players = np.bincount(players, minlength=size)
+        summary.computers = np.bincount(computers, minlength=size)
+        summary.matrix = np.bincount(players * size + computers, minlength=size * size).reshape(size, size)
+        known = rounds.timestamps[rounds.timestamps > 0]
+        if known.shape[0]:
+            summary.first_time, summary.last_time = int(known.min()), int(known.max())
+
+        # Run-length encode the outcomes to find streaks
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(outcomes)) + 1))
+        lengths = np.diff(np.concatenate((starts, [count])))
+        values = outcomes[starts]
+        np.maximum.at(summary.longest, values, lengths)
+        summary.head = (int(values[0]), int(lengths[0]))
+        summary.tail = (int(values[-1]), int(lengths[-1]))
+        return summary
+
+    def _add_counts(self, other):
+        self.rounds += other.rounds
+        self.skipped += other.skipped
+        self.outcomes += other.outcomes
+        self.players += other.players
+        self.computers += other.computers
+        self.matrix += other.matrix
+        self.longest = np.maximum(self.longest, other.longest)
+        times = [t for t in (self.first_time, other.first_time) if t]
+        self.first_time = min(times) if times else 0
+        self.last_time = max(self.last_time, other.last_time)
+
+    # Merge a summary of the rounds played right after these ones (the same session)
+    def then(self, other):
+        if other.rounds == 0:
+            self.skipped += other.skipped
+            return self
+        if self.rounds == 0:
+            head = other.head
+            tail = other.tail
+        else:
+            head, tail = self.head, other.tail
+            if self.tail[0] == other.head[0]:
+                joined = self.tail[1] + other.head[1]
+                self.longest[self.tail[0]] = max(self.longest[self.tail[0]], joined)
+                if self.head[1] == self.rounds:
+                    head = (self.head[0], joined)
+                if other.tail[1] == other.rounds:
+                    tail = (other.tail[0], joined)
+        self._add_counts(other)
+        self.head, self.tail = head, tail
+        return self
+
+    # Merge a summary of a separate session (streaks never join across sessions)
+    def add(self, other):
+        self._add_counts(other)
+        self.head = self.tail = None
+        return self
+
+    # Percentage of rounds that ended with the given outcome
+    def rate(self, outcome):
+        return 100.0 * self.outcomes[outcome] / self.rounds if self.rounds else 0.0
+
+    def to_dict(self):
+        choices = self.rules.choices
+        return {
+            "rules": self.rules_name,
+            "rounds": int(self.rounds),
+            "skipped": int(self.skipped),
+            "wins": int(self.outcomes[engine.WIN]),
+            "losses": int(self.outcomes[engine.LOSE]),
+            "draws": int(self.outcomes[engine.DRAW]),
+            "win_rate": round(self.rate(engine.WIN), 3),
+            "loss_rate": round(self.rate(engine.LOSE), 3),
+            "draw_rate": round(self.rate(engine.DRAW), 3),
+            "player_counts": dict(zip(choices, self.players.tolist())),
+            "computer_counts": dict(zip(choices, self.computers.tolist())),
+            "matrix": self.matrix.tolist(),
+            "longest_win_streak": int(self.longest[engine.WIN]),
+            "longest_loss_streak": int(self.longest[engine.LOSE]),
+            "longest_draw_streak": int(self.longest[engine.DRAW]),
+            "first_time": self.first_time,
+            "last_time": self.last_time,
+        }
+
+
+# Function to summarize one file (runs in a worker): (path, summary or None, error or None)
+def summarize_file(path, default_rules_name, chunk_bytes=importer.CHUNK_BYTES):
+    try:
+        rules = None if path.lower().endswith(".csv") else importer.workbook_rules(path)
+        rules = rules or engine.RULESETS[default_rules_name]
+        summary = Summary(rules.name)
+        for rounds, _ in importer.read_rounds(path, rules, chunk_bytes):
+            summary.then(Summary.from_rounds(rules, rounds))
+        return path, summary, None
+    except (OSError, importer.ImportFormatError) as e:
+        return path, None, str(e)
+
+
+def run_aggregation(paths, workers=None, rules=engine.CLASSIC, on_progress=None):
+    totals, files, failed = {}, [], []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(summarize_file, path, rules.name) for path in paths]
+        for done, future in enumerate(as_completed(futures), 1):
+            path, summary, error = future.result()
+            if summary is None:
+                failed.append({"path": path, "error": error})
+            else:
+                # Reduce as results arrive; only the per-file headline numbers are kept
+                totals.setdefault(summary.rules_name, Summary(summary.rules_name)).add(summary)
+                files.append({"path": path, "rules": summary.rules_name, "rounds": int(summary.rounds),
+                              "skipped": int(summary.skipped), "win_rate": round(summary.rate(engine.WIN), 3),
+                              "longest_win_streak": int(summary.longest[engine.WIN])})
+            if on_progress is not None:
+                on_progress(done, len(paths))
+    elapsed = time.perf_counter() - started
+    total_rounds = sum(summary.rounds for summary in totals.values())
+    return {
+        "totals": [totals[name].to_dict() for name in sorted(totals)],
+        "files": sorted(files, key=lambda f: f["path"]),
+        "failed": sorted(failed, key=lambda f: f["path"]),
+        "total_rounds": int(total_rounds),
+        "elapsed": round(elapsed, 3),
+        "rounds_per_sec": round(total_rounds / elapsed) if elapsed > 0 else 0,
+        "workers": workers or os.cpu_count(),
+    }
+
+
+# Function to format an epoch timestamp with its date (reports span many days)
+def format_time(timestamp):
+    if not timestamp:
+        return "unknown"
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+
+
+# Function to print a combined report
+def print_report(result):
+    for total in result["totals"]:
+        print(f"{total['rules']}: {total['rounds']:,} rounds from "
+              f"{sum(1 for f in result['files'] if f['rules'] == total['rules'])} file(s), "
+              f"{total['skipped']:,} invalid rows skipped")
+        print(f"  You {total['win_rate']:.1f}%  Computer {total['loss_rate']:.1f}%  Draws {total['draw_rate']:.1f}%")
+        print(f"  Longest streaks: {total['longest_win_streak']} wins, {total['longest_loss_streak']} losses, "
+              f"{total['longest_draw_streak']} draws")
+        print(f"  Played from {format_time(total['first_time'])} to {format_time(total['last_time'])}")
+        favourite = max(total["player_counts"], key=total["player_counts"].get)
+        print(f"  Favourite choice: {favourite} ({total['player_counts'][favourite]:,} times)")
+    for failure in result["failed"]:
+        print(f"Skipped: {failure['error']}")
+    print(f"{result['total_rounds']:,} rounds in {result['elapsed']:.1f}s "
+          f"({result['rounds_per_sec']:,} rounds/s on {result['workers']} workers)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Combine the history of many saved workbooks into one report.")
+    parser.add_argument("paths", nargs="+", help="workbooks or CSV logs (glob patterns are expanded)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--rules", default=engine.CLASSIC.name, choices=list(engine.RULESETS),
+                        help="rule set for files that do not record one (CSV logs)")
+    parser.add_argument("--out", default=RESULTS_FILE, help="where to write the JSON report")
+    args = parser.parse_args(argv)
+
+    def progress(done, total):
+        print(f"progress {done}/{total}", flush=True)
+
+    result = run_aggregation(importer.expand_paths(args.paths), args.workers, engine.RULESETS[args.rules],
+                             on_progress=progress)
+    print_report(result)
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=2)
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,310 @@
+import math
+
+import numpy as np
+
+import engine
+
+# Streaming analysis of how the player picks moves.
+# Every round adds a handful of counts: the move, the transition from the
+# previous move, whether the player stayed with a move after a win, loss or
+# draw, and the length of each run of repeated moves once it ends. Recording
+# a round is O(1).
+# To answer windows without rescanning, the running totals are snapshotted
+# every `block` rounds. The counts for rounds [start, end) are then a
+# difference of two prefixes, and each prefix is a snapshot plus at most one
+# block of rounds. The block grows with the number of counts (the square of
+# the number of choices), so snapshots never use more than 8 bytes a round.
+# The randomness tests (chi-squared and entropy) are computed from the
+# windowed counts when they are read.
+
+BLOCK_ROUNDS = 1024
+RUN_BINS = 20  # runs of 1..19 repeated moves, and 20 or more
+RUN_CAP = 255  # run lengths are stored per round capped to fit a byte
+
+
+# Function to compute the chi-squared p-value (upper tail) for `dof` degrees of freedom
+def chi2_pvalue(stat, dof):
+    if dof <= 0:
+        return 1.0
+    if stat <= 0:
+        return 1.0
+    a, x = dof / 2, stat / 2
+    scale = math.exp(-x + a * math.log(x) - math.lgamma(a))
+    if x < a + 1:
+        # Series for the lower incomplete gamma function
+        term = total = 1 / a
+        n = a
+        while abs(term) > abs(total) * 1e-15:
+            n += 1
+            term *= x / n
+            total += term
+        return max(0.0, 1 - total * scale)
+    # Continued fraction for the upper incomplete gamma function (modified Lentz)
+    b = x + 1 - a
+    c = 1 / 1e-300
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = 1e-300 if abs(d) < 1e-300 else d
+        c = b + an / c
+        c = 1e-300 if abs(c) < 1e-300 else c
+        d = 1 / d
+        h *= d * c
+        if abs(d * c - 1) < 1e-15:
+            break
+    return min(1.0, scale * h)
+
+
+# Function to compute the Shannon entropy of a set of counts in bits
+def entropy_bits(counts):
+    counts = np.asarray(counts, dtype=np.float64)
+    total = counts.sum()
+    if total == 0:
+        return 0.0
+    p = counts[counts > 0] / total
+    return float(-(p * np.log2(p)).sum())
+
+
+class Window:
+    # Counts for a range of rounds, unpacked from a count vector (see Analytics)
+    def __init__(self, rules, start, end, counts):
+        size = rules.size
+        self.rules = rules
+        self.start = start
+        self.end = end
+        self.moves = counts[:size]
+        self.transitions = counts[size:size + size * size].reshape(size, size)  # [previous move, move]
+        after = size + size * size
+        self.followed = counts[after:after + 3]    # rounds played after a draw, win or loss
+        self.stayed = counts[after + 3:after + 6]  # ... where the player repeated the move
+        self.runs = counts[after + 6:after + 6 + RUN_BINS]  # finished runs of repeated moves by length
+
+    @property
+    def rounds(self):
+        return self.end - self.start
+
+    # Percentage of rounds after the given outcome where the player kept the same move
+    def stay_rate(self, outcome):
+        if self.followed[outcome] == 0:
+            return None
+        return 100.0 * self.stayed[outcome] / self.followed[outcome]
+
+    @property
+    def win_stay_rate(self):
+        return self.stay_rate(engine.WIN)
+
+    @property
+    def lose_shift_rate(self):
+        rate = self.stay_rate(engine.LOSE)
+        return None if rate is None else 100.0 - rate
+
+    # Average length of the finished runs of repeated moves (the last bin counts as RUN_BINS)
+    @property
+    def average_run(self):
+        runs = self.runs.sum()
+        if runs == 0:
+            return None
+        return float((self.runs * np.arange(1, RUN_BINS + 1)).sum() / runs)
+
+    # The most common move-to-move transition: (previous move, move, count)
+    def top_transition(self):
+        best = int(self.transitions.argmax())
+        previous, move = divmod(best, self.rules.size)
+        return previous, move, int(self.transitions[previous, move])
+
+    # Entropy of the player's moves in bits, and the most it could be (all moves equally likely)
+    def entropy(self):
+        return entropy_bits(self.moves), math.log2(self.rules.size)
+
+    # Entropy of a move given the previous one, in bits
+    def conditional_entropy(self):
+        totals = self.transitions.sum(axis=1)
+        if totals.sum() == 0:
+            return 0.0
+        weights = totals / totals.sum()
+        return float(sum(w * entropy_bits(row) for w, row in zip(weights, self.transitions) if w > 0))
+
+    # Chi-squared test that every move is played equally often: (statistic, degrees of freedom, p-value)
+    def chi_squared(self):
+        total = self.moves.sum()
+        if total == 0:
+            return 0.0, 0, 1.0
+        expected = total / self.rules.size
+        stat = float(((self.moves - expected) ** 2).sum() / expected)
+        dof = self.rules.size - 1
+        return stat, dof, chi2_pvalue(stat, dof)
+
+    # Chi-squared test that a move does not depend on the previous one: (statistic, degrees of freedom, p-value)
+    def transition_chi_squared(self):
+        table = self.transitions.astype(np.float64)
+        table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+        rows, columns = table.shape
+        if rows < 2 or columns < 2:
+            return 0.0, 0, 1.0
+        expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / table.sum()
+        stat = float(((table - expected) ** 2 / expected).sum())
+        dof = (rows - 1) * (columns - 1)
+        return stat, dof, chi2_pvalue(stat, dof)
+
+
+class Analytics:
+    def __init__(self, rules=engine.CLASSIC, block=BLOCK_ROUNDS):
+        self.base_block = block
+        self.reset(rules)
+
+    # Clear everything; passing a rule set switches to another game
+    def reset(self, rules=None):
+        if rules is not None:
+            self.rules = rules
+        size = self.rules.size
+        self._transition_at = size
+        self._followed_at = size + size * size
+        self._stayed_at = self._followed_at + 3
+        self._runs_at = self._stayed_at + 3
+        self.width = self._runs_at + RUN_BINS
+        self.block = max(self.base_block, self.width)
+        self.rounds = 0
+        self.run_length = 0  # length of the player's current run of repeated moves
+        self._totals = [0] * self.width
+        self._moves = np.zeros(1024, dtype=np.uint8)
+        self._outcomes = np.zeros(1024, dtype=np.uint8)
+        self._runs = np.zeros(1024, dtype=np.uint8)
+        self._snapshots = np.zeros((16, self.width), dtype=np.int64)  # totals before round i * block
+        self._snapshot_count = 1
+
+    def _grow(self, needed):
+        capacity = self._moves.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("_moves", "_outcomes", "_runs"):
+            grown = np.zeros(capacity, dtype=np.uint8)
+            grown[:self.rounds] = getattr(self, name)[:self.rounds]
+            setattr(self, name, grown)
+
+    def _snapshot(self, totals):
+        if self._snapshot_count == self._snapshots.shape[0]:
+            self._snapshots = np.concatenate((self._snapshots, np.zeros_like(self._snapshots)))
+        self._snapshots[self._snapshot_count] = totals
+        self._snapshot_count += 1
+
+    # Fold one round into the counts
+    def record(self, player, outcome):
+        i = self.rounds
+        self._grow(i + 1)
+        totals = self._totals
+        totals[player] += 1
+        if i > 0:
+            previous = int(self._moves[i - 1])
+            previous_outcome = int(self._outcomes[i - 1])
+            totals[self._transition_at + previous * self.rules.size + player] += 1
+            totals[self._followed_at + previous_outcome] += 1
+            if player == previous:
+                totals[self._stayed_at + previous_outcome] += 1
+                self.run_length += 1
+            else:
+                totals[self._runs_at + min(self.run_length, RUN_BINS) - 1] += 1
+                self.run_length = 1
+        else:
+            self.run_length = 1
+        self._moves[i] = player
+        self._outcomes[i] = outcome
+        self._runs[i] = min(self.run_length, RUN_CAP)
+        self.rounds += 1
+        if self.rounds % self.block == 0:
+            self._snapshot(totals)
+
+    # Fold a whole array of rounds in at once (used when restoring or importing a session)
+    def record_batch(self, players, outcomes, chunk_rows=1 << 20):
+        players = np.asarray(players, dtype=np.uint8)
+        outcomes = np.asarray(outcomes, dtype=np.uint8)
+        for start in range(0, players.shape[0], chunk_rows):
+            self._record_chunk(players[start:start + chunk_rows], outcomes[start:start + chunk_rows])
+
+    def _record_chunk(self, players, outcomes):
+        count = players.shape[0]
+        if count == 0:
+            return
+        first = self.rounds
+        self._grow(first + count)
+        self._moves[first:first + count] = players
+        self._outcomes[first:first + count] = outcomes
+
+        # Run length at each round: rounds since the move last changed, plus the run carried in
+        changed = np.ones(count, dtype=bool)
+        changed[1:] = players[1:] != players[:-1]
+        if first > 0 and players[0] == self._moves[first - 1]:
+            changed[0] = False
+        starts = np.maximum.accumulate(np.where(changed, np.arange(count), -1))
+        runs = np.arange(count) - starts + 1
+        carried = starts < 0
+        runs[carried] = np.arange(1, count + 1)[carried] + self.run_length
+        self._runs[first:first + count] = np.minimum(runs, RUN_CAP)
+        self.run_length = int(runs[-1])
+        self.rounds += count
+
+        # Totals, and a snapshot at every block boundary the chunk crosses
+        features, rounds = self._features(first, first + count)
+        before = np.asarray(self._totals, dtype=np.int64)
+        boundaries = np.arange((first // self.block + 1) * self.block, first + count + 1, self.block)
+        if boundaries.shape[0]:
+            blocks = np.searchsorted(boundaries, rounds, side="right")
+            counts = np.bincount(blocks * self.width + features, minlength=(boundaries.shape[0] + 1) * self.width)
+            counts = np.cumsum(counts.reshape(-1, self.width), axis=0)
+            for row in counts[:-1]:
+                self._snapshot(before + row)
+            after = before + counts[-1]
+        else:
+            after = before + np.bincount(features, minlength=self.width)
+        self._totals = after.tolist()
+
+    # Count indices contributed by rounds [start, end), and the round each one belongs to
+    def _features(self, start, end):
+        size = self.rules.size
+        moves = self._moves[start:end].astype(np.intp)
+        rounds = np.arange(start, end)
+        parts = [(moves, rounds)]
+        lo = max(start, 1)
+        if lo < end:
+            current = self._moves[lo:end].astype(np.intp)
+            previous = self._moves[lo - 1:end - 1].astype(np.intp)
+            previous_outcome = self._outcomes[lo - 1:end - 1].astype(np.intp)
+            followed = np.arange(lo, end)
+            parts.append((self._transition_at + previous * size + current, followed))
+            parts.append((self._followed_at + previous_outcome, followed))
+            stayed = current == previous
+            parts.append((self._stayed_at + previous_outcome[stayed], followed[stayed]))
+            ended = ~stayed
+            run = np.minimum(self._runs[lo - 1:end - 1][ended].astype(np.intp), RUN_BINS)
+            parts.append((self._runs_at + run - 1, followed[ended]))
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    # Totals over rounds [0, end): the snapshot before it plus the rounds since
+    def _prefix(self, end):
+        if end == self.rounds:
+            return np.asarray(self._totals, dtype=np.int64)
+        block = end // self.block
+        features, _ = self._features(block * self.block, end)
+        return self._snapshots[block] + np.bincount(features, minlength=self.width)
+
+    # Counts for rounds [start, end); negative values count back from the latest round
+    def window(self, start=0, end=None):
+        end = self.rounds if end is None else end
+        start = start + self.rounds if start < 0 else start
+        end = end + self.rounds if end < 0 else end
+        start = min(max(start, 0), self.rounds)
+        end = min(max(end, start), self.rounds)
+        counts = self._prefix(end) - self._prefix(start)
+        if 0 < start < end:
+            # Round `start` was counted as following the round before the window; take that back out
+            features, _ = self._features(start, start + 1)
+            counts[features[1:]] -= 1
+        return Window(self.rules, start, end, counts)
+
+    # Counts for the last `count` rounds
+    def last(self, count):
+        return self.window(max(self.rounds - count, 0))
@@ -1,50 +1,188 @@
+# Start the startup timeline before anything heavy is imported
+from timeline import StartupTimeline
+startup = StartupTimeline()
+
 import dearpygui.dearpygui as dpg
-import random
 import time
-import pandas as pd
 import os
+import random
+import sqlite3
 import sys
+import traceback
+
+import engine
+from history import RoundHistory, format_clock
+from history_view import PAGE_ROWS, HistoryPager
+from history_db import DBHistoryPager, HistoryDB
+from roundlog import LogFormatError
+from autosave import AutoSave, recover
+from client import GameClient, ServerError
+from stats import RoundStats
+from timeseries import ROLLING_WINDOW, OutcomeSeries
+from analytics import Analytics
+from rangestats import RangeIndex
+from export import ExportJob
+import importer
+import tournament
+from opponents import DEFAULT_BUDGET_US, STRATEGIES, OpponentTooSlow, build_opponent
+from replay import CHOICE, SEED, SESSION_INPUTS, STRATEGY_NAMES, InputRecorder, Replay, digest, new_seed
+from uibind import UIBindings
+from displays import COLORS, OUTCOME_COLORS, queue_game_displays, round_text
+from idleloop import FramePacer
+from profiler import Profiler, build_profiler_window, refresh_profiler_window
+
+startup.mark("modules imported")
 
 # Initialize DearPyGUI
 dpg.create_context()
 
-# Game constants
-CHOICES = ["Rock", "Paper", "Scissors"]
+# Callback and frame timing (RPS_PROFILE=1 turns it on from the start)
+profiler = Profiler(enabled=os.environ.get("RPS_PROFILE", "") == "1")
+
+# Main loop pacing: full frame rate while in use, a few frames per second when idle
+pacer = FramePacer(enabled=os.environ.get("RPS_POWER_SAVE", "1") != "0")
 
-# Excel file path
+# Game state marks UI fields dirty here; they are pushed once per frame
+ui = UIBindings(on_dirty=pacer.wake)
+
+# Excel file path (export/import only) and the session log that stores every round
 EXCEL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rps_data.xlsx")
+CSV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rps_data.csv")
+SESSION_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rps_session.rpslog")
+SESSION_JOURNAL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rps_session.journal")
+PROFILE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profile_samples.csv")
+STARTUP_TIMELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_timeline.json")
+HISTORY_DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rps_history.sqlite3")
 
-COLORS = {
-    "background": [32, 32, 32],
-    "primary": [65, 105, 225],    # Royal Blue
-    "secondary": [70, 70, 70],
-    "accent": [255, 165, 0],      # Orange
-    "text": [240, 240, 240],
-    "win": [0, 200, 0],
-    "lose": [200, 0, 0],
-    "draw": [200, 200, 0],
-    "panel": [45, 45, 48],
-    "sidebar": [35, 35, 38],
-    "sidebar_hover": [55, 55, 58],
-    "sidebar_active": [75, 75, 78]
-}
+# Startup options: build every view before the first frame instead of on first use,
+# and the time-to-first-frame budget to warn about
+EAGER_VIEWS = os.environ.get("RPS_EAGER_VIEWS", "") == "1"
+STARTUP_BUDGET_MS = float(os.environ.get("RPS_STARTUP_BUDGET_MS", "1000"))
+
+# Game variant for a new session (a restored session keeps the rule set it was played with)
+DEFAULT_RULES = engine.RULESETS.get(os.environ.get("RPS_RULES", ""), engine.CLASSIC)
+MATRIX_MAX_CHOICES = 15  # larger variants skip the choice matrix in the stats view
+
+# Thin-client mode: RPS_SERVER=host:port plays on a game server (server.py) instead of locally,
+# resuming RPS_SESSION if given
+SERVER_ADDRESS = os.environ.get("RPS_SERVER", "")
+SERVER_SESSION = os.environ.get("RPS_SESSION") or None
+
+# Optional SQLite store for the history view: RPS_HISTORY_DB=1 (or a file path) turns it on
+HISTORY_DB = os.environ.get("RPS_HISTORY_DB", "")
+
+# Replay mode: RPS_REPLAY=path plays an input recording (replay.py) back through the game as fast
+# as it can, in memory, and prints a digest of the rounds; RPS_REPLAY_EXIT=1 closes the app after
+REPLAY_FILE = os.environ.get("RPS_REPLAY", "")
+REPLAY_EXIT = os.environ.get("RPS_REPLAY_EXIT", "") == "1"
+REPLAY_FRAME_BUDGET = 0.05  # seconds of rounds replayed between frames
+
+# Game state: mirrored from the game server in thin-client mode (the server keeps the log),
+# otherwise restored from the session log if there is one
+server = None
+replay_run = None
+opponent_name = "Random"
+if REPLAY_FILE:
+    try:
+        replay_run = Replay(REPLAY_FILE)
+        rules = replay_run.rules
+        game_history = RoundHistory(rules=rules)
+        autosave = None
+        print(f"Replaying {replay_run.rounds:,} rounds from {REPLAY_FILE}")
+    except (OSError, LogFormatError) as e:
+        print(f"Could not read input recording {REPLAY_FILE}, playing normally: {e}")
+        replay_run = None
+if SERVER_ADDRESS and replay_run is None:
+    try:
+        server = GameClient(SERVER_ADDRESS)
+        session_info = server.hello(SERVER_SESSION, DEFAULT_RULES.name)
+        rules = engine.RULESETS[session_info["rules"]]
+        opponent_name = session_info["opponent"]
+        game_history = RoundHistory(rules=rules)
+        server.load_rounds(game_history)
+        autosave = None
+        print(f"Connected to {SERVER_ADDRESS} as session {server.session}")
+    except (OSError, ValueError, ServerError) as e:
+        print(f"Could not use game server {SERVER_ADDRESS}, playing locally: {e}")
+        server = None
+if server is None and replay_run is None:
+    # The session log is the last checkpoint; rounds played after it are replayed from the journal
+    try:
+        game_history, replayed = recover(SESSION_LOG, SESSION_JOURNAL, DEFAULT_RULES)
+    except LogFormatError as e:
+        print(f"Ignoring unreadable session log: {e}")
+        for path in (SESSION_LOG, SESSION_JOURNAL):
+            if os.path.exists(path):
+                os.replace(path, path + ".bad")
+        game_history, replayed = RoundHistory(rules=DEFAULT_RULES), 0
+    if replayed:
+        print(f"Recovered {replayed:,} rounds from the session journal")
+    rules = game_history.rules
+    autosave = AutoSave(SESSION_LOG, SESSION_JOURNAL, game_history, replayed)
 
-# Game state
-player_score = 0
-computer_score = 0
-game_history = []
-round_count = 0
+# All scores and rates live in one incrementally updated statistics object
+stats = RoundStats(rules.size)
+stats.record_batch(game_history.players(), game_history.computers(), game_history.outcomes())
 last_result = ""
-total_rounds = 0
-win_percentage = 0
-draw_percentage = 0
 current_view = "game"
+export_job = None
+ingest_job = None
+tournament_run = None
+autosave_error = None
+history_db_error = None
+outcome_series = None  # rolling rates for the stats plots, built when the stats view is first opened
+plotted_version = None
+analytics = None  # behaviour counts for the stats view, also built when it is first opened
+range_index = None  # outcome counts before every round, for the stats view's range selector
+TOURNAMENT_ROUNDS = 200_000  # rounds per matchup when run from the stats view
+
+# Computer opponent (strategies over the per-move time budget are rejected). Its random choices come
+# from a stream seeded per session, so a session can be replayed from the player's recorded inputs.
+OPPONENT_BUDGET_US = float(os.environ.get("RPS_OPPONENT_BUDGET_US", DEFAULT_BUDGET_US))
+session_seed = new_seed()
+session_rng = random.Random(session_seed)
+opponent = build_opponent(opponent_name, rng=session_rng, budget_us=OPPONENT_BUDGET_US, rules=rules)
+
+# Input recording for local sessions, carried on if it matches the restored history
+recorder = None
+if server is None and replay_run is None:
+    try:
+        recorder = InputRecorder(SESSION_INPUTS)
+        recorder.resume(game_history, session_seed, opponent.name)
+    except OSError as e:
+        print(f"Could not record inputs: {e}")
+        recorder = None
+startup.mark("session restored")
+
+# Visible window over the history for the history view. With the SQLite store on, pages come
+# from the store once it has caught up with the history; until then they come from memory.
+history_pager = HistoryPager(game_history)
+history_db = None
+if HISTORY_DB and replay_run is None:
+    try:
+        history_db = HistoryDB(HISTORY_DB_FILE if HISTORY_DB == "1" else HISTORY_DB, rules)
+        history_db.sync(game_history)
+    except sqlite3.Error as e:
+        print(f"Could not open the history database: {e}")
+        history_db = None
+OUTCOME_FILTERS = {"All": None, "Wins": engine.WIN, "Losses": engine.LOSE, "Draws": engine.DRAW}
+TIME_FILTERS = {"Any time": None, "Last hour": 3600, "Last 24 hours": 86400, "Last 7 days": 7 * 86400}
+RANGE_MODES = {"Rounds": None, "Last 10 minutes": 600, "Last hour": 3600, "Last 24 hours": 86400}
+BEHAVIOUR_WINDOWS = {"Whole session": None, "Last 100 rounds": 100, "Last 1000 rounds": 1000}
+BEHAVIOUR_FIELDS = ("win_stay", "lose_shift", "top_transition", "average_run", "entropy",
+                    "conditional_entropy", "balance", "independence")
 
 # Icons for choices and navigation
 ICONS = {
     "Rock": "✊",
     "Paper": "✋",
     "Scissors": "✌️",
+    "Lizard": "🦎",
+    "Spock": "🖖",
+    "Water": "💧",
+    "Air": "💨",
+    "Sponge": "🧽",
+    "Fire": "🔥",
     "Game": "🎮",
     "Stats": "📊",
     "History": "📜",
@@ -52,286 +190,394 @@ ICONS = {
     "Export": "📤"
 }
 
+# Function to start a background export of the game data
+def start_export(path):
+    global export_job
+    
+    if not game_history:
+        return
+    if export_job is not None and not export_job.done:
+        ui.set("status_text", default_value="An export is already running", color=COLORS["accent"])
+        return
+    
+    export_job = ExportJob(game_history, stats, path).start()
+    ui.set("cancel_export_button", show=True)
+
 # Function to save game data to Excel
+@profiler.timed("save_to_excel")
 def save_to_excel():
-    # Create DataFrame from game history
-    if not game_history:
+    start_export(EXCEL_FILE)
+
+# Function to save game history to CSV
+@profiler.timed("save_to_csv")
+def save_to_csv():
+    start_export(CSV_FILE)
+
+# Function to cancel a running export
+@profiler.timed("cancel_export")
+def cancel_export():
+    if export_job is not None:
+        export_job.cancel()
+
+# Function to report export progress (called from the render loop)
+@profiler.timed("poll_export")
+def poll_export():
+    global export_job
+    
+    if export_job is None:
         return
-        
-    history_data = []
-    for i, h in enumerate(game_history):
-        try:
-            # More robust parsing of history entries
-            round_info = h.split(": ", 1)  # Split only on first occurrence
-            if len(round_info) < 2:
-                continue  # Skip malformed entries
-                
-            timestamp_part = round_info[0]
-            timestamp = timestamp_part.split("[")[1].split("]")[0] if "[" in timestamp_part and "]" in timestamp_part else "unknown"
-            
-            # Extract choices and result
-            game_detail = round_info[1]
-            
-            # Handle different possible formats
-            if " - " in game_detail:
-                choices_part, result = game_detail.split(" - ", 1)
-            else:
-                choices_part, result = game_detail, "Unknown"
-                
-            # Extract player and computer choices
-            if ", " in choices_part:
-                player_part, computer_part = choices_part.split(", ", 1)
-            else:
-                player_part, computer_part = choices_part, "PC: Unknown"
-                
-            player_choice = player_part.replace("You: ", "") if "You: " in player_part else player_part
-            computer_choice = computer_part.replace("PC: ", "") if "PC: " in computer_part else computer_part
-            
-            history_data.append({
-                "Round": i+1,
-                "Timestamp": timestamp,
-                "Player Choice": player_choice,
-                "Computer Choice": computer_choice,
-                "Result": result
-            })
-        except Exception as e:
-            print(f"Error parsing history entry {i}: {e}")
-            # Add a fallback entry with available information
-            history_data.append({
-                "Round": i+1,
-                "Timestamp": "error",
-                "Player Choice": "error",
-                "Computer Choice": "error",
-                "Result": "Error parsing entry"
-            })
+    if not export_job.done:
+        ui.set("status_text", default_value=f"Exporting... {export_job.progress * 100:.0f}% "
+                                                        f"({export_job.written:,}/{export_job.total:,} rounds)",
+                           color=COLORS["accent"])
+        return
+    
+    if export_job.cancelled:
+        ui.set("status_text", default_value="Export cancelled", color=COLORS["accent"])
+    elif export_job.error is not None:
+        ui.set("status_text", default_value=f"Error saving data: {str(export_job.error)}", color=COLORS["lose"])
+    else:
+        elapsed = time.perf_counter() - export_job.started_at
+        ui.set("status_text", default_value=f"Data saved to {export_job.path} in {elapsed:.1f}s", color=COLORS["win"])
+    ui.set("cancel_export_button", show=False)
+    export_job = None
+
+# Function to start appending external round logs (CSV or .xlsx, glob patterns allowed) in the background
+@profiler.timed("start_ingest")
+def start_ingest():
+    global ingest_job
     
-    df_history = pd.DataFrame(history_data)
+    if server is not None:
+        ui.set("status_text", default_value="Import is not available while playing on a server",
+               color=COLORS["accent"])
+        return
+    if ingest_job is not None and not ingest_job.done:
+        ui.set("status_text", default_value="An import is already running", color=COLORS["accent"])
+        return
+    patterns = [p.strip() for p in dpg.get_value("ingest_paths").split(";") if p.strip()]
+    if not patterns:
+        ui.set("status_text", default_value="Enter one or more CSV or .xlsx files, separated by ;",
+               color=COLORS["accent"])
+        return
+    
+    ingest_job = importer.IngestJob(importer.expand_paths(patterns), rules).start()
+    ui.set("cancel_ingest_button", show=True)
+
+# Function to cancel a running log import
+@profiler.timed("cancel_ingest")
+def cancel_ingest():
+    if ingest_job is not None:
+        ingest_job.cancel()
+
+# Function to report log import progress and append the rounds once it is done (called from the render loop)
+@profiler.timed("poll_ingest")
+def poll_ingest():
+    global ingest_job
     
-    # Create stats DataFrame
-    stats_data = {
-        "Statistic": ["Player Score", "Computer Score", "Total Rounds", "Win Rate", "Draw Rate"],
-        "Value": [player_score, computer_score, total_rounds, 
-                 f"{win_percentage:.1f}%" if total_rounds > 0 else "0%", 
-                 f"{draw_percentage:.1f}%" if total_rounds > 0 else "0%"]
-    }
-    df_stats = pd.DataFrame(stats_data)
+    if not ingest_job.done:
+        ui.set("status_text", default_value=f"Importing logs... {ingest_job.progress * 100:.0f}% "
+                                            f"({ingest_job.rounds:,} rounds)", color=COLORS["accent"])
+        return
+    
+    job, ingest_job = ingest_job, None
+    ui.set("cancel_ingest_button", show=False)
+    if job.cancelled:
+        ui.set("status_text", default_value="Import cancelled", color=COLORS["accent"])
+        return
+    if job.error is not None:
+        ui.set("status_text", default_value=f"Error importing logs: {str(job.error)}", color=COLORS["lose"])
+        return
+    if job.rules is not rules:
+        ui.set("status_text", default_value="The rule set changed during the import; no rounds were added",
+               color=COLORS["accent"])
+        return
     
-    # Save to Excel with multiple sheets
     try:
-        with pd.ExcelWriter(EXCEL_FILE, engine='openpyxl') as writer:
-            df_history.to_excel(writer, sheet_name='Game History', index=False)
-            df_stats.to_excel(writer, sheet_name='Statistics', index=False)
-        dpg.configure_item("status_text", default_value=f"Data saved to {EXCEL_FILE}", color=COLORS["win"])
+        imported = job.result()
+        append_rounds(imported)
     except Exception as e:
-        dpg.configure_item("status_text", default_value=f"Error saving data: {str(e)}", color=COLORS["lose"])
+        ui.set("status_text", default_value=f"Error importing logs: {str(e)}", color=COLORS["lose"])
+        return
+    elapsed = time.perf_counter() - job.started_at
+    notes = [f"{imported.skipped:,} invalid rows skipped"] if imported.skipped else []
+    notes += [f"could not read {path} ({str(e)})" for path, e in job.failed]
+    ui.set("status_text", default_value=f"Appended {len(imported):,} rounds from {len(job.paths) - len(job.failed)} "
+                                        f"file(s) in {elapsed:.1f}s" + "".join(f", {note}" for note in notes),
+           color=COLORS["lose"] if job.failed else COLORS["win"])
+
+# Function to append imported rounds to the history and everything built from it
+def append_rounds(imported):
+    game_history.extend(imported.players, imported.computers, imported.outcomes, imported.timestamps)
+    stats.record_batch(imported.players, imported.computers, imported.outcomes)
+    if outcome_series is not None:
+        outcome_series.record_batch(imported.outcomes)
+    if analytics is not None:
+        analytics.record_batch(imported.players, imported.outcomes)
+    if range_index is not None:
+        range_index.extend(imported.outcomes, imported.timestamps)
+    if autosave is not None:
+        autosave.rewrite()
+    if history_db is not None:
+        history_db.sync(game_history)
+        choose_history_pager()
+    history_pager.rebuild()
+    new_session_stream()
+    update_displays()
+    ui.set("history_list", items=game_history.recent(8))
+    if current_view == "history":
+        refresh_history_view()
+
+# Function to start a new seeded random stream (new game, import): the opponent starts learning from scratch
+# and the input recording starts over at the current round
+def new_session_stream():
+    global opponent, session_seed
+    session_seed = new_seed()
+    session_rng.seed(session_seed)
+    opponent = STRATEGIES[opponent.name](session_rng, rules)
+    if recorder is not None:
+        try:
+            recorder.start(rules, len(game_history), session_seed, opponent.name)
+        except OSError as e:
+            print(f"Could not record inputs: {e}")
+
+# Function to start a due autosave checkpoint and report failures (called from the render loop)
+def poll_autosave():
+    global autosave_error
+    autosave.poll()
+    if autosave.error is not autosave_error:
+        autosave_error = autosave.error
+        if autosave_error is not None:
+            ui.set("status_text", default_value=f"Autosave failed: {str(autosave_error)}", color=COLORS["lose"])
+
+# Function to read the import options from the history view (all rounds if it was never opened)
+def import_options():
+    if not dpg.does_item_exist("import_mode"):
+        return {}
+    mode = dpg.get_value("import_mode")
+    if mode == "Last N rounds":
+        return {"last": dpg.get_value("import_last")}
+    if mode == "Round range":
+        return {"first_round": dpg.get_value("import_first"), "last_round": dpg.get_value("import_to")}
+    return {}
 
 # Function to load game data from Excel
+@profiler.timed("load_from_excel")
 def load_from_excel():
-    global player_score, computer_score, game_history, round_count, total_rounds, win_percentage, draw_percentage
-    
+    if server is not None:
+        ui.set("status_text", default_value="Import is not available while playing on a server",
+               color=COLORS["accent"])
+        return False
     if not os.path.exists(EXCEL_FILE):
-        dpg.configure_item("status_text", default_value="No saved data found", color=COLORS["accent"])
+        ui.set("status_text", default_value="No saved data found", color=COLORS["accent"])
         return False
     
     try:
-        # Read history sheet
-        df_history = pd.read_excel(EXCEL_FILE, sheet_name='Game History')
-        
-        # Convert history data back to our format
-        game_history = []
-        for _, row in df_history.iterrows():
-            entry = f"Round {row['Round']} [{row['Timestamp']}]: You: {row['Player Choice']}, PC: {row['Computer Choice']} - {row['Result']}"
-            game_history.append(entry)
-        
-        # Read stats sheet
-        df_stats = pd.read_excel(EXCEL_FILE, sheet_name='Statistics')
-        
-        # Extract stats
-        stats_dict = dict(zip(df_stats['Statistic'], df_stats['Value']))
-        player_score = int(stats_dict.get('Player Score', 0))
-        computer_score = int(stats_dict.get('Computer Score', 0))
-        total_rounds = int(stats_dict.get('Total Rounds', 0))
-        
-        # Parse percentage values
-        win_rate_str = stats_dict.get('Win Rate', '0%')
-        win_percentage = float(win_rate_str.replace('%', ''))
+        started = time.perf_counter()
+        saved_rules = importer.workbook_rules(EXCEL_FILE)
+        if saved_rules is not None and saved_rules is not rules:
+            ui.set("status_text", default_value=f"The saved data is a {saved_rules.name} game; "
+                                                f"switch the rule set in Settings first", color=COLORS["accent"])
+            return False
         
-        draw_rate_str = stats_dict.get('Draw Rate', '0%')
-        draw_percentage = float(draw_rate_str.replace('%', ''))
+        # Stream only the needed columns (and rounds) of the history sheets
+        imported = importer.read_workbook(EXCEL_FILE, rules, **import_options())
+        game_history.clear()
+        game_history.extend(imported.players, imported.computers, imported.outcomes, imported.timestamps)
         
-        round_count = len(game_history)
+        # Rebuild statistics from the loaded rounds
+        stats.reset()
+        stats.record_batch(game_history.players(), game_history.computers(), game_history.outcomes())
+        if outcome_series is not None:
+            outcome_series.reset()
+            outcome_series.record_batch(game_history.outcomes())
+        if analytics is not None:
+            analytics.reset()
+            analytics.record_batch(game_history.players(), game_history.outcomes())
+        if range_index is not None:
+            range_index.reset()
+            range_index.extend(game_history.outcomes(), game_history.timestamps())
+        if autosave is not None:
+            autosave.rewrite()
+        if history_db is not None:
+            history_db.sync(game_history)
+            choose_history_pager()
+        history_pager.rebuild()
+        new_session_stream()
         
         # Update UI
         update_displays()
-        dpg.configure_item("history_list", items=game_history[::-1])
-        dpg.configure_item("status_text", default_value="Data loaded successfully", color=COLORS["win"])
+        ui.set("history_list", items=game_history.recent(8))
+        skipped = f", {imported.skipped:,} invalid rows skipped" if imported.skipped else ""
+        ui.set("status_text", default_value=f"Loaded {len(imported):,} rounds in "
+                                            f"{time.perf_counter() - started:.1f}s{skipped}", color=COLORS["win"])
         
         return True
     except Exception as e:
-        dpg.configure_item("status_text", default_value=f"Error loading data: {str(e)}", color=COLORS["lose"])
+        ui.set("status_text", default_value=f"Error loading data: {str(e)}", color=COLORS["lose"])
         return False
 
 # Function to reset the game
+@profiler.timed("reset_game")
 def reset_game():
-    global player_score, computer_score, game_history, round_count, last_result, total_rounds, win_percentage, draw_percentage
+    # The server starts the session over first, so nothing is cleared if it is unreachable
+    if reset_server(rules.name):
+        start_new_game()
+
+# Function to start the server's session over with a rule set (thin-client mode); False if it failed
+def reset_server(rules_name):
+    if server is None:
+        return True
+    try:
+        server.reset(rules_name)
+    except (OSError, ValueError, ServerError) as e:
+        ui.set("status_text", default_value=f"Server error: {str(e)}", color=COLORS["lose"])
+        return False
+    return True
+
+# Function to clear the local game state and displays for a new game
+def start_new_game():
+    global last_result
     
-    # Reset game state variables
-    player_score = 0
-    computer_score = 0
-    game_history = []
-    round_count = 0
+    # Reset game state variables (the opponent starts learning from scratch)
+    stats.reset(rules.size)
+    if outcome_series is not None:
+        outcome_series.reset()
+    if analytics is not None:
+        analytics.reset(rules)
+    if range_index is not None:
+        range_index.reset()
+    game_history.clear(rules)
+    new_session_stream()
+    if history_db is not None:
+        history_db.clear(rules)
+    history_pager.reset()
     last_result = ""
-    total_rounds = 0
-    win_percentage = 0
-    draw_percentage = 0
-    
-    # Helper function to safely configure items
-    def safe_configure_item(tag, **kwargs):
-        try:
-            if dpg.does_item_exist(tag):
-                dpg.configure_item(tag, **kwargs)
-        except Exception as e:
-            print(f"Error configuring item {tag} in reset_game: {e}")
+    if autosave is not None:
+        autosave.rewrite()
     
-    # Update UI elements safely
+    # Queue UI updates (pushed once, just before the next frame)
     try:
         update_displays()
-        safe_configure_item("history_list", items=[])
-        safe_configure_item("detailed_history", items=[])
-        safe_configure_item("result_text", default_value="Make your choice!")
-        safe_configure_item("win_percentage", default_value="Win Rate: 0%")
-        safe_configure_item("draw_percentage", default_value="Draw Rate: 0%")
-        safe_configure_item("total_rounds_text", default_value="Total Rounds: 0")
-        safe_configure_item("status_text", default_value="Game reset", color=COLORS["accent"])
+        ui.set("history_list", items=[])
+        if dpg.does_item_exist("history_view"):
+            refresh_history_view()
+        ui.set("result_text", default_value="Make your choice!")
+        ui.set("win_percentage", default_value="Win Rate: 0%")
+        ui.set("draw_percentage", default_value="Draw Rate: 0%")
+        ui.set("total_rounds_text", default_value="Total Rounds: 0")
+        ui.set("status_text", default_value="Game reset", color=COLORS["accent"])
         
         # Reset statistics view items if they exist
-        safe_configure_item("stats_player_wins", default_value="0")
-        safe_configure_item("stats_win_rate", default_value="0%")
-        safe_configure_item("stats_computer_wins", default_value="0")
-        safe_configure_item("stats_computer_win_rate", default_value="0%")
-        safe_configure_item("stats_total_rounds", default_value="0")
-        safe_configure_item("stats_draws", default_value="0")
-        safe_configure_item("stats_draw_rate", default_value="0%")
-        safe_configure_item("stats_fav_choice", default_value="N/A")
+        ui.set("stats_player_wins", default_value="0")
+        ui.set("stats_win_rate", default_value="0%")
+        ui.set("stats_computer_wins", default_value="0")
+        ui.set("stats_computer_win_rate", default_value="0%")
+        ui.set("stats_total_rounds", default_value="0")
+        ui.set("stats_draws", default_value="0")
+        ui.set("stats_draw_rate", default_value="0%")
+        ui.set("stats_fav_choice", default_value="N/A")
+        ui.set("stats_computer_fav_choice", default_value="N/A")
+        ui.set("stats_current_streak", default_value="N/A")
+        ui.set("stats_longest_win_streak", default_value="0")
+        ui.set("stats_longest_loss_streak", default_value="0")
+        for field in BEHAVIOUR_FIELDS:
+            ui.set(f"stats_{field}", default_value="N/A")
+        if rules.size <= MATRIX_MAX_CHOICES:
+            for p in range(rules.size):
+                for c in range(rules.size):
+                    ui.set(f"stats_matrix_{p}_{c}", default_value="0")
         
     except Exception as e:
-        print(f"Error in reset_game: {e}")
+        print(f"Error starting a new game: {e}")
         try:
-            dpg.configure_item("status_text", default_value=f"Error resetting game: {str(e)}", color=COLORS["lose"])
+            ui.set("status_text", default_value=f"Error resetting game: {str(e)}", color=COLORS["lose"])
         except:
             print("Could not update status text")
 
 # Function to determine winner
 def determine_winner(player, computer):
-    if player == computer:
-        return "Draw!"
-    elif (player == "Rock" and computer == "Scissors") or \
-         (player == "Paper" and computer == "Rock") or \
-         (player == "Scissors" and computer == "Paper"):
-        return "You win!"
-    else:
-        return "Computer wins!"
+    outcome = rules.resolve(rules.index[player], rules.index[computer])
+    return engine.RESULTS[outcome]
 
 # Function to make a choice and play a round
+@profiler.timed("play_round")
 def play_round(sender, app_data, user_data):
-    global player_score, computer_score, game_history, round_count, last_result, total_rounds, win_percentage, draw_percentage
-    
-    # Get player choice and generate computer choice
-    player_choice = user_data
-    computer_choice = random.choice(CHOICES)
+    global last_result
     
-    # Determine the winner
-    result = determine_winner(player_choice, computer_choice)
-    last_result = f"You chose {player_choice}, Computer chose {computer_choice}."
-    
-    # Update scores
-    if result == "You win!":
-        player_score += 1
-        result_color = COLORS["win"]
-    elif result == "Computer wins!":
-        computer_score += 1
-        result_color = COLORS["lose"]
+    # Get player choice, let the opponent pick, and resolve the round through the engine
+    # (on the server in thin-client mode)
+    player_code = rules.index[user_data]
+    if server is not None:
+        try:
+            reply = server.play(player_code)
+        except (OSError, ValueError, ServerError) as e:
+            ui.set("status_text", default_value=f"Server error: {str(e)}", color=COLORS["lose"])
+            return
+        computer_code, outcome, timestamp = reply["computer"], reply["outcome"], reply["time"]
     else:
-        result_color = COLORS["draw"]
+        computer_code = opponent.choose()
+        outcome = rules.resolve(player_code, computer_code)
+        opponent.observe(player_code, computer_code)
+        timestamp = None
+        if recorder is not None:
+            recorder.choice(player_code)
+    result = engine.RESULTS[outcome]
+    last_result = round_text(rules, player_code, computer_code)
     
-    # Add to history (limit history size to prevent memory issues)
-    MAX_HISTORY = 100
-    round_count += 1
-    total_rounds += 1
-    timestamp = time.strftime("%H:%M:%S")
-    history_entry = f"Round {round_count} [{timestamp}]: You: {player_choice}, PC: {computer_choice} - {result}"
-    game_history.append(history_entry)
+    # Update scores and statistics
+    stats.record(player_code, computer_code, outcome)
+    if outcome_series is not None:
+        outcome_series.record(outcome)
+    if analytics is not None:
+        analytics.record(player_code, outcome)
+    result_color = OUTCOME_COLORS[outcome]
     
-    # Trim history if it gets too large
-    if len(game_history) > MAX_HISTORY:
-        game_history = game_history[-MAX_HISTORY:]
-    
-    # Calculate statistics
-    if total_rounds > 0:
-        win_percentage = (player_score / total_rounds) * 100
-        draw_count = total_rounds - player_score - computer_score
-        draw_percentage = (draw_count / total_rounds) * 100
+    # Add to history (every round is kept, 5 bytes each for the classic game)
+    game_history.append(player_code, computer_code, outcome, timestamp)
+    if autosave is not None:
+        autosave.append(*game_history.record(-1))
+    if range_index is not None:
+        range_index.append(outcome, game_history.record(-1)[1])
+    if history_db is not None:
+        history_db.add(len(game_history), *game_history.row(len(game_history) - 1))
+    history_pager.on_append()
     
     # Update displays (use try-except to prevent crashes)
     try:
         update_displays(result, result_color)
         
-        # Only update detailed history if history view is active
-        if current_view == "history":
-            dpg.configure_item("detailed_history", items=game_history[::-1])
+        # Only update detailed history if history view is active (one page of rows);
+        # a replay refreshes it once per frame instead
+        if current_view == "history" and replay_run is None:
+            refresh_history_view()
     except Exception as e:
         print(f"Error updating displays: {e}")
-        dpg.configure_item("status_text", default_value=f"Error: {str(e)}", color=COLORS["lose"])
+        ui.set("status_text", default_value=f"Error: {str(e)}", color=COLORS["lose"])
 
 # Function to update all displays
+@profiler.timed("update_displays")
 def update_displays(result="", result_color=COLORS["text"]):
     try:
-        # Helper function to safely configure items
-        def safe_configure_item(tag, **kwargs):
-            try:
-                if dpg.does_item_exist(tag):
-                    dpg.configure_item(tag, **kwargs)
-            except Exception as e:
-                print(f"Error configuring item {tag}: {e}")
-        
-        # Update result
-        if not result:
-            safe_configure_item("result_text", default_value=last_result)
-        else:
-            safe_configure_item("result_text", default_value=last_result)
-            safe_configure_item("result_outcome", default_value=result, color=result_color)
-        
-        # Update score
-        player_color = COLORS["win"] if player_score > computer_score else COLORS["text"]
-        computer_color = COLORS["lose"] if player_score > computer_score else COLORS["text"]
-        if player_score == computer_score:
-            player_color = computer_color = COLORS["draw"]
-        
-        safe_configure_item("player_score", default_value=str(player_score), color=player_color)
-        safe_configure_item("computer_score", default_value=str(computer_score), color=computer_color)
-        
-        # Update statistics
-        safe_configure_item("win_percentage", default_value=f"Win Rate: {win_percentage:.1f}%")
-        safe_configure_item("draw_percentage", default_value=f"Draw Rate: {draw_percentage:.1f}%")
-        safe_configure_item("total_rounds_text", default_value=f"Total Rounds: {total_rounds}")
-        
-        # Only update history in game view (detailed history updated separately)
-        if game_history:
-            safe_configure_item("history_list", items=game_history[-8:][::-1])  # Show only last 8 entries for better performance
+        queue_game_displays(ui, stats, game_history, last_result, result, result_color)
     except Exception as e:
         print(f"Error in update_displays: {e}")
 
 # Function to switch views
+@profiler.timed("switch_view")
 def switch_view(sender, app_data, user_data):
     global current_view
     current_view = user_data
     
     try:
+        # Build the view the first time it is opened
+        if not dpg.does_item_exist(f"{user_data}_view"):
+            VIEW_BUILDERS[user_data]()
+            ui.invalidate()
+        
         # Hide all views
-        dpg.configure_item("game_view", show=False)
-        dpg.configure_item("stats_view", show=False)
-        dpg.configure_item("history_view", show=False)
-        dpg.configure_item("settings_view", show=False)
+        for view in ["game", "stats", "history", "settings"]:
+            if dpg.does_item_exist(f"{view}_view"):
+                dpg.configure_item(f"{view}_view", show=False)
         
         # Show selected view
         dpg.configure_item(f"{user_data}_view", show=True)
@@ -345,45 +591,306 @@ def switch_view(sender, app_data, user_data):
         
         # Update view-specific data
         if user_data == "history":
-            dpg.configure_item("detailed_history", items=game_history[::-1])
-        elif user_data == "stats" and total_rounds > 0:
+            refresh_history_view()
+        elif user_data == "stats" and stats.total > 0:
             update_statistics_view()
     except Exception as e:
         print(f"Error switching views: {e}")
-        dpg.configure_item("status_text", default_value=f"Error: {str(e)}", color=COLORS["lose"])
+        ui.set("status_text", default_value=f"Error: {str(e)}", color=COLORS["lose"])
 
 # New function to update stats view separately (for better performance)
+@profiler.timed("update_statistics_view")
 def update_statistics_view():
-    if total_rounds == 0:
+    if stats.total == 0:
+        refresh_trend_plots()  # clears the plots after a reset
+        refresh_range_view()
         return
         
     try:
-        dpg.configure_item("stats_player_wins", default_value=str(player_score))
-        dpg.configure_item("stats_win_rate", default_value=f"{win_percentage:.1f}%")
-        
-        dpg.configure_item("stats_computer_wins", default_value=str(computer_score))
-        computer_win_rate = (computer_score / total_rounds) * 100
-        dpg.configure_item("stats_computer_win_rate", default_value=f"{computer_win_rate:.1f}%")
-        
-        dpg.configure_item("stats_total_rounds", default_value=str(total_rounds))
-        draws = total_rounds - player_score - computer_score
-        dpg.configure_item("stats_draws", default_value=str(draws))
-        dpg.configure_item("stats_draw_rate", default_value=f"{draw_percentage:.1f}%")
-        
-        # Calculate favorite choice if there's history
-        if game_history:
-            choices_count = {"Rock": 0, "Paper": 0, "Scissors": 0}
-            # Only process the last 50 games for performance
-            for entry in game_history[-50:]:
-                for choice in CHOICES:
-                    if f"You: {choice}" in entry:
-                        choices_count[choice] += 1
-            
-            favorite = max(choices_count, key=choices_count.get)
-            dpg.configure_item("stats_fav_choice", default_value=f"{favorite} ({choices_count[favorite]} times)")
+        ui.set("stats_player_wins", default_value=str(stats.wins))
+        ui.set("stats_win_rate", default_value=f"{stats.win_rate:.1f}%")
+        
+        ui.set("stats_computer_wins", default_value=str(stats.losses))
+        ui.set("stats_computer_win_rate", default_value=f"{stats.loss_rate:.1f}%")
+        
+        ui.set("stats_total_rounds", default_value=str(stats.total))
+        ui.set("stats_draws", default_value=str(stats.draws))
+        ui.set("stats_draw_rate", default_value=f"{stats.draw_rate:.1f}%")
+        
+        # Favourite choices over the whole session
+        favorite, count = stats.favourite()
+        ui.set("stats_fav_choice", default_value=f"{rules.choices[favorite]} ({count} times)")
+        favorite, count = stats.favourite(computer=True)
+        ui.set("stats_computer_fav_choice", default_value=f"{rules.choices[favorite]} ({count} times)")
+        
+        # Streaks
+        streak_name = engine.RESULTS[stats.streak_outcome]
+        ui.set("stats_current_streak", default_value=f"{stats.streak_length} x {streak_name}")
+        ui.set("stats_longest_win_streak", default_value=str(stats.longest_streaks[engine.WIN]))
+        ui.set("stats_longest_loss_streak", default_value=str(stats.longest_streaks[engine.LOSE]))
+        
+        # Player choice vs computer choice matrix
+        if rules.size <= MATRIX_MAX_CHOICES:
+            for p in range(rules.size):
+                for c in range(rules.size):
+                    ui.set(f"stats_matrix_{p}_{c}", default_value=str(stats.matrix[p][c]))
+        
+        refresh_range_view()
+        refresh_behaviour_view()
+        refresh_trend_plots()
     except Exception as e:
         print(f"Error updating statistics: {e}")
 
+# Function to show the outcome counts for the selected rounds or time window
+@profiler.timed("refresh_range_view")
+def refresh_range_view(sender=None, app_data=None, user_data=None):
+    if range_index is None:
+        return
+    seconds = RANGE_MODES.get(dpg.get_value("stats_range_mode"))
+    if seconds is None:
+        counts = range_index.rounds(dpg.get_value("stats_range_first") - 1, dpg.get_value("stats_range_last"))
+    else:
+        counts = range_index.between(int(time.time()) - seconds)
+    total = sum(counts)
+    ui.set("stats_range_rounds", default_value=f"{total:,}")
+    for outcome, name in ((engine.WIN, "wins"), (engine.LOSE, "losses"), (engine.DRAW, "draws")):
+        rate = 100.0 * counts[outcome] / total if total else 0
+        ui.set(f"stats_range_{name}", default_value=f"{counts[outcome]:,} ({rate:.1f}%)")
+
+# Function to format a rate that may be undefined (no rounds after that outcome yet)
+def format_rate(rate):
+    return "N/A" if rate is None else f"{rate:.1f}%"
+
+# Function to format a chi-squared test result
+def format_test(result):
+    stat, dof, p = result
+    if dof == 0:
+        return "N/A"
+    verdict = "not random" if p < 0.05 else "no pattern found"
+    return f"{stat:.1f} on {dof} dof, p = {p:.3f} ({verdict})"
+
+# Function to show how the player picks moves over the selected window of rounds
+@profiler.timed("refresh_behaviour_view")
+def refresh_behaviour_view(sender=None, app_data=None, user_data=None):
+    if analytics is None or analytics.rounds == 0:
+        return
+    count = BEHAVIOUR_WINDOWS.get(dpg.get_value("stats_behaviour_window"))
+    window = analytics.window() if count is None else analytics.last(count)
+    ui.set("stats_win_stay", default_value=format_rate(window.win_stay_rate))
+    ui.set("stats_lose_shift", default_value=format_rate(window.lose_shift_rate))
+    previous, move, times = window.top_transition()
+    if times:
+        ui.set("stats_top_transition",
+               default_value=f"{rules.choices[previous]} -> {rules.choices[move]} ({times} times)")
+    average = window.average_run
+    ui.set("stats_average_run", default_value="N/A" if average is None else f"{average:.2f} rounds")
+    bits, most = window.entropy()
+    ui.set("stats_entropy", default_value=f"{bits:.2f} of {most:.2f} bits")
+    ui.set("stats_conditional_entropy", default_value=f"{window.conditional_entropy():.2f} bits")
+    ui.set("stats_balance", default_value=format_test(window.chi_squared()))
+    ui.set("stats_independence", default_value=format_test(window.transition_chi_squared()))
+
+# Function to redraw the trend plots when new rounds came in (at most PLOT_POINTS points per series)
+@profiler.timed("refresh_trend_plots")
+def refresh_trend_plots():
+    global plotted_version
+    if outcome_series is None or outcome_series.version == plotted_version:
+        return
+    plotted_version = outcome_series.version
+    for name, (x, y) in outcome_series.plot_data().items():
+        ui.set(f"trend_{name}_series", x=x, y=y)
+
+# Function to fill the history table with the visible page of rounds
+@profiler.timed("refresh_history_view")
+def refresh_history_view():
+    rows = history_pager.visible()
+    for r in range(PAGE_ROWS):
+        if r < len(rows):
+            player, computer, outcome, timestamp = game_history.row(rows[r])
+            values = [str(rows[r] + 1), format_clock(timestamp), rules.choices[player], rules.choices[computer],
+                      engine.RESULTS[outcome]]
+            color = OUTCOME_COLORS[outcome]
+        else:
+            values = [""] * 5
+            color = COLORS["text"]
+        for col, value in enumerate(values):
+            ui.set(f"history_cell_{r}_{col}", default_value=value)
+        ui.set(f"history_cell_{r}_4", color=color)
+    
+    filtered = " (filtered)" if history_pager.filtered else ""
+    ui.set("history_page_text",
+                       default_value=f"Page {history_pager.page} of {history_pager.page_count} - "
+                                     f"{history_pager.count:,} rounds{filtered}")
+
+# Function to page the history from the SQLite store while it is in sync with the history,
+# and from memory while it is still copying rounds in
+def choose_history_pager():
+    global history_pager
+    if history_db.ready == isinstance(history_pager, DBHistoryPager):
+        return
+    if history_db.ready:
+        pager = DBHistoryPager(history_db, game_history, PAGE_ROWS)
+    else:
+        pager = HistoryPager(game_history, PAGE_ROWS)
+    pager.set_filter(history_pager.outcome, history_pager.player, history_pager.computer, history_pager.since)
+    history_pager = pager
+    if dpg.does_item_exist("history_view"):
+        refresh_history_view()
+
+# Function to insert queued rounds into the store, switch pagers and report a failed copy (called from the render loop)
+def poll_history_db():
+    global history_db_error
+    history_db.poll()
+    choose_history_pager()
+    if history_db.error is not history_db_error:
+        history_db_error = history_db.error
+        if history_db_error is not None:
+            ui.set("status_text", default_value=f"History database copy failed, paging from memory: "
+                                                f"{str(history_db_error)}", color=COLORS["lose"])
+
+# Function to move between history pages
+@profiler.timed("history_page")
+def history_page(sender, app_data, user_data):
+    if user_data == "latest":
+        history_pager.show_latest()
+    elif user_data == "newer":
+        history_pager.newer()
+    elif user_data == "older":
+        history_pager.older()
+    else:
+        history_pager.show_oldest()
+    refresh_history_view()
+
+# Function to jump to a round number
+@profiler.timed("history_jump")
+def history_jump(sender, app_data, user_data):
+    history_pager.jump_to_round(dpg.get_value("history_jump_input"))
+    refresh_history_view()
+
+# Function to apply the history filters
+@profiler.timed("history_filter")
+def history_filter(sender, app_data, user_data):
+    player = dpg.get_value("history_filter_player")
+    computer = dpg.get_value("history_filter_computer")
+    window = TIME_FILTERS[dpg.get_value("history_filter_time")]
+    history_pager.set_filter(outcome=OUTCOME_FILTERS[dpg.get_value("history_filter_outcome")],
+                             player=rules.index.get(player),
+                             computer=rules.index.get(computer),
+                             since=int(time.time()) - window if window is not None else None)
+    refresh_history_view()
+
+# Function to start a strategy tournament (includes this session's moves as a human player)
+@profiler.timed("start_tournament")
+def start_tournament():
+    global tournament_run
+    if tournament_run is not None and not tournament_run.done:
+        return
+    if autosave is not None and autosave.pending:
+        autosave.checkpoint()  # the tournament reads the session log, so bring it up to date
+    human_logs = [SESSION_LOG] if len(game_history) and autosave is not None and os.path.exists(SESSION_LOG) else []
+    tournament_run = tournament.TournamentProcess(TOURNAMENT_ROUNDS, human_logs, rules=rules)
+    ui.set("tournament_status", default_value="Running...")
+
+# Function to check on a running tournament (called from the render loop)
+def poll_tournament():
+    global tournament_run
+    if not tournament_run.done:
+        ui.set("tournament_status", default_value=f"Running... {tournament_run.progress} shards")
+        return
+    if tournament_run.failed:
+        ui.set("tournament_status", default_value="Tournament failed")
+    else:
+        try:
+            show_tournament_results(tournament.load_results(tournament_run.out))
+        except (OSError, ValueError, KeyError) as e:
+            ui.set("tournament_status", default_value=f"Could not read results: {str(e)}")
+    tournament_run = None
+
+# Function to show tournament results as a win-rate matrix (only for the variant being played)
+def show_tournament_results(result):
+    result_rules = result.get("rules", engine.CLASSIC.name)  # older results files were all classic
+    if result_rules != rules.name:
+        ui.set("tournament_status", default_value=f"Ignored {result_rules} results (playing {rules.name})")
+        return
+    players = result["players"]
+    dpg.delete_item("tournament_table", children_only=True)
+    dpg.add_table_column(label="vs", parent="tournament_table")
+    for i in range(len(players)):
+        dpg.add_table_column(label=str(i), parent="tournament_table")
+    for i, name in enumerate(players):
+        with dpg.table_row(parent="tournament_table"):
+            dpg.add_text(f"{i}: {name}")
+            for rate in result["win_rate"][i]:
+                dpg.add_text("-" if rate is None else f"{rate * 100:.1f}%")
+    ui.set("tournament_status", default_value=f"{result_rules}: {result['total_rounds']:,} rounds in "
+                                              f"{result['elapsed']:.1f}s on {result['workers']} workers")
+
+# Function to change the computer opponent
+@profiler.timed("set_opponent")
+def set_opponent(sender, app_data, user_data):
+    global opponent
+    try:
+        if server is not None:
+            server.set_opponent(app_data)
+        opponent = build_opponent(app_data, rng=session_rng, budget_us=OPPONENT_BUDGET_US, rules=rules)
+        if recorder is not None:
+            recorder.opponent(app_data)
+        ui.set("status_text", default_value=f"Opponent: {app_data}", color=COLORS["win"])
+    except (OpponentTooSlow, OSError, ValueError, ServerError) as e:
+        dpg.set_value(sender, opponent.name)
+        ui.set("status_text", default_value=f"Opponent rejected: {str(e)}", color=COLORS["lose"])
+
+# Function to switch to another game variant (starts a new game)
+@profiler.timed("set_rules")
+def set_rules(sender, app_data, user_data):
+    global rules
+    if app_data == rules.name:
+        return
+    # Nothing changes unless the server could start the new game (the rounds would be coded for the old rules)
+    if not reset_server(app_data):
+        dpg.set_value(sender, rules.name)
+        return
+    rules = engine.RULESETS[app_data]
+    
+    # Views that list the choices are built again for the new rule set on next use
+    for view in ["stats", "history"]:
+        if dpg.does_item_exist(f"{view}_view"):
+            dpg.delete_item(f"{view}_view")
+    build_choice_buttons()
+    history_pager.set_filter()
+    ui.invalidate()
+    ui.forget()
+    
+    start_new_game()
+    ui.set("status_text", default_value=f"Rule set: {rules.name} (new game started)", color=COLORS["win"])
+
+# Function to toggle the idle frame rate
+@profiler.timed("set_power_saving")
+def set_power_saving(sender, app_data, user_data):
+    pacer.enabled = app_data
+    pacer.activity()
+
+# Function to show the measured CPU use in the settings view
+def update_power_stats():
+    ui.set("power_stats_text", default_value=pacer.report())
+
+# Function to show or hide the profiler window (profiling is on while it is shown)
+def toggle_profiler():
+    if not dpg.does_item_exist("profiler_window"):
+        build_profiler_window(profiler, dump_profile)
+        ui.invalidate()
+    show = not dpg.is_item_shown("profiler_window")
+    dpg.configure_item("profiler_window", show=show)
+    profiler.enabled = show or os.environ.get("RPS_PROFILE", "") == "1"
+
+# Function to write the raw profiler samples to a file
+def dump_profile():
+    try:
+        profiler.dump(PROFILE_FILE)
+        ui.set("status_text", default_value=f"Profile samples saved to {PROFILE_FILE}", color=COLORS["win"])
+    except OSError as e:
+        ui.set("status_text", default_value=f"Error saving profile: {str(e)}", color=COLORS["lose"])
+
 # Create theme
 with dpg.theme() as global_theme:
     with dpg.theme_component(dpg.mvAll):
@@ -412,6 +919,13 @@ with dpg.theme() as active_button_theme:
         dpg.add_theme_color(dpg.mvThemeCol_ButtonActive, COLORS["primary"])
         dpg.add_theme_style(dpg.mvStyleVar_FrameRounding, 0)
 
+# Function to create a theme that colors a plot line
+def line_theme(color):
+    with dpg.theme() as theme:
+        with dpg.theme_component(dpg.mvLineSeries):
+            dpg.add_theme_color(dpg.mvPlotCol_Line, color, category=dpg.mvThemeCat_Plots)
+    return theme
+
 # Create viewport
 dpg.create_viewport(title="Rock Paper Scissors Dashboard", width=1200, height=800)
 dpg.bind_theme(global_theme)
@@ -419,6 +933,327 @@ dpg.bind_theme(global_theme)
 # Setup viewport configuration for fullscreen
 dpg.configure_viewport(0, maximized=True)
 
+# Functions to build the views that start hidden (built on first switch_view)
+def build_stats_view():
+    global outcome_series, plotted_version, analytics, range_index
+    if outcome_series is None:
+        outcome_series = OutcomeSeries()
+        outcome_series.record_batch(game_history.outcomes())
+    if analytics is None:
+        analytics = Analytics(rules)
+        analytics.record_batch(game_history.players(), game_history.outcomes())
+    if range_index is None:
+        range_index = RangeIndex(game_history)
+        range_index.extend(game_history.outcomes(), game_history.timestamps())
+    plotted_version = None
+    
+    with dpg.child_window(tag="stats_view", parent="content_area", show=False, border=False):
+        dpg.add_text("GAME STATISTICS", color=COLORS["accent"])
+        dpg.add_separator()
+        
+        with dpg.group(horizontal=True):
+            # Player stats
+            with dpg.child_window(width=350, height=300, label="Player Stats"):
+                dpg.add_text("Player Performance", color=COLORS["accent"])
+                dpg.add_separator()
+                
+                with dpg.group():
+                    with dpg.group(horizontal=True):
+                        dpg.add_text("Wins:", color=COLORS["win"])
+                        dpg.add_spacer(width=10)
+                        dpg.add_text("0", tag="stats_player_wins", color=COLORS["win"])
+                    
+                    with dpg.group(horizontal=True):
+                        dpg.add_text("Win Rate:", color=COLORS["win"])
+                        dpg.add_spacer(width=10)
+                        dpg.add_text("0%", tag="stats_win_rate", color=COLORS["win"])
+                    
+                    with dpg.group(horizontal=True):
+                        dpg.add_text("Favorite Choice:", color=COLORS["text"])
+                        dpg.add_spacer(width=10)
+                        dpg.add_text("N/A", tag="stats_fav_choice", color=COLORS["text"])
+            
+            # Computer stats
+            with dpg.child_window(width=350, height=300, label="Computer Stats"):
+                dpg.add_text("Computer Performance", color=COLORS["accent"])
+                dpg.add_separator()
+                
+                with dpg.group():
+                    with dpg.group(horizontal=True):
+                        dpg.add_text("Wins:", color=COLORS["lose"])
+                        dpg.add_spacer(width=10)
+                        dpg.add_text("0", tag="stats_computer_wins", color=COLORS["lose"])
+                    
+                    with dpg.group(horizontal=True):
+                        dpg.add_text("Win Rate:", color=COLORS["lose"])
+                        dpg.add_spacer(width=10)
+                        dpg.add_text("0%", tag="stats_computer_win_rate", color=COLORS["lose"])
+                    
+                    with dpg.group(horizontal=True):
+                        dpg.add_text("Favorite Choice:", color=COLORS["text"])
+                        dpg.add_spacer(width=10)
+                        dpg.add_text("N/A", tag="stats_computer_fav_choice", color=COLORS["text"])
+        
+        # Game summary
+        with dpg.child_window(width=-1, height=200, label="Game Summary"):
+            dpg.add_text("Overall Game Statistics", color=COLORS["accent"])
+            dpg.add_separator()
+            
+            with dpg.table(header_row=True):
+                dpg.add_table_column(label="Statistic")
+                dpg.add_table_column(label="Value")
+                
+                with dpg.table_row():
+                    dpg.add_text("Total Rounds")
+                    dpg.add_text("0", tag="stats_total_rounds")
+                
+                with dpg.table_row():
+                    dpg.add_text("Draws")
+                    dpg.add_text("0", tag="stats_draws")
+                
+                with dpg.table_row():
+                    dpg.add_text("Draw Rate")
+                    dpg.add_text("0%", tag="stats_draw_rate")
+                
+                with dpg.table_row():
+                    dpg.add_text("Current Streak")
+                    dpg.add_text("N/A", tag="stats_current_streak")
+                
+                with dpg.table_row():
+                    dpg.add_text("Longest Win Streak")
+                    dpg.add_text("0", tag="stats_longest_win_streak")
+                
+                with dpg.table_row():
+                    dpg.add_text("Longest Losing Streak")
+                    dpg.add_text("0", tag="stats_longest_loss_streak")
+        
+        # Player choice vs computer choice
+        matrix_rows = rules.size if rules.size <= MATRIX_MAX_CHOICES else 1
+        with dpg.child_window(width=-1, height=75 + 25 * matrix_rows, label="Choice Matrix"):
+            dpg.add_text("Your Choice vs Computer Choice", color=COLORS["accent"])
+            dpg.add_separator()
+            
+            if rules.size > MATRIX_MAX_CHOICES:
+                dpg.add_text(f"The matrix is only shown for games with up to {MATRIX_MAX_CHOICES} choices.")
+            else:
+                with dpg.table(header_row=True):
+                    dpg.add_table_column(label="You / CPU")
+                    for choice in rules.choices:
+                        dpg.add_table_column(label=choice)
+                    
+                    for p, choice in enumerate(rules.choices):
+                        with dpg.table_row():
+                            dpg.add_text(choice)
+                            for c in range(rules.size):
+                                dpg.add_text("0", tag=f"stats_matrix_{p}_{c}")
+        
+        # Outcomes over a range of rounds or a recent time window
+        with dpg.child_window(width=-1, height=190, label="Range"):
+            with dpg.group(horizontal=True):
+                dpg.add_text("Range Statistics", color=COLORS["accent"])
+                dpg.add_spacer(width=20)
+                dpg.add_combo(list(RANGE_MODES), default_value="Rounds", tag="stats_range_mode",
+                              callback=refresh_range_view, width=160)
+                dpg.add_text("From round")
+                dpg.add_input_int(tag="stats_range_first", default_value=1, min_value=1, min_clamped=True,
+                                  callback=refresh_range_view, width=120)
+                dpg.add_text("to")
+                dpg.add_input_int(tag="stats_range_last", default_value=1000, min_value=1, min_clamped=True,
+                                  callback=refresh_range_view, width=120)
+            dpg.add_separator()
+            
+            with dpg.table(header_row=True):
+                dpg.add_table_column(label="Statistic")
+                dpg.add_table_column(label="Value")
+                
+                for field, label in (("rounds", "Rounds in Range"), ("wins", "Your Wins"),
+                                     ("losses", "Computer Wins"), ("draws", "Draws")):
+                    with dpg.table_row():
+                        dpg.add_text(label)
+                        dpg.add_text("0", tag=f"stats_range_{field}")
+        
+        # How the player picks moves
+        with dpg.child_window(width=-1, height=290, label="Player Behaviour"):
+            with dpg.group(horizontal=True):
+                dpg.add_text("Player Behaviour", color=COLORS["accent"])
+                dpg.add_spacer(width=20)
+                dpg.add_combo(list(BEHAVIOUR_WINDOWS), default_value="Whole session", tag="stats_behaviour_window",
+                              callback=refresh_behaviour_view, width=160)
+            dpg.add_separator()
+            
+            with dpg.table(header_row=True):
+                dpg.add_table_column(label="Measure")
+                dpg.add_table_column(label="Value")
+                
+                for field, label in (("win_stay", "Win-Stay Rate"), ("lose_shift", "Lose-Shift Rate"),
+                                     ("top_transition", "Most Common Follow-Up"),
+                                     ("average_run", "Average Run of Repeated Moves"),
+                                     ("entropy", "Move Entropy"),
+                                     ("conditional_entropy", "Entropy Given the Previous Move"),
+                                     ("balance", "Choice Balance (chi-squared)"),
+                                     ("independence", "Move Independence (chi-squared)")):
+                    with dpg.table_row():
+                        dpg.add_text(label)
+                        dpg.add_text("N/A", tag=f"stats_{field}")
+        
+        # Rolling rates and score over the whole session
+        with dpg.child_window(width=-1, height=520, label="Trends"):
+            dpg.add_text(f"Rates over the last {ROLLING_WINDOW} rounds", color=COLORS["accent"])
+            dpg.add_separator()
+            with dpg.plot(height=230, width=-1):
+                dpg.add_plot_legend()
+                dpg.add_plot_axis(dpg.mvXAxis, label="Round", auto_fit=True)
+                with dpg.plot_axis(dpg.mvYAxis, label="%", auto_fit=True):
+                    for name, label, color in (("win", "Win", COLORS["win"]), ("loss", "Loss", COLORS["lose"]),
+                                               ("draw", "Draw", COLORS["draw"])):
+                        dpg.add_line_series([], [], label=label, tag=f"trend_{name}_series")
+                        dpg.bind_item_theme(f"trend_{name}_series", line_theme(color))
+            dpg.add_text("Score (your wins minus computer wins)", color=COLORS["accent"])
+            with dpg.plot(height=200, width=-1):
+                dpg.add_plot_axis(dpg.mvXAxis, label="Round", auto_fit=True)
+                with dpg.plot_axis(dpg.mvYAxis, label="Score", auto_fit=True):
+                    dpg.add_line_series([], [], label="Score", tag="trend_score_series")
+                    dpg.bind_item_theme("trend_score_series", line_theme(COLORS["accent"]))
+        
+        # Strategy tournament (runs headless in a separate process)
+        with dpg.child_window(width=-1, height=300, label="Strategy Tournament"):
+            dpg.add_text("Strategy Tournament (row win rate vs column)", color=COLORS["accent"])
+            dpg.add_separator()
+            with dpg.group(horizontal=True):
+                dpg.add_button(label="Run Tournament", callback=start_tournament, width=150)
+                dpg.add_text("", tag="tournament_status")
+            dpg.add_table(header_row=True, tag="tournament_table")
+    
+    if os.path.exists(tournament.RESULTS_FILE):
+        try:
+            show_tournament_results(tournament.load_results())
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not load tournament results: {e}")
+
+def build_history_view():
+    with dpg.child_window(tag="history_view", parent="content_area", show=False, border=False):
+        dpg.add_text("GAME HISTORY", color=COLORS["accent"])
+        dpg.add_separator()
+        
+        # Filters
+        with dpg.group(horizontal=True):
+            dpg.add_text("Result:")
+            dpg.add_combo(list(OUTCOME_FILTERS), default_value="All", tag="history_filter_outcome",
+                          callback=history_filter, width=100)
+            dpg.add_text("You:")
+            dpg.add_combo(["Any"] + rules.choices, default_value="Any", tag="history_filter_player",
+                          callback=history_filter, width=100)
+            dpg.add_text("PC:")
+            dpg.add_combo(["Any"] + rules.choices, default_value="Any", tag="history_filter_computer",
+                          callback=history_filter, width=100)
+            dpg.add_text("When:")
+            dpg.add_combo(list(TIME_FILTERS), default_value="Any time", tag="history_filter_time",
+                          callback=history_filter, width=120)
+        
+        # Full history display, one page of rows at a time
+        dpg.add_text("Complete Match History:", color=COLORS["text"])
+        with dpg.table(header_row=True, tag="detailed_history", row_background=True):
+            for label in ["Round", "Time", "You", "PC", "Result"]:
+                dpg.add_table_column(label=label)
+            for r in range(PAGE_ROWS):
+                with dpg.table_row():
+                    for col in range(5):
+                        dpg.add_text("", tag=f"history_cell_{r}_{col}")
+        
+        # Paging
+        with dpg.group(horizontal=True):
+            dpg.add_button(label="<< Latest", callback=history_page, user_data="latest", width=80)
+            dpg.add_button(label="< Newer", callback=history_page, user_data="newer", width=80)
+            dpg.add_button(label="Older >", callback=history_page, user_data="older", width=80)
+            dpg.add_button(label="Oldest >>", callback=history_page, user_data="oldest", width=80)
+            dpg.add_spacer(width=10)
+            dpg.add_text("", tag="history_page_text")
+        
+        with dpg.group(horizontal=True):
+            dpg.add_text("Jump to round:")
+            dpg.add_input_int(tag="history_jump_input", default_value=1, min_value=1, min_clamped=True,
+                              width=120, on_enter=True, callback=history_jump)
+            dpg.add_button(label="Go", callback=history_jump, width=50)
+        
+        dpg.add_spacer(height=10)
+        
+        # Export options
+        with dpg.group(horizontal=True):
+            dpg.add_button(label="Export History to Excel", callback=save_to_excel, width=200, height=30)
+            dpg.add_spacer(width=10)
+            dpg.add_button(label="Export History to CSV", callback=save_to_csv, width=200, height=30)
+            dpg.add_spacer(width=10)
+            dpg.add_button(label="Clear History", callback=reset_game, width=150, height=30)
+        
+        # Import options (also used by the sidebar's Import button)
+        with dpg.group(horizontal=True):
+            dpg.add_text("Import:")
+            dpg.add_combo(["All rounds", "Last N rounds", "Round range"], default_value="All rounds",
+                          tag="import_mode", width=140)
+            dpg.add_text("N:")
+            dpg.add_input_int(tag="import_last", default_value=1000, min_value=1, min_clamped=True, width=100)
+            dpg.add_text("Rounds:")
+            dpg.add_input_int(tag="import_first", default_value=1, min_value=1, min_clamped=True, width=100)
+            dpg.add_text("to")
+            dpg.add_input_int(tag="import_to", default_value=1000, min_value=1, min_clamped=True, width=100)
+            dpg.add_button(label="Import from Excel", callback=load_from_excel, width=150)
+        
+        # Append round logs from other stations (same columns as the exports)
+        with dpg.group(horizontal=True):
+            dpg.add_text("Append logs:")
+            dpg.add_input_text(tag="ingest_paths", hint="logs/*.csv; station2.xlsx", width=400)
+            dpg.add_button(label="Append", callback=start_ingest, width=100)
+            dpg.add_button(label="Cancel Import", callback=cancel_ingest, tag="cancel_ingest_button", show=False,
+                           width=120)
+
+def build_settings_view():
+    with dpg.child_window(tag="settings_view", parent="content_area", show=False, border=False):
+        dpg.add_text("SETTINGS", color=COLORS["accent"])
+        dpg.add_separator()
+        
+        dpg.add_text("Game Settings", color=COLORS["text"])
+        
+        # Game variant
+        with dpg.group(horizontal=True):
+            dpg.add_text("Rule set:")
+            dpg.add_combo(list(engine.RULESETS), default_value=rules.name, callback=set_rules, width=200)
+        dpg.add_text("Changing the rule set starts a new game.")
+        
+        # Opponent
+        with dpg.group(horizontal=True):
+            dpg.add_text("Computer opponent:")
+            dpg.add_combo(list(STRATEGIES), default_value=opponent.name, callback=set_opponent, width=200)
+        
+        # Power saving
+        dpg.add_checkbox(label="Power saving when idle", default_value=pacer.enabled,
+                         callback=set_power_saving)
+        dpg.add_text("", tag="power_stats_text")
+        
+        dpg.add_separator()
+        
+        # About section
+        dpg.add_text("About this Application", color=COLORS["accent"])
+        dpg.add_text("Rock Paper Scissors Dashboard")
+        dpg.add_text("A simple game with statistics tracking and Excel export.")
+
+# Function to build one button per choice of the current rule set
+def build_choice_buttons():
+    dpg.delete_item("choice_buttons", children_only=True)
+    per_row = 1 if rules.size <= 5 else 3
+    width, height = (350, 70) if per_row == 1 else (112, 40)
+    for start in range(0, rules.size, per_row):
+        with dpg.group(horizontal=True, parent="choice_buttons"):
+            for choice in rules.choices[start:start + per_row]:
+                label = f"{ICONS[choice]} {choice}" if choice in ICONS else choice
+                dpg.add_button(label=label, callback=play_round, user_data=choice, width=width, height=height)
+        dpg.add_spacer(height=10, parent="choice_buttons")
+
+VIEW_BUILDERS = {
+    "stats": build_stats_view,
+    "history": build_history_view,
+    "settings": build_settings_view
+}
+
 # Main window
 with dpg.window(label="Rock Paper Scissors Dashboard", tag="primary_window", no_resize=True, no_close=True, no_collapse=True, no_move=True):
     # Main layout (sidebar + content area)
@@ -444,16 +1279,19 @@ with dpg.window(label="Rock Paper Scissors Dashboard", tag="primary_window", no_
             
             dpg.add_spacer(height=20)
             
-            # Excel Export/Import
+            # Excel Export/Import (rounds are saved to the session log as they are played)
             dpg.add_text("DATA", color=COLORS["accent"])
             dpg.add_separator()
-            dpg.add_button(label=f"{ICONS['Export']} Save to Excel", callback=save_to_excel, width=-1, height=30)
-            dpg.add_button(label="📥 Load from Excel", callback=load_from_excel, width=-1, height=30)
+            dpg.add_button(label=f"{ICONS['Export']} Export to Excel", callback=save_to_excel, width=-1, height=30)
+            dpg.add_button(label="📥 Import from Excel", callback=load_from_excel, width=-1, height=30)
+            dpg.add_button(label="⏹ Cancel Export", callback=cancel_export, width=-1, height=30,
+                           tag="cancel_export_button", show=False)
             
             dpg.add_spacer(height=20)
             dpg.add_text("Actions", color=COLORS["accent"])
             dpg.add_separator()
             dpg.add_button(label="🔄 Reset Game", callback=reset_game, width=-1, height=30)
+            dpg.add_button(label="🐞 Profiler", callback=toggle_profiler, width=-1, height=30)
             dpg.add_button(label="❌ Exit", callback=lambda: sys.exit(0), width=-1, height=30)
             
             # Status text at the bottom of sidebar
@@ -472,12 +1310,9 @@ with dpg.window(label="Rock Paper Scissors Dashboard", tag="primary_window", no_
                             dpg.add_text("Choose your weapon:", color=COLORS["text"])
                             dpg.add_spacer(height=10)
                             
-                            # Choice buttons with icons
-                            for choice in CHOICES:
-                                with dpg.group(horizontal=True):
-                                    dpg.add_button(label=f"{ICONS[choice]} {choice}", callback=play_round, 
-                                                  user_data=choice, width=350, height=70)
-                                dpg.add_spacer(height=10)
+                            # Choice buttons with icons (one per choice of the rule set)
+                            dpg.add_group(tag="choice_buttons")
+                            build_choice_buttons()
                             
                             dpg.add_separator()
                             
@@ -516,127 +1351,160 @@ with dpg.window(label="Rock Paper Scissors Dashboard", tag="primary_window", no_
                                 dpg.add_spacer(width=40)
                                 dpg.add_text(f"Draw Rate: 0%", tag="draw_percentage", color=COLORS["draw"])
                                 dpg.add_spacer(width=40)
-                                dpg.add_text(f"Total Rounds: {total_rounds}", tag="total_rounds", color=COLORS["text"])
+                                dpg.add_text(f"Total Rounds: {stats.total}", tag="total_rounds_text", color=COLORS["text"])
                         
                         # Recent History section
                         with dpg.collapsing_header(label="Recent Matches", default_open=True):
                             dpg.add_text("Recent matches:", color=COLORS["text"])
                             dpg.add_listbox(items=[], tag="history_list", width=-1, num_items=8)
-            
-            # Statistics View
-            with dpg.child_window(tag="stats_view", show=False, border=False):
-                dpg.add_text("GAME STATISTICS", color=COLORS["accent"])
-                dpg.add_separator()
-                
-                with dpg.group(horizontal=True):
-                    # Player stats
-                    with dpg.child_window(width=350, height=300, label="Player Stats"):
-                        dpg.add_text("Player Performance", color=COLORS["accent"])
-                        dpg.add_separator()
-                        
-                        with dpg.group():
-                            with dpg.group(horizontal=True):
-                                dpg.add_text("Wins:", color=COLORS["win"])
-                                dpg.add_spacer(width=10)
-                                dpg.add_text("0", tag="stats_player_wins", color=COLORS["win"])
-                            
-                            with dpg.group(horizontal=True):
-                                dpg.add_text("Win Rate:", color=COLORS["win"])
-                                dpg.add_spacer(width=10)
-                                dpg.add_text("0%", tag="stats_win_rate", color=COLORS["win"])
-                            
-                            with dpg.group(horizontal=True):
-                                dpg.add_text("Favorite Choice:", color=COLORS["text"])
-                                dpg.add_spacer(width=10)
-                                dpg.add_text("N/A", tag="stats_fav_choice", color=COLORS["text"])
-                    
-                    # Computer stats
-                    with dpg.child_window(width=350, height=300, label="Computer Stats"):
-                        dpg.add_text("Computer Performance", color=COLORS["accent"])
-                        dpg.add_separator()
-                        
-                        with dpg.group():
-                            with dpg.group(horizontal=True):
-                                dpg.add_text("Wins:", color=COLORS["lose"])
-                                dpg.add_spacer(width=10)
-                                dpg.add_text("0", tag="stats_computer_wins", color=COLORS["lose"])
-                            
-                            with dpg.group(horizontal=True):
-                                dpg.add_text("Win Rate:", color=COLORS["lose"])
-                                dpg.add_spacer(width=10)
-                                dpg.add_text("0%", tag="stats_computer_win_rate", color=COLORS["lose"])
-                
-                # Game summary
-                with dpg.child_window(width=-1, height=200, label="Game Summary"):
-                    dpg.add_text("Overall Game Statistics", color=COLORS["accent"])
-                    dpg.add_separator()
-                    
-                    with dpg.table(header_row=True):
-                        dpg.add_table_column(label="Statistic")
-                        dpg.add_table_column(label="Value")
-                        
-                        with dpg.table_row():
-                            dpg.add_text("Total Rounds")
-                            dpg.add_text("0", tag="stats_total_rounds")
-                        
-                        with dpg.table_row():
-                            dpg.add_text("Draws")
-                            dpg.add_text("0", tag="stats_draws")
-                        
-                        with dpg.table_row():
-                            dpg.add_text("Draw Rate")
-                            dpg.add_text("0%", tag="stats_draw_rate")
-            
-            # History View
-            with dpg.child_window(tag="history_view", show=False, border=False):
-                dpg.add_text("GAME HISTORY", color=COLORS["accent"])
-                dpg.add_separator()
-                
-                # Full history display with filtering options
-                dpg.add_text("Complete Match History:", color=COLORS["text"])
-                dpg.add_listbox(items=[], tag="detailed_history", width=-1, num_items=15)
-                
-                # Export options
-                with dpg.group(horizontal=True):
-                    dpg.add_button(label="Export History to Excel", callback=save_to_excel, width=200, height=30)
-                    dpg.add_spacer(width=10)
-                    dpg.add_button(label="Clear History", callback=reset_game, width=150, height=30)
-            
-            # Settings View
-            with dpg.child_window(tag="settings_view", show=False, border=False):
-                dpg.add_text("SETTINGS", color=COLORS["accent"])
-                dpg.add_separator()
-                
-                dpg.add_text("Game Settings", color=COLORS["text"])
-                
-                # Placeholder for future settings
-                dpg.add_text("Settings will be available in future updates.")
-                
-                dpg.add_separator()
-                
-                # About section
-                dpg.add_text("About this Application", color=COLORS["accent"])
-                dpg.add_text("Rock Paper Scissors Dashboard")
-                dpg.add_text("A simple game with statistics tracking and Excel export.")
+
+if EAGER_VIEWS:
+    for build_view in VIEW_BUILDERS.values():
+        build_view()
+startup.mark("widgets built")
 
 # Setup and start
 dpg.setup_dearpygui()
 dpg.show_viewport()
 dpg.set_primary_window("primary_window", True)
+update_displays()
+if server is not None:
+    ui.set("status_text", default_value=f"Playing on {SERVER_ADDRESS} (session {server.session})")
+startup.mark("viewport shown")
+
+# Function to replay recorded inputs for one frame's budget (called from the render loop). Rounds go
+# through play_round as if they were clicked; the UI fields they touch are pushed once per frame.
+@profiler.timed("poll_replay")
+def poll_replay():
+    global replay_run, opponent
+    
+    deadline = time.perf_counter() + REPLAY_FRAME_BUDGET
+    for kind, value, payload in replay_run.take(deadline):
+        if kind == CHOICE:
+            play_round(None, None, rules.choices[value])
+        elif kind == SEED:
+            session_rng.seed(payload)
+        else:
+            opponent = STRATEGIES[STRATEGY_NAMES[value]](session_rng, rules)
+    if current_view == "history":
+        refresh_history_view()
+    if not replay_run.done:
+        ui.set("status_text", default_value=f"Replaying... {replay_run.progress * 100:.0f}% "
+                                            f"({replay_run.played:,} rounds)", color=COLORS["accent"])
+        return
+    
+    run, replay_run = replay_run, None
+    elapsed = time.perf_counter() - run.started_at
+    speed = run.played / elapsed if elapsed > 0 else 0
+    summary = (f"Replayed {run.played:,} rounds in {elapsed:.2f}s ({speed:,.0f} rounds/s, "
+               f"recorded over {run.recorded_ms / 1000:.0f}s), digest {digest(game_history)}")
+    print(summary)
+    ui.set("status_text", default_value=summary, color=COLORS["win"])
+    if REPLAY_EXIT:
+        dpg.stop_dearpygui()
+
+# Function to report the startup timeline once the first frame is on screen
+def finish_startup():
+    startup.mark("first frame rendered")
+    print(startup.report())
+    if startup.total_ms > STARTUP_BUDGET_MS:
+        print(f"Startup took {startup.total_ms:.0f} ms, over the {STARTUP_BUDGET_MS:.0f} ms budget")
+    try:
+        startup.save(STARTUP_TIMELINE_FILE)
+    except OSError as e:
+        print(f"Could not save startup timeline: {e}")
+
+# Any input brings the loop back to full frame rate
+with dpg.handler_registry():
+    dpg.add_mouse_move_handler(callback=pacer.activity)
+    dpg.add_mouse_click_handler(callback=pacer.activity)
+    dpg.add_mouse_wheel_handler(callback=pacer.activity)
+    dpg.add_key_press_handler(callback=pacer.activity)
+    dpg.add_key_press_handler(dpg.mvKey_F12, callback=toggle_profiler)
 
 # Main application loop
-last_stats_update = time.time()
+last_stats_update = 0
+last_stats_total = 0
+last_power_update = 0
+last_range_update = 0
+last_profiler_update = 0
+last_frame_ns = None
 update_interval = 0.5  # Update stats every 0.5 seconds at most
 
 while dpg.is_dearpygui_running():
     try:
-        # Only update stats periodically instead of every frame
-        current_time = time.time()
-        if current_view == "stats" and total_rounds > 0 and (current_time - last_stats_update) > update_interval:
-            update_statistics_view()
-            last_stats_update = current_time
-            
-        dpg.render_dearpygui_frame()
+        # Only update stats when they changed, and at most every update_interval
+        if current_view == "stats" and stats.total != last_stats_total:
+            current_time = time.monotonic()
+            if current_time - last_stats_update > update_interval:
+                update_statistics_view()
+                last_stats_update = current_time
+                last_stats_total = stats.total
+        elif current_view == "stats" and RANGE_MODES.get(dpg.get_value("stats_range_mode")) is not None:
+            # Time windows move on even when no rounds are played
+            current_time = time.monotonic()
+            if current_time - last_range_update > 1.0:
+                refresh_range_view()
+                last_range_update = current_time
+        elif current_view == "settings":
+            current_time = time.monotonic()
+            if current_time - last_power_update > 1.0:
+                update_power_stats()
+                last_power_update = current_time
+        
+        if profiler.enabled and dpg.does_item_exist("profiler_window") and dpg.is_item_shown("profiler_window"):
+            current_time = time.monotonic()
+            if current_time - last_profiler_update > 0.5:
+                refresh_profiler_window(profiler)
+                last_profiler_update = current_time
+        
+        if replay_run is not None:
+            poll_replay()
+        if export_job is not None:
+            poll_export()
+        if ingest_job is not None:
+            poll_ingest()
+        if tournament_run is not None:
+            poll_tournament()
+        if autosave is not None:
+            poll_autosave()
+        if history_db is not None:
+            poll_history_db()
+        with profiler.measure("ui_flush"):
+            ui.flush()
+        with profiler.measure("render_dearpygui_frame"):
+            dpg.render_dearpygui_frame()
+        if startup is not None:
+            finish_startup()
+            startup = None
+        
+        # Frame time is the interval between consecutive frames
+        if profiler.enabled:
+            frame_ns = time.perf_counter_ns()
+            if last_frame_ns is not None:
+                profiler.record("frame", (frame_ns - last_frame_ns) / 1e6)
+            last_frame_ns = frame_ns
+        else:
+            last_frame_ns = None
+        pacer.wait()
     except Exception as e:
+        # Keep running, but make the failure visible instead of only printing it
+        profiler.errors += 1
         print(f"Error in main loop: {e}")
+        traceback.print_exc()
+        ui.set("status_text", default_value=f"Error: {str(e)} (see console)", color=COLORS["lose"])
         time.sleep(0.1)  # Give the system some time to recover if there's an error
+
+print(pacer.report())
+if tournament_run is not None and not tournament_run.done:
+    tournament_run.cancel()
+if profiler.rings:
+    profiler.dump(PROFILE_FILE)
+if autosave is not None:
+    autosave.close()
+if recorder is not None:
+    recorder.close()
+if history_db is not None:
+    history_db.close()
+if server is not None:
+    server.close()
@@ -0,0 +1,229 @@
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+import engine
+from history import RoundHistory
+from roundlog import LogFormatError, load_history, record_format, save_log, sync_dir
+
+# Crash-safe, debounced saving of the local session.
+# The session log (a round log, see roundlog.py) is the checkpoint. It is
+# never modified in place: a background thread writes the whole session to a
+# temp file, syncs it and renames it over the old one. Rounds played since
+# the last checkpoint go to a small journal next to it, one record appended
+# per round. On startup the journal is replayed on top of the checkpoint.
+# Checkpoints are debounced: one is written once play has been quiet for a
+# moment (or has gone on for a while), so a burst of rounds costs a burst of
+# journal appends and a single checkpoint.
+#
+# The journal's header says how many rounds the checkpoint held when the
+# journal was started. If a crash lands between a new checkpoint and the new
+# journal, the rounds the checkpoint already has are skipped on replay. A
+# journal that starts past the end of the checkpoint does not belong to it
+# and is ignored.
+#
+# When the history is replaced (reset, import) the journal is closed and a
+# checkpoint is started in the background at once. That checkpoint deletes
+# the old journal before it moves the new log into place, so the old
+# session's rounds can never be replayed onto the new one. A crash before
+# the new log is in place restores the old checkpoint (without the rounds
+# only its journal held); a crash after it restores the new history.
+
+QUIET_DELAY = 2.0   # seconds without a new round before a checkpoint is written
+MAX_DELAY = 30.0    # seconds a checkpoint can be put off during continuous play
+
+JOURNAL_MAGIC = b"RPSJRNL\x00"
+JOURNAL_VERSION = 1
+JOURNAL_HEADER = struct.Struct("<8sHHIQ")  # magic, version, record size, number of choices, base round count
+
+
+# Function to read a journal: (rules, base round count, records), or None if there is none
+def read_journal(path):
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if len(data) < JOURNAL_HEADER.size:
+        return None  # crashed before the header was written
+    magic, version, record_size, size, base = JOURNAL_HEADER.unpack_from(data)
+    if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION:
+        raise LogFormatError(f"{path} is not a session journal")
+    try:
+        rules = engine.rules_for_size(size)
+    except KeyError:
+        raise LogFormatError(f"{path} was written for an unknown {size}-choice game")
+    record, dtype = record_format(rules)
+    if record_size != record.size:
+        raise LogFormatError(f"{path} has {record_size} byte records, expected {record.size}")
+    # A torn final record (crash mid-append) is ignored
+    count = (len(data) - JOURNAL_HEADER.size) // record.size
+    return rules, base, np.frombuffer(data, dtype=dtype, count=count, offset=JOURNAL_HEADER.size)
+
+
+# Function to load the checkpoint and replay the journal on top of it.
+# Returns the history and how many rounds came from the journal.
+def recover(path, journal_path, rules=engine.CLASSIC):
+    history = load_history(path, rules)
+    journal = read_journal(journal_path)
+    if journal is None:
+        return history, 0
+    journal_rules, base, records = journal
+    if journal_rules is not history.rules:
+        if len(history) == 0:
+            history = RoundHistory(rules=journal_rules)
+        else:
+            print(f"Ignoring session journal for a {journal_rules.name} game "
+                  f"(the checkpoint holds {history.rules.name})")
+            return history, 0
+    skip = len(history) - base
+    if skip < 0:
+        print(f"Ignoring session journal that starts after round {base} "
+              f"(the checkpoint has {len(history)} rounds)")
+        return history, 0
+    records = records[skip:]
+    history.extend_packed(records["code"], records["time"])
+    return history, len(records)
+
+
+class AutoSave:
+    # `replayed` is how many of the history's rounds came from the journal (see recover)
+    def __init__(self, path, journal_path, history, replayed=0, quiet_delay=QUIET_DELAY, max_delay=MAX_DELAY):
+        self.path = path
+        self.journal_path = journal_path
+        self.history = history
+        self.quiet_delay = quiet_delay
+        self.max_delay = max_delay
+        self.count = len(history)      # rounds handed to the journal or a checkpoint so far
+        self.checkpoints = 0
+        self.last_checkpoint_ms = 0.0
+        self.error = None              # last checkpoint failure, if any
+        self._changed_at = 0.0         # monotonic time of the last unsaved change
+        self._dirty_since = None       # when the oldest unsaved change happened
+        self._due = False              # checkpoint without waiting for play to go quiet
+        self._generation = 0           # bumped when the history is replaced
+        self._journal_generation = 0   # generation of the history the journal on disk belongs to
+        self._lock = threading.Lock()  # journal file and counters
+        self._save_lock = threading.Lock()  # one checkpoint write at a time
+        self._thread = None
+        self._journal = None
+        self._record = None
+        with self._lock:
+            self._start_journal(self.count - replayed)
+            if replayed:
+                self._mark_dirty()  # fold the replayed rounds into the next checkpoint
+
+    # Function to start a fresh journal holding the rounds after `base` (call with the lock held)
+    def _start_journal(self, base):
+        if self._journal is not None:
+            self._journal.close()
+        rules = self.history.rules
+        record, _ = record_format(rules)
+        header = JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, record.size, rules.size, base)
+        save_log(self.journal_path, rules, self.history.codes()[base:self.count],
+                 self.history.timestamps()[base:self.count], header)
+        self._journal = open(self.journal_path, "ab")
+        self._record = record
+        self._journal_generation = self._generation
+
+    # Function to delete a journal left by a replaced history (call with the lock held)
+    def _drop_journal(self):
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            return
+        sync_dir(self.journal_path)
+
+    # Function to write a checkpoint of every journaled round, then restart the journal after it
+    def checkpoint(self):
+        with self._save_lock:
+            started = time.perf_counter()
+            with self._lock:
+                count = min(self.count, len(self.history))
+                rules = self.history.rules
+                generation = self._generation
+                codes = self.history.codes()[:count].copy()
+                times = self.history.timestamps()[:count].copy()
+                self._dirty_since = None
+                self._due = False
+            try:
+                with self._lock:
+                    if generation != self._journal_generation:
+                        self._drop_journal()  # must be gone before the new checkpoint is in place
+                save_log(self.path, rules, codes, times)
+                with self._lock:
+                    # If the history was replaced meanwhile, its own checkpoint restarts the journal
+                    if self._generation == generation and self.history.rules is rules:
+                        self._start_journal(count)
+            except OSError as e:
+                self.error = e
+                print(f"Autosave failed: {e}")
+                with self._lock:
+                    if self._dirty_since is None:
+                        self._dirty_since = self._changed_at = time.monotonic()
+                return False
+            self.error = None
+            self.checkpoints += 1
+            self.last_checkpoint_ms = (time.perf_counter() - started) * 1000
+            return True
+
+    def _mark_dirty(self):
+        self._changed_at = time.monotonic()
+        if self._dirty_since is None:
+            self._dirty_since = self._changed_at
+
+    # Record a round that was just appended to the history (while a replaced history waits for
+    # its checkpoint there is no journal; the next one starts with the rounds played meanwhile)
+    def append(self, code, timestamp):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.write(self._record.pack(timestamp, code))
+                self._journal.flush()
+            self.count += 1
+            self._mark_dirty()
+
+    # Start a checkpoint in the background when one is due (called from the render loop)
+    def poll(self, now=None):
+        if self._dirty_since is None or self.saving:
+            return False
+        now = time.monotonic() if now is None else now
+        if not self._due and now - self._changed_at < self.quiet_delay and now - self._dirty_since < self.max_delay:
+            return False
+        self._thread = threading.Thread(target=self.checkpoint, name="autosave", daemon=True)
+        self._thread.start()
+        return True
+
+    @property
+    def saving(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def pending(self):
+        return self._dirty_since is not None
+
+    # The history was replaced wholesale (reset, import): stop journaling the old one and
+    # checkpoint the new one in the background right away (or as soon as a running one is done)
+    def rewrite(self):
+        with self._lock:
+            self.count = len(self.history)
+            self._generation += 1
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            self._mark_dirty()
+            self._due = True
+        return self.poll()
+
+    # Function to write a final checkpoint and close the journal
+    def close(self):
+        if self._thread is not None:
+            self._thread.join()
+        if self.pending:
+            self.checkpoint()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
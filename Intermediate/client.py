@@ -0,0 +1,81 @@
+import base64
+import json
+import socket
+import threading
+
+import numpy as np
+
+from server import DEFAULT_PORT, PROTOCOL
+
+# Blocking client for the game server, used by the GUI in thin-client mode.
+# One request is in flight at a time; Dear PyGui callbacks and the render
+# loop may both call it, so requests are serialized with a lock.
+
+
+class ServerError(Exception):
+    pass
+
+
+# Function to split "host:port" (port optional)
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    if not host:
+        return address, DEFAULT_PORT
+    return host, int(port)
+
+
+class GameClient:
+    def __init__(self, address, timeout=5.0):
+        self.address = address
+        self._socket = socket.create_connection(parse_address(address), timeout=timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._socket.makefile("rwb")
+        self._lock = threading.Lock()
+        self.session = None
+
+    def request(self, op, **fields):
+        fields["op"] = op
+        with self._lock:
+            self._file.write((json.dumps(fields) + "\n").encode())
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise ConnectionError(f"server at {self.address} closed the connection")
+        reply = json.loads(line)
+        if not reply.get("ok"):
+            raise ServerError(reply.get("error", "request failed"))
+        return reply
+
+    # Start or resume a session; returns the session description
+    def hello(self, session=None, rules=None, opponent=None):
+        fields = {key: value for key, value in
+                  (("session", session), ("rules", rules), ("opponent", opponent)) if value is not None}
+        reply = self.request("hello", **fields)
+        if reply.get("protocol") != PROTOCOL:
+            raise ServerError(f"server speaks protocol {reply.get('protocol')}, expected {PROTOCOL}")
+        self.session = reply["session"]
+        return reply
+
+    def play(self, choice):
+        return self.request("play", choice=choice)
+
+    def stats(self):
+        return self.request("stats")
+
+    def reset(self, rules=None):
+        return self.request("reset", **({"rules": rules} if rules else {}))
+
+    def set_opponent(self, name):
+        return self.request("opponent", name=name)
+
+    # Fetch the session's rounds into a RoundHistory (from round `start` on)
+    def load_rounds(self, history, start=0):
+        reply = self.request("history", start=start)
+        codes = np.frombuffer(base64.b64decode(reply["codes"]), dtype=history.code_dtype.newbyteorder("<"))
+        times = np.frombuffer(base64.b64decode(reply["times"]), dtype="<u4")
+        history.extend_packed(codes, times)
+        return reply["count"]
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
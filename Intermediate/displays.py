@@ -0,0 +1,57 @@
+# Game view display fields.
+# What the game view shows after a round: the choices, the result, the
+# scores, the rates and the most recent rounds. The fields are queued through
+# UIBindings, so only changed widgets are touched at the next flush. The GUI
+# and the load generator (loadgen.py) both go through queue_game_displays, so
+# the benchmark formats exactly what a player sees.
+
+COLORS = {
+    "background": [32, 32, 32],
+    "primary": [65, 105, 225],    # Royal Blue
+    "secondary": [70, 70, 70],
+    "accent": [255, 165, 0],      # Orange
+    "text": [240, 240, 240],
+    "win": [0, 200, 0],
+    "lose": [200, 0, 0],
+    "draw": [200, 200, 0],
+    "panel": [45, 45, 48],
+    "sidebar": [35, 35, 38],
+    "sidebar_hover": [55, 55, 58],
+    "sidebar_active": [75, 75, 78]
+}
+
+# Result colors indexed by engine outcome code (draw, win, lose)
+OUTCOME_COLORS = [COLORS["draw"], COLORS["win"], COLORS["lose"]]
+
+RECENT_ROUNDS = 8  # rounds listed in the game view (the history view pages through the rest)
+
+
+# Function to describe the choices of a round
+def round_text(rules, player, computer):
+    return f"You chose {rules.choices[player]}, Computer chose {rules.choices[computer]}."
+
+
+# Function to queue the game view's updates; the result is only replaced when one is given
+def queue_game_displays(ui, stats, history, last_result, result="", result_color=COLORS["text"]):
+    # Update result
+    ui.set("result_text", default_value=last_result)
+    if result:
+        ui.set("result_outcome", default_value=result, color=result_color)
+
+    # Update score
+    player_score, computer_score = stats.wins, stats.losses
+    player_color = COLORS["win"] if player_score > computer_score else COLORS["text"]
+    computer_color = COLORS["lose"] if player_score > computer_score else COLORS["text"]
+    if player_score == computer_score:
+        player_color = computer_color = COLORS["draw"]
+    ui.set("player_score", default_value=str(player_score), color=player_color)
+    ui.set("computer_score", default_value=str(computer_score), color=computer_color)
+
+    # Update statistics
+    ui.set("win_percentage", default_value=f"Win Rate: {stats.win_rate:.1f}%")
+    ui.set("draw_percentage", default_value=f"Draw Rate: {stats.draw_rate:.1f}%")
+    ui.set("total_rounds_text", default_value=f"Total Rounds: {stats.total}")
+
+    # Only update history in game view (detailed history updated separately)
+    if len(history):
+        ui.set("history_list", items=history.recent(RECENT_ROUNDS))
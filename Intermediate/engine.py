@@ -0,0 +1,171 @@
+import random
+import sys
+import time
+
+import numpy as np
+
+# Headless round engine.
+# Choices and outcomes are small integer codes so that whole arrays of rounds
+# can be resolved with a single table lookup. A rule set describes one game
+# variant with any odd number of choices (Rock Paper Scissors, Lizard Spock,
+# 7, 9, 15 or 101 weapons); every variant resolves a round with one lookup
+# in its precomputed outcome table, however many choices it has.
+
+# Outcome codes, always from the player's point of view
+DRAW, WIN, LOSE = 0, 1, 2
+RESULTS = ["Draw!", "You win!", "Computer wins!"]
+
+
+class RuleSet:
+    # Choices are listed so that each one beats the size // 2 choices just before
+    # it (wrapping around). With 3 choices that is the classic cycle; with more it
+    # is the balanced tournament every N-weapon variant uses.
+    def __init__(self, name, choices):
+        if len(choices) < 3 or len(choices) % 2 == 0:
+            raise ValueError(f"{name}: a rule set needs an odd number of choices (at least 3)")
+        self.name = name
+        self.choices = list(choices)
+        self.size = len(self.choices)
+        self.index = {choice: i for i, choice in enumerate(self.choices)}
+        # outcome[player][computer] -> outcome code, from (player - computer) % size
+        codes = np.arange(self.size)
+        diff = (codes[:, None] - codes[None, :]) % self.size
+        self.outcome = np.where(diff == 0, DRAW, np.where(diff <= self.size // 2, WIN, LOSE)).astype(np.uint8)
+        self._rows = self.outcome.tolist()  # plain lists are faster for single lookups
+
+    # Function to resolve a single round from choice codes
+    def resolve(self, player, computer):
+        return self._rows[player][computer]
+
+    # Function to resolve arrays of rounds in one call
+    def resolve_batch(self, player, computer):
+        return self.outcome[np.asarray(player, dtype=np.intp), np.asarray(computer, dtype=np.intp)]
+
+    # Function to draw n computer choices
+    def random_choices(self, n, rng=None):
+        if rng is None:
+            rng = np.random.default_rng()
+        return rng.integers(0, self.size, size=n, dtype=np.uint8)
+
+    # Function to play a batch of rounds against a uniformly random computer
+    def play_batch(self, player, rng=None):
+        player = np.asarray(player, dtype=np.uint8)
+        computer = self.random_choices(player.shape[0], rng)
+        return computer, self.resolve_batch(player, computer)
+
+    # Function to play one round (used by the GUI callback)
+    def play_one(self, player, rng=random):
+        computer = rng.randrange(self.size)
+        return computer, self._rows[player][computer]
+
+    # Function to find a choice that beats the given one
+    def counter(self, choice):
+        return (choice + 1) % self.size
+
+
+# Function to name the choices of a large variant that has no standard names
+def _numbered(size):
+    return [f"Weapon {i + 1}" for i in range(size)]
+
+
+RULESETS = {rules.name: rules for rules in [
+    RuleSet("Classic", ["Rock", "Paper", "Scissors"]),
+    RuleSet("Lizard Spock", ["Rock", "Spock", "Paper", "Lizard", "Scissors"]),
+    RuleSet("7 weapons", ["Water", "Air", "Paper", "Sponge", "Scissors", "Fire", "Rock"]),
+    RuleSet("9 weapons", _numbered(9)),
+    RuleSet("15 weapons", _numbered(15)),
+    RuleSet("101 weapons", _numbered(101)),
+]}
+CLASSIC = RULESETS["Classic"]
+
+
+# Function to find the built-in rule set with a given number of choices
+def rules_for_size(size):
+    for rules in RULESETS.values():
+        if rules.size == size:
+            return rules
+    raise KeyError(f"no rule set with {size} choices")
+
+
+# The classic game, kept as module-level names for code that only plays it
+CHOICES = CLASSIC.choices
+CHOICE_INDEX = CLASSIC.index
+ROCK, PAPER, SCISSORS = 0, 1, 2
+OUTCOME = CLASSIC.outcome
+resolve = CLASSIC.resolve
+resolve_batch = CLASSIC.resolve_batch
+random_choices = CLASSIC.random_choices
+play_batch = CLASSIC.play_batch
+play_one = CLASSIC.play_one
+
+
+# Function to count draws, wins and losses in an outcome array
+def tally(outcomes):
+    return np.bincount(np.asarray(outcomes, dtype=np.intp), minlength=3)
+
+
+# Reference implementation of the original string comparison path
+def _string_winner(player, computer):
+    if player == computer:
+        return "Draw!"
+    elif (player == "Rock" and computer == "Scissors") or \
+         (player == "Paper" and computer == "Rock") or \
+         (player == "Scissors" and computer == "Paper"):
+        return "You win!"
+    else:
+        return "Computer wins!"
+
+
+# Function to compare the batch engine with the string path
+def benchmark(n=1_000_000, string_rounds=200_000, seed=0):
+    rng = np.random.default_rng(seed)
+    player = random_choices(n, rng)
+
+    start = time.perf_counter()
+    computer, outcomes = play_batch(player, rng)
+    counts = tally(outcomes)
+    batch_time = time.perf_counter() - start
+
+    py_rng = random.Random(seed)
+    players = [py_rng.choice(CHOICES) for _ in range(string_rounds)]
+    start = time.perf_counter()
+    for p in players:
+        _string_winner(p, py_rng.choice(CHOICES))
+    string_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for p in player[:string_rounds].tolist():
+        play_one(p, py_rng)
+    single_time = time.perf_counter() - start
+
+    batch_rate = n / batch_time
+    string_rate = string_rounds / string_time
+    single_rate = string_rounds / single_time
+    print(f"batch engine : {n:>10,} rounds in {batch_time:.4f}s ({batch_rate:,.0f} rounds/s)")
+    print(f"single engine: {string_rounds:>10,} rounds in {single_time:.4f}s ({single_rate:,.0f} rounds/s)")
+    print(f"string path  : {string_rounds:>10,} rounds in {string_time:.4f}s ({string_rate:,.0f} rounds/s)")
+    print(f"speedup (batch vs string): {batch_rate / string_rate:.1f}x")
+    print(f"draws/wins/losses: {counts.tolist()}")
+
+    # Sanity check: both paths agree on every pairing
+    for p in range(3):
+        for c in range(3):
+            assert RESULTS[resolve(p, c)] == _string_winner(CHOICES[p], CHOICES[c])
+
+    # Resolution cost does not grow with the number of choices
+    print(f"{'rule set':<14} {'choices':>7} {'table':>9} {'single/s':>12} {'batch/s':>14}")
+    for rules in RULESETS.values():
+        player = rules.random_choices(n, rng)
+        start = time.perf_counter()
+        rules.play_batch(player, rng)
+        batch_rate = n / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for p in player[:string_rounds].tolist():
+            rules.play_one(p, py_rng)
+        single_rate = string_rounds / (time.perf_counter() - start)
+        print(f"{rules.name:<14} {rules.size:>7} {rules.outcome.nbytes:>7} B "
+              f"{single_rate:>12,.0f} {batch_rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
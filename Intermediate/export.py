@@ -0,0 +1,153 @@
+import csv
+import os
+import threading
+import time
+
+import numpy as np
+
+import engine
+from history import format_clock
+
+# Background export of the round history.
+# Rows are streamed to disk in chunks on a worker thread so the render loop
+# keeps running. The job works on a snapshot of the history taken when it
+# starts, writes to a temporary file, and only replaces the target file once
+# every row has been written. Choice names and the per-choice statistics rows
+# come from the history's rule set.
+
+HISTORY_COLUMNS = ["Round", "Timestamp", "Player Choice", "Computer Choice", "Result"]
+CHUNK_ROWS = 20_000
+XLSX_MAX_ROWS = 1_048_575  # Excel sheet limit minus the header row
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+# Function to build the rows of the Statistics sheet
+def stats_rows(stats, rules=engine.CLASSIC):
+    rows = [
+        ["Rule Set", rules.name],
+        ["Player Score", stats.wins],
+        ["Computer Score", stats.losses],
+        ["Total Rounds", stats.total],
+        ["Win Rate", f"{stats.win_rate:.1f}%" if stats.total > 0 else "0%"],
+        ["Draw Rate", f"{stats.draw_rate:.1f}%" if stats.total > 0 else "0%"],
+    ]
+    for i, choice in enumerate(rules.choices):
+        rows.append([f"Player {choice}", stats.player_counts[i]])
+    for i, choice in enumerate(rules.choices):
+        rows.append([f"Computer {choice}", stats.computer_counts[i]])
+    return rows
+
+
+class ExportJob:
+    def __init__(self, history, stats, path, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        # Snapshot the columns so the game can keep appending while we export
+        self._players = history.players().copy()
+        self._computers = history.computers().copy()
+        self._outcomes = history.outcomes().copy()
+        self._times = history.timestamps().copy()
+        self._choices = history.rules.choices
+        self._stats = stats_rows(stats, history.rules)
+        self.total = len(self._players)
+        self.written = 0
+        self.error = None
+        self.cancelled = False
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="history-export", daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+    @property
+    def progress(self):
+        return self.written / self.total if self.total else 1.0
+
+    # Yield lists of formatted rows, one chunk at a time
+    def _chunks(self):
+        choice_names = np.array(self._choices, dtype=object)
+        result_names = np.array(engine.RESULTS, dtype=object)
+        clock_cache = {}
+        for start in range(0, self.total, self.chunk_rows):
+            if self._cancel.is_set():
+                raise ExportCancelled()
+            end = min(start + self.chunk_rows, self.total)
+            clocks = []
+            for t in self._times[start:end].tolist():
+                text = clock_cache.get(t)
+                if text is None:
+                    if len(clock_cache) > 4096:
+                        clock_cache.clear()
+                    text = clock_cache[t] = format_clock(t)
+                clocks.append(text)
+            yield list(zip(range(start + 1, end + 1), clocks,
+                           choice_names[self._players[start:end]].tolist(),
+                           choice_names[self._computers[start:end]].tolist(),
+                           result_names[self._outcomes[start:end]].tolist()))
+            self.written = end
+            time.sleep(0)  # let the render thread have the GIL between chunks
+
+    def _write_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(HISTORY_COLUMNS)
+            for rows in self._chunks():
+                writer.writerows(rows)
+
+    def _write_xlsx(self, path):
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Game History")
+        sheet.append(HISTORY_COLUMNS)
+        sheet_rows, sheet_number = 0, 1
+        try:
+            for rows in self._chunks():
+                for row in rows:
+                    # Spill into extra sheets past the Excel row limit
+                    if sheet_rows == XLSX_MAX_ROWS:
+                        sheet_number += 1
+                        sheet = workbook.create_sheet(f"Game History ({sheet_number})")
+                        sheet.append(HISTORY_COLUMNS)
+                        sheet_rows = 0
+                    sheet.append(row)
+                    sheet_rows += 1
+        except ExportCancelled:
+            # Close the streamed sheets so openpyxl removes its temp files
+            for open_sheet in workbook.worksheets:
+                if not open_sheet.closed:
+                    open_sheet.close()
+            raise
+        stats_sheet = workbook.create_sheet("Statistics")
+        stats_sheet.append(["Statistic", "Value"])
+        for row in self._stats:
+            stats_sheet.append(row)
+        workbook.save(path)
+
+    def _run(self):
+        temp_path = self.path + ".tmp"
+        try:
+            if self.path.lower().endswith(".csv"):
+                self._write_csv(temp_path)
+            else:
+                self._write_xlsx(temp_path)
+            os.replace(temp_path, self.path)
+        except ExportCancelled:
+            self.cancelled = True
+        except Exception as e:
+            self.error = e
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
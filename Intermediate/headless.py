@@ -0,0 +1,30 @@
+# Headless stand-in for the Dear PyGui item calls made through UIBindings.
+# Items are plain dicts of their configuration, so UI updates can be driven
+# and counted on machines without a display (CI, load tests).
+
+
+class HeadlessDPG:
+    def __init__(self, tags=()):
+        self.items = {tag: {} for tag in tags}
+        self.configure_calls = 0
+
+    def add_item(self, tag, **config):
+        self.items[tag] = dict(config)
+
+    def delete_item(self, tag):
+        self.items.pop(tag, None)
+
+    def does_item_exist(self, tag):
+        return tag in self.items
+
+    def configure_item(self, tag, **config):
+        if tag not in self.items:
+            raise KeyError(f"item {tag!r} does not exist")
+        self.items[tag].update(config)
+        self.configure_calls += 1
+
+    def get_value(self, tag):
+        return self.items[tag].get("default_value")
+
+    def set_value(self, tag, value):
+        self.configure_item(tag, default_value=value)
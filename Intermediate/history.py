@@ -0,0 +1,151 @@
+import time
+
+import numpy as np
+
+import engine
+
+# Columnar round history.
+# Each round is packed into one code (player and computer choices take as many
+# bits as the rule set needs, the outcome two bits) plus a uint32 epoch-seconds
+# timestamp. For the classic game a round costs 5 bytes instead of a ~70
+# character formatted string; variants with up to 7 choices still fit in one
+# byte and larger ones use 16 bit codes. Display strings are only built for the
+# rows that are actually shown.
+
+OUTCOME_BITS = 2
+OUTCOME_MASK = 0b11
+
+INITIAL_CAPACITY = 1024
+
+
+# Function to find the packing of a rule set: (code dtype, choice bits)
+def code_layout(rules):
+    choice_bits = max(2, (rules.size - 1).bit_length())
+    width = 2 * choice_bits + OUTCOME_BITS
+    dtype = np.uint8 if width <= 8 else np.uint16 if width <= 16 else np.uint32
+    return np.dtype(dtype), choice_bits
+
+
+# Function to turn an "HH:MM:SS" clock string into an epoch timestamp for today
+def parse_clock(text):
+    try:
+        clock = time.strptime(str(text), "%H:%M:%S")
+    except ValueError:
+        return 0
+    today = time.localtime()
+    return int(time.mktime((today.tm_year, today.tm_mon, today.tm_mday,
+                            clock.tm_hour, clock.tm_min, clock.tm_sec, 0, 0, -1)))
+
+
+# Function to format an epoch timestamp the way the history has always shown it
+def format_clock(timestamp):
+    if not timestamp:
+        return "unknown"
+    return time.strftime("%H:%M:%S", time.localtime(timestamp))
+
+
+class RoundHistory:
+    def __init__(self, capacity=INITIAL_CAPACITY, rules=engine.CLASSIC):
+        self._times = np.empty(capacity, dtype=np.uint32)
+        self._size = 0
+        self._set_rules(rules, capacity)
+
+    def _set_rules(self, rules, capacity):
+        self.rules = rules
+        self.code_dtype, choice_bits = code_layout(rules)
+        self.player_shift = choice_bits + OUTCOME_BITS
+        self.computer_shift = OUTCOME_BITS
+        self.choice_mask = (1 << choice_bits) - 1
+        self._codes = np.empty(capacity, dtype=self.code_dtype)
+
+    def __len__(self):
+        return self._size
+
+    # Double the buffers whenever they fill up
+    def _reserve(self, needed):
+        capacity = self._codes.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        codes = np.empty(capacity, dtype=self.code_dtype)
+        times = np.empty(capacity, dtype=np.uint32)
+        codes[:self._size] = self._codes[:self._size]
+        times[:self._size] = self._times[:self._size]
+        self._codes, self._times = codes, times
+
+    def append(self, player, computer, outcome, timestamp=None):
+        if self._size == self._codes.shape[0]:
+            self._reserve(self._size + 1)
+        self._codes[self._size] = self.pack(player, computer, outcome)
+        self._times[self._size] = int(time.time()) if timestamp is None else timestamp
+        self._size += 1
+
+    # Function to pack one round (or arrays of rounds) into codes
+    def pack(self, player, computer, outcome):
+        return (player << self.player_shift) | (computer << self.computer_shift) | outcome
+
+    def extend(self, player, computer, outcome, timestamps):
+        player = np.asarray(player, dtype=self.code_dtype)
+        count = player.shape[0]
+        self._reserve(self._size + count)
+        end = self._size + count
+        self._codes[self._size:end] = self.pack(player, np.asarray(computer, dtype=self.code_dtype),
+                                                np.asarray(outcome, dtype=self.code_dtype))
+        self._times[self._size:end] = timestamps
+        self._size = end
+
+    # Append rounds that are already packed (e.g. read back from a round log)
+    def extend_packed(self, codes, timestamps):
+        count = len(codes)
+        self._reserve(self._size + count)
+        end = self._size + count
+        self._codes[self._size:end] = codes
+        self._times[self._size:end] = timestamps
+        self._size = end
+
+    # Drop every round; passing a rule set switches the history to that game
+    def clear(self, rules=None):
+        self._size = 0
+        if rules is not None and rules is not self.rules:
+            self._set_rules(rules, self._times.shape[0])
+
+    # Zero-copy column views over the stored rounds
+    def codes(self):
+        return self._codes[:self._size]
+
+    def timestamps(self):
+        return self._times[:self._size]
+
+    def players(self):
+        return (self.codes() >> self.player_shift) & self.choice_mask
+
+    def computers(self):
+        return (self.codes() >> self.computer_shift) & self.choice_mask
+
+    def outcomes(self):
+        return self.codes() & OUTCOME_MASK
+
+    # Packed code and timestamp of one round, as stored in the round log
+    def record(self, index):
+        if index < 0:
+            index += self._size
+        return int(self._codes[index]), int(self._times[index])
+
+    def row(self, index):
+        code = int(self._codes[index])
+        return ((code >> self.player_shift) & self.choice_mask, (code >> self.computer_shift) & self.choice_mask,
+                code & OUTCOME_MASK, int(self._times[index]))
+
+    def format_row(self, index):
+        player, computer, outcome, timestamp = self.row(index)
+        return (f"Round {index + 1} [{format_clock(timestamp)}]: You: {self.rules.choices[player]}, "
+                f"PC: {self.rules.choices[computer]} - {engine.RESULTS[outcome]}")
+
+    # Formatted rows for the most recent rounds, newest first
+    def recent(self, count):
+        start = max(0, self._size - count)
+        return [self.format_row(i) for i in range(self._size - 1, start - 1, -1)]
+
+    def memory_bytes(self):
+        return self._codes.nbytes + self._times.nbytes
@@ -0,0 +1,531 @@
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+import engine
+
+# Optional SQLite store for the round history, used to serve the history view.
+# Every round is one row keyed by its round number. Each filter the view
+# offers has an index that ends in the round number: (outcome, round),
+# (player, round), (outcome, player, round), (player, computer, round) and so
+# on. A page of filtered rounds is then one index range seek,
+# "round <= top ORDER BY round DESC LIMIT 20", whose cost does not depend on
+# how deep in the history it is.
+# Counts never scan the history. Whole-history counts come from a small
+# table of per-pair totals (the outcome follows from the two choices), and
+# counts over a range of rounds add up per-pair totals kept for every block
+# of rounds, counting only the rows of the two partial blocks at the ends.
+# Page positions (oldest page, jumps) walk the block totals the same way
+# instead of using OFFSET. While the rounds were recorded in time order,
+# "since a time" is "from some round on", found with one seek on the time
+# index, so time filters stay on the same indexes. A store with rounds out of
+# time order (appended logs from other stations) checks the time row by row.
+# New rounds are queued and inserted in batches, one transaction per batch.
+# A history that is already in memory is copied in on a background thread.
+
+SCHEMA_VERSION = "2"
+BATCH_ROWS = 100_000   # rows per transaction when copying a history in
+FLUSH_ROWS = 256       # queued rounds that trigger an insert
+FLUSH_INTERVAL = 1.0   # seconds a queued round may wait for its insert
+BLOCK_ROUNDS = 1 << 16  # rounds per block of pair totals (more for games with many choices, see _set_rules)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rounds (
+    round INTEGER PRIMARY KEY,
+    time INTEGER NOT NULL,
+    player INTEGER NOT NULL,
+    computer INTEGER NOT NULL,
+    outcome INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS counts (
+    player INTEGER NOT NULL,
+    computer INTEGER NOT NULL,
+    outcome INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (player, computer)
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    block INTEGER NOT NULL,
+    player INTEGER NOT NULL,
+    computer INTEGER NOT NULL,
+    outcome INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (block, player, computer)
+) WITHOUT ROWID;
+"""
+INDEXES = """
+CREATE INDEX IF NOT EXISTS rounds_time ON rounds (time, round);
+CREATE INDEX IF NOT EXISTS rounds_outcome ON rounds (outcome, round);
+CREATE INDEX IF NOT EXISTS rounds_player ON rounds (player, round);
+CREATE INDEX IF NOT EXISTS rounds_computer ON rounds (computer, round);
+CREATE INDEX IF NOT EXISTS rounds_outcome_player ON rounds (outcome, player, round);
+CREATE INDEX IF NOT EXISTS rounds_outcome_computer ON rounds (outcome, computer, round);
+CREATE INDEX IF NOT EXISTS rounds_pair ON rounds (player, computer, round);
+"""
+DROP_INDEXES = """
+DROP INDEX IF EXISTS rounds_time;
+DROP INDEX IF EXISTS rounds_outcome;
+DROP INDEX IF EXISTS rounds_player;
+DROP INDEX IF EXISTS rounds_computer;
+DROP INDEX IF EXISTS rounds_outcome_player;
+DROP INDEX IF EXISTS rounds_outcome_computer;
+DROP INDEX IF EXISTS rounds_pair;
+"""
+DROP_TABLES = """
+DROP TABLE IF EXISTS rounds;
+DROP TABLE IF EXISTS counts;
+DROP TABLE IF EXISTS blocks;
+"""
+INSERT = "INSERT INTO rounds (round, time, player, computer, outcome) VALUES (?, ?, ?, ?, ?)"
+ADD_COUNT = ("INSERT INTO counts (player, computer, outcome, n) VALUES (?, ?, ?, ?) "
+             "ON CONFLICT (player, computer) DO UPDATE SET n = n + excluded.n")
+ADD_BLOCK = ("INSERT INTO blocks (block, player, computer, outcome, n) VALUES (?, ?, ?, ?, ?) "
+             "ON CONFLICT (block, player, computer) DO UPDATE SET n = n + excluded.n")
+NEVER = 1 << 62  # first round of a filter nothing can match
+
+
+class HistoryDB:
+    def __init__(self, path, rules=engine.CLASSIC):
+        self.path = path
+        # Used from the render loop, Dear PyGui callbacks and the copy thread, one at a time
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        self._pending = []
+        self._pending_since = 0.0
+        self._thread = None
+        self._generation = 0   # bumped by clear, so a copy in progress stops
+        self.ready = True      # False while a history is being copied in, or if the copy failed
+        self.error = None      # why the last copy failed
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            meta = dict(self._db.execute("SELECT key, value FROM meta"))
+            if meta.get("schema") != SCHEMA_VERSION:
+                # Written by an older version: start over, sync copies the history in again
+                self._db.executescript(DROP_INDEXES + DROP_TABLES)
+                meta = {}
+            self._db.executescript(SCHEMA + INDEXES)
+            self.in_time_order = meta.get("in_order", "1") == "1"
+        self._set_rules(engine.RULESETS.get(meta.get("rules")))
+        if self.rules is not rules or "schema" not in meta:
+            self.clear(rules)
+
+    def _set_rules(self, rules):
+        self.rules = rules
+        # A block holds at most size^2 pair totals; keep them a small fraction of its rounds
+        self.block = max(BLOCK_ROUNDS, rules.size ** 2 * 64) if rules is not None else BLOCK_ROUNDS
+
+    # Number of rounds stored (including queued ones)
+    def __len__(self):
+        with self._lock:
+            return self._stored() + len(self._pending)
+
+    def _stored(self):
+        return self._db.execute("SELECT coalesce(max(round), 0) FROM rounds").fetchone()[0]
+
+    # Queue one round (round numbers are 1-based); it is inserted with the next batch
+    def add(self, round_number, player, computer, outcome, timestamp):
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append((round_number, timestamp, player, computer, outcome))
+            if len(self._pending) >= FLUSH_ROWS:
+                self.flush()
+
+    # Function to note rounds [first, last] that were just inserted; `ordered` says whether their
+    # times are in order among themselves (call inside the inserting transaction)
+    def _check_order(self, first, last, ordered):
+        if not self.in_time_order:
+            return
+        for before, after in ((first - 1, first), (last, last + 1)):
+            row = self._db.execute("SELECT a.time <= b.time FROM rounds a, rounds b WHERE a.round = ? AND b.round = ?",
+                                   (before, after)).fetchone()
+            ordered = ordered and (row is None or bool(row[0]))
+        if not ordered:
+            self.in_time_order = False
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('in_order', '0')")
+
+    # Insert the queued rounds in one transaction
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return 0
+            rows, self._pending = self._pending, []
+            counts = Counter((player, computer, outcome) for _, _, player, computer, outcome in rows)
+            blocks = Counter(((number - 1) // self.block, player, computer, outcome)
+                             for number, _, player, computer, outcome in rows)
+            self._db.execute("BEGIN")
+            self._db.executemany(INSERT, rows)
+            self._db.executemany(ADD_COUNT, [key + (n,) for key, n in counts.items()])
+            self._db.executemany(ADD_BLOCK, [key + (n,) for key, n in blocks.items()])
+            self._check_order(rows[0][0], rows[-1][0], all(a[1] <= b[1] for a, b in zip(rows, rows[1:])))
+            self._db.execute("COMMIT")
+            return len(rows)
+
+    # Flush queued rounds once they have waited long enough (called from the render loop)
+    def poll(self):
+        if self._pending and time.monotonic() - self._pending_since >= FLUSH_INTERVAL:
+            self.flush()
+
+    # Function to drop every round; passing a rule set starts a store for that game
+    def clear(self, rules=None):
+        with self._lock:
+            self._pending = []
+            self._generation += 1
+            if rules is not None:
+                self._set_rules(rules)
+            self.in_time_order = True
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM rounds")
+            self._db.execute("DELETE FROM counts")
+            self._db.execute("DELETE FROM blocks")
+            self._db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                 [("rules", self.rules.name), ("schema", SCHEMA_VERSION), ("in_order", "1")])
+            self._db.execute("COMMIT")
+
+    # Function to check that the stored rounds are a prefix of the history. Rounds queued while a
+    # copy runs are stored past the copied ones, so an interrupted copy leaves a gap: the per-pair
+    # totals (written with every batch) then add up to fewer rounds than the highest round number.
+    def _matches(self, history):
+        stored = self._stored()
+        if stored > len(history):
+            return False
+        if stored == 0:
+            return True
+        total = self._db.execute("SELECT coalesce(sum(n), 0) FROM counts").fetchone()[0]
+        if total != stored:
+            return False
+        row = self._db.execute("SELECT player, computer, outcome, time FROM rounds WHERE round = ?",
+                               (stored,)).fetchone()
+        return row == tuple(history.row(stored - 1))
+
+    # Function to copy the rounds of a history that are not stored yet (runs on a worker thread)
+    # A failed copy leaves ready False (the caller keeps paging from memory) and the error in error.
+    def _copy(self, history, start, end, generation):
+        bulk = start == 0 and end > BATCH_ROWS
+        size = self.rules.size
+        error = None
+        try:
+            if bulk:
+                # Building the indexes once at the end is much faster than updating them per row
+                with self._lock:
+                    self._db.executescript(DROP_INDEXES)
+            for first in range(start, end, BATCH_ROWS):
+                last = min(first + BATCH_ROWS, end)
+                players, computers = history.players()[first:last], history.computers()[first:last]
+                times = history.timestamps()[first:last]
+                rows = zip(range(first + 1, last + 1), times.tolist(),
+                           players.tolist(), computers.tolist(), history.outcomes()[first:last].tolist())
+                pairs = players.astype(np.int64) * size + computers
+                counts = [(pair // size, pair % size, int(self.rules.outcome[pair // size, pair % size]), n)
+                          for pair, n in enumerate(np.bincount(pairs, minlength=size * size).tolist()) if n]
+                keys, totals = np.unique(np.arange(first, last) // self.block * size * size + pairs,
+                                         return_counts=True)
+                blocks = [(key // (size * size), key % (size * size) // size, key % size,
+                           int(self.rules.outcome[key % (size * size) // size, key % size]), n)
+                          for key, n in zip(keys.tolist(), totals.tolist())]
+                ordered = not (np.diff(times.astype(np.int64)) < 0).any()
+                with self._lock:
+                    if self._generation != generation:
+                        break  # cleared meanwhile
+                    self._db.execute("BEGIN")
+                    try:
+                        self._db.executemany(INSERT, rows)
+                        self._db.executemany(ADD_COUNT, counts)
+                        self._db.executemany(ADD_BLOCK, blocks)
+                        self._check_order(first + 1, last, ordered)
+                        self._db.execute("COMMIT")
+                    except Exception:
+                        self._db.execute("ROLLBACK")
+                        raise
+        except Exception as e:
+            error = e
+        finally:
+            # The indexes are always put back, even after a failure
+            with self._lock:
+                try:
+                    if bulk:
+                        self._db.executescript(INDEXES)
+                    self._db.execute("ANALYZE")
+                except sqlite3.Error as e:
+                    error = error or e
+                self.error = error
+                self.ready = error is None
+
+    # Bring the store in line with a history; large copies run in the background (see ready)
+    def sync(self, history):
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            self.error = None
+            self.flush()
+            if history.rules is not self.rules or not self._matches(history):
+                self.clear(history.rules)
+            start, end = self._stored(), len(history)
+            if start == end:
+                return
+            self.ready = False
+        self._thread = threading.Thread(target=self._copy, args=(history, start, end, self._generation),
+                                        name="history-db-copy", daemon=True)
+        self._thread.start()
+
+    # Function to turn a filter (None means any value) into WHERE terms on the indexed columns and
+    # the first round that can match: (terms, args, first round, whether block totals apply)
+    def _filter(self, outcome, player, computer, since):
+        if player is not None and computer is not None:
+            if outcome is not None and outcome != self.rules.outcome[player, computer]:
+                return [], [], NEVER, True
+            outcome = None  # follows from the two choices
+        terms, args = [], []
+        for column, value in (("outcome", outcome), ("player", player), ("computer", computer)):
+            if value is not None:
+                terms.append(f"{column} = ?")
+                args.append(int(value))
+        first, by_block = 1, True
+        if since is not None:
+            if self.in_time_order:
+                row = self._db.execute("SELECT round FROM rounds WHERE time >= ? ORDER BY time, round LIMIT 1",
+                                       (int(since),)).fetchone()
+                first = row[0] if row else NEVER
+            else:
+                # The unary + keeps SQLite on the (..., round) indexes; time is checked per row
+                terms.append("+time >= ?")
+                args.append(int(since))
+                by_block = False
+        return terms, args, first, by_block
+
+    @staticmethod
+    def _where(terms, extra):
+        return " WHERE " + " AND ".join(terms + [extra])
+
+    # Function to count the rows matching terms in rounds [lo, hi] one by one (an index range)
+    def _scan_count(self, terms, args, lo, hi):
+        if lo > hi:
+            return 0
+        return self._db.execute("SELECT count(*) FROM rounds" + self._where(terms, "round BETWEEN ? AND ?"),
+                                args + [lo, hi]).fetchone()[0]
+
+    # Function to count the matching rounds in [lo, hi]: whole blocks from their totals, the ends row by row
+    def _count_range(self, match, lo, hi):
+        terms, args, first, by_block = match
+        lo, hi = max(lo, first), min(hi, self._stored())
+        if lo > hi:
+            return 0
+        first_block = -(-(lo - 1) // self.block)  # first block that starts at or after lo
+        last_block = hi // self.block - 1         # last block that ends at or before hi
+        if not by_block or first_block > last_block:
+            return self._scan_count(terms, args, lo, hi)
+        whole = self._db.execute("SELECT coalesce(sum(n), 0) FROM blocks" +
+                                 self._where(terms, "block BETWEEN ? AND ?"),
+                                 args + [first_block, last_block]).fetchone()[0]
+        return (self._scan_count(terms, args, lo, first_block * self.block) + whole +
+                self._scan_count(terms, args, (last_block + 1) * self.block + 1, hi))
+
+    # Function to find the matching round `rank` places (0-based) after the first one at or after `lo`
+    def _round_at(self, match, rank, lo):
+        terms, args, first, by_block = match
+        lo = max(lo, first)
+        nth = "SELECT round FROM rounds" + self._where(terms, "round BETWEEN ? AND ?") + " ORDER BY round LIMIT 1 OFFSET ?"
+        if not by_block:
+            row = self._db.execute(nth, args + [lo, NEVER, rank]).fetchone()
+            return row[0] if row else None
+        # The rest of the block holding lo, then whole blocks from their totals
+        block = (lo - 1) // self.block
+        end = (block + 1) * self.block
+        found = self._scan_count(terms, args, lo, end)
+        if rank < found:
+            return self._db.execute(nth, args + [lo, end, rank]).fetchone()[0]
+        rank -= found
+        totals = self._db.execute("SELECT block, sum(n) FROM blocks" + self._where(terms, "block > ?") +
+                                  " GROUP BY block ORDER BY block", args + [block])
+        for block, found in totals:
+            if rank < found:
+                row = self._db.execute(nth, args + [block * self.block + 1, (block + 1) * self.block, rank]).fetchone()
+                return row[0] if row else None
+            rank -= found
+        return None
+
+    def count(self, outcome=None, player=None, computer=None, since=None, after=None):
+        with self._lock:
+            self.flush()
+            if since is None and after is None:
+                # Whole-history counts come from the per-pair totals
+                terms, args, first, _ = self._filter(outcome, player, computer, None)
+                if first == NEVER:
+                    return 0
+                return self._db.execute("SELECT coalesce(sum(n), 0) FROM counts" +
+                                        (" WHERE " + " AND ".join(terms) if terms else ""), args).fetchone()[0]
+            match = self._filter(outcome, player, computer, since)
+            return self._count_range(match, 1 if after is None else after + 1, NEVER)
+
+    # Round numbers matching a filter, newest first, starting at round `top` (inclusive)
+    def rounds_before(self, top, limit, outcome=None, player=None, computer=None, since=None):
+        with self._lock:
+            self.flush()
+            terms, args, first, _ = self._filter(outcome, player, computer, since)
+            return [r for (r,) in self._db.execute(
+                "SELECT round FROM rounds" + self._where(terms, "round BETWEEN ? AND ?") +
+                " ORDER BY round DESC LIMIT ?", args + [first, top, limit])]
+
+    # Round numbers matching a filter after round `bottom` (exclusive), oldest first
+    def rounds_after(self, bottom, limit, outcome=None, player=None, computer=None, since=None):
+        with self._lock:
+            self.flush()
+            terms, args, first, _ = self._filter(outcome, player, computer, since)
+            return [r for (r,) in self._db.execute(
+                "SELECT round FROM rounds" + self._where(terms, "round >= ?") + " ORDER BY round LIMIT ?",
+                args + [max(bottom + 1, first), limit])]
+
+    # The matching round at a 0-based position counted from the oldest (None past the end)
+    def round_from_oldest(self, position, outcome=None, player=None, computer=None, since=None):
+        with self._lock:
+            self.flush()
+            return self._round_at(self._filter(outcome, player, computer, since), position, 1)
+
+    # The first matching round at or after `round_number` (None if there is none)
+    def round_at_or_after(self, round_number, outcome=None, player=None, computer=None, since=None):
+        with self._lock:
+            self.flush()
+            terms, args, first, _ = self._filter(outcome, player, computer, since)
+            row = self._db.execute("SELECT round FROM rounds" + self._where(terms, "round >= ?") +
+                                   " ORDER BY round LIMIT 1", args + [max(round_number, first)]).fetchone()
+            return row[0] if row else None
+
+    def close(self):
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            self.flush()
+            self._db.execute("PRAGMA optimize")
+            self._db.close()
+
+
+class DBHistoryPager:
+    # Same interface as history_view.HistoryPager, with the matching rows found by HistoryDB.
+    # The page position is tracked as the number of matching rounds newer than the top row.
+    def __init__(self, db, history, page_rows):
+        self.db = db
+        self.history = history
+        self.page_rows = page_rows
+        self.outcome = None
+        self.player = None
+        self.computer = None
+        self.since = None
+        self.count = 0
+        self.follow_latest = True
+        self.top_round = 0   # round number of the top visible row
+        self.position = 0    # matching rounds newer than the top row
+
+    @property
+    def filtered(self):
+        return (self.outcome is not None or self.player is not None or self.computer is not None or
+                self.since is not None)
+
+    def _filter(self):
+        return {"outcome": self.outcome, "player": self.player, "computer": self.computer, "since": self.since}
+
+    def set_filter(self, outcome=None, player=None, computer=None, since=None):
+        self.outcome, self.player, self.computer, self.since = outcome, player, computer, since
+        self.rebuild()
+
+    def rebuild(self):
+        self.count = self.db.count(**self._filter()) if self.filtered else len(self.db)
+        self.show_latest()
+
+    # Call after each round is appended to the history (and queued in the store)
+    def on_append(self):
+        player, computer, outcome, timestamp = self.history.row(len(self.history) - 1)
+        if ((self.outcome is None or outcome == self.outcome) and
+                (self.player is None or player == self.player) and
+                (self.computer is None or computer == self.computer) and
+                (self.since is None or timestamp >= self.since)):
+            self.count += 1
+            if not self.follow_latest:
+                self.position += 1
+
+    def reset(self):
+        self.rebuild()
+
+    # Round indices (0-based) on the visible page, newest first
+    def visible(self):
+        if self.count == 0:
+            return []
+        top = len(self.db) if self.follow_latest else self.top_round
+        return [r - 1 for r in self.db.rounds_before(top, self.page_rows, **self._filter())]
+
+    @property
+    def page(self):
+        return 1 if self.follow_latest else self.position // self.page_rows + 1
+
+    @property
+    def page_count(self):
+        return max(1, -(-self.count // self.page_rows))
+
+    def show_latest(self):
+        self.follow_latest = True
+        self.position = 0
+        self.top_round = len(self.db)
+
+    # Move the top row to a position (matching rounds newer than it)
+    def _move_to(self, position):
+        if position <= 0 or self.count == 0:
+            self.show_latest()
+            return
+        position = min(position, self.count - 1)
+        top = self.db.round_from_oldest(self.count - 1 - position, **self._filter())
+        if top is None:
+            self.show_latest()
+            return
+        self.follow_latest = False
+        self.position = position
+        self.top_round = top
+
+    def show_oldest(self):
+        self._move_to((self.page_count - 1) * self.page_rows)
+
+    def newer(self):
+        if self.follow_latest or self.position - self.page_rows <= 0:
+            self.show_latest()
+            return
+        self._step(-self.page_rows)
+
+    def older(self):
+        if self.position + self.page_rows < self.count:
+            self._step(self.page_rows)
+
+    # Function to move by whole pages using keyset lookups instead of offsets
+    def _step(self, rows):
+        top = len(self.db) if self.follow_latest else self.top_round
+        if rows > 0:
+            # Skip this page's rows: the next page starts right below them
+            page = self.db.rounds_before(top, rows + 1, **self._filter())
+            if len(page) <= rows:
+                return
+            self.top_round = page[rows]
+        else:
+            newer = self.db.rounds_after(top, -rows, **self._filter())
+            if len(newer) < -rows:
+                self.show_latest()
+                return
+            self.top_round = newer[-1]
+        self.follow_latest = False
+        self.position += rows
+
+    # Scroll so that the given round (1-based), or the next matching one, is on top
+    def jump_to_round(self, round_number):
+        top = self.db.round_at_or_after(max(1, round_number), **self._filter())
+        if top is None:
+            self.show_latest()
+            return
+        position = self.db.count(after=top, **self._filter())
+        if position == 0:
+            self.show_latest()
+            return
+        self.follow_latest = False
+        self.top_round = top
+        self.position = position
@@ -0,0 +1,124 @@
+from array import array
+
+import numpy as np
+
+# Paging and filtering over a RoundHistory for the history view.
+# Only the rows of the visible page are ever formatted. A filter is applied
+# once with a vectorized mask; after that each new round costs O(1) to add.
+
+PAGE_ROWS = 20
+
+
+class HistoryPager:
+    def __init__(self, history, page_rows=PAGE_ROWS):
+        self.history = history
+        self.page_rows = page_rows
+        self.outcome = None
+        self.player = None
+        self.computer = None
+        self.since = None     # only rounds at or after this epoch time
+        self._matches = None  # round indices matching the filter, or None for all rounds
+        self.follow_latest = True
+        self.top = 0  # position (in matching rows, oldest first) of the top visible row
+
+    @property
+    def filtered(self):
+        return (self.outcome is not None or self.player is not None or self.computer is not None or
+                self.since is not None)
+
+    @property
+    def count(self):
+        return len(self.history) if self._matches is None else len(self._matches)
+
+    def _matches_filter(self, player, computer, outcome, timestamp):
+        return ((self.outcome is None or outcome == self.outcome) and
+                (self.player is None or player == self.player) and
+                (self.computer is None or computer == self.computer) and
+                (self.since is None or timestamp >= self.since))
+
+    # Apply a new filter (None means any value)
+    def set_filter(self, outcome=None, player=None, computer=None, since=None):
+        self.outcome, self.player, self.computer, self.since = outcome, player, computer, since
+        self.rebuild()
+
+    # Recompute the matching rows, e.g. after a filter change or an import
+    def rebuild(self):
+        if not self.filtered:
+            self._matches = None
+        else:
+            mask = np.ones(len(self.history), dtype=bool)
+            if self.outcome is not None:
+                mask &= self.history.outcomes() == self.outcome
+            if self.player is not None:
+                mask &= self.history.players() == self.player
+            if self.computer is not None:
+                mask &= self.history.computers() == self.computer
+            if self.since is not None:
+                mask &= self.history.timestamps() >= self.since
+            self._matches = array("q", np.flatnonzero(mask).tobytes())
+        self.show_latest()
+
+    # Call after each round is appended to the history
+    def on_append(self):
+        if self._matches is not None:
+            if self._matches_filter(*self.history.row(len(self.history) - 1)):
+                self._matches.append(len(self.history) - 1)
+
+    def reset(self):
+        self.rebuild()
+
+    def _top_position(self):
+        return self.count - 1 if self.follow_latest else min(self.top, self.count - 1)
+
+    # Round indices (0-based) on the visible page, newest first
+    def visible(self):
+        top = self._top_position()
+        bottom = max(-1, top - self.page_rows)
+        if self._matches is None:
+            return list(range(top, bottom, -1))
+        return [self._matches[pos] for pos in range(top, bottom, -1)]
+
+    @property
+    def page(self):
+        return (self.count - 1 - self._top_position()) // self.page_rows + 1 if self.count else 1
+
+    @property
+    def page_count(self):
+        return max(1, -(-self.count // self.page_rows))
+
+    def show_latest(self):
+        self.follow_latest = True
+        self.top = max(0, self.count - 1)
+
+    def show_oldest(self):
+        if self.page_count == 1:
+            self.show_latest()  # the oldest page is the latest one, so keep following new rounds
+            return
+        self.follow_latest = False
+        # Align the last page with the other pages counted from the newest round
+        self.top = self.count - 1 - (self.page_count - 1) * self.page_rows
+
+    def newer(self):
+        top = self._top_position() + self.page_rows
+        if top >= self.count - 1:
+            self.show_latest()
+        else:
+            self.follow_latest = False
+            self.top = top
+
+    def older(self):
+        top = self._top_position() - self.page_rows
+        if top >= 0:
+            self.follow_latest = False
+            self.top = top
+
+    # Scroll so that the given round (1-based), or the next matching one, is on top
+    def jump_to_round(self, round_number):
+        index = round_number - 1
+        if self._matches is None:
+            position = index
+        else:
+            position = int(np.searchsorted(np.frombuffer(self._matches, dtype=np.int64), index))
+        position = max(0, min(position, self.count - 1))
+        self.follow_latest = position >= self.count - 1
+        self.top = position
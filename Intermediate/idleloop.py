@@ -0,0 +1,65 @@
+import threading
+import time
+
+# Idle-aware frame pacing for the main loop.
+# While the user is interacting (or game state keeps changing) frames run at
+# full rate. After a quiet period the loop drops to a few frames per second
+# and sleeps between them; input brings it back to full rate and a state
+# change wakes it for an immediate redraw.
+# Process CPU time is accounted separately for idle and active frames so the
+# savings can be measured.
+
+IDLE_AFTER = 2.0  # seconds without activity before dropping to idle rate
+IDLE_FPS = 4
+
+
+class FramePacer:
+    def __init__(self, enabled=True, idle_after=IDLE_AFTER, idle_fps=IDLE_FPS):
+        self.enabled = enabled
+        self.idle_after = idle_after
+        self.idle_interval = 1.0 / idle_fps
+        self._wake = threading.Event()
+        self._last_activity = time.monotonic()
+        self._mark_wall = time.monotonic()
+        self._mark_cpu = time.process_time()
+        # [wall seconds, cpu seconds] spent in each mode
+        self._totals = {"active": [0.0, 0.0], "idle": [0.0, 0.0]}
+
+    # Call on user input: wakes the loop and keeps it at full rate for a while
+    def activity(self, *args):
+        self._last_activity = time.monotonic()
+        self._wake.set()
+
+    # Call on a state change that needs drawing: renders one frame without leaving idle
+    def wake(self, *args):
+        self._wake.set()
+
+    @property
+    def idle(self):
+        return self.enabled and time.monotonic() - self._last_activity > self.idle_after
+
+    # Call once per frame, after rendering; sleeps when idle
+    def wait(self):
+        idle = self.idle
+        if idle:
+            self._wake.wait(self.idle_interval)
+            self._wake.clear()
+        self._account("idle" if idle else "active")
+
+    def _account(self, mode):
+        wall, cpu = time.monotonic(), time.process_time()
+        totals = self._totals[mode]
+        totals[0] += wall - self._mark_wall
+        totals[1] += cpu - self._mark_cpu
+        self._mark_wall, self._mark_cpu = wall, cpu
+
+    # Average process CPU use (percent of one core) while idle or active
+    def cpu_percent(self, mode):
+        wall, cpu = self._totals[mode]
+        return (cpu / wall) * 100 if wall > 0 else 0.0
+
+    def report(self):
+        idle_wall = self._totals["idle"][0]
+        active_wall = self._totals["active"][0]
+        return (f"Idle CPU: {self.cpu_percent('idle'):.1f}% over {idle_wall:.0f}s, "
+                f"active CPU: {self.cpu_percent('active'):.1f}% over {active_wall:.0f}s")
@@ -0,0 +1,696 @@
+import argparse
+import csv
+import glob
+import io
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+import zipfile
+from collections import deque
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+import engine
+from history import parse_clock
+
+# Streaming reader for round logs: the Game History sheets of an exported
+# workbook, and CSV files with the same columns.
+# An .xlsx file is a zip of XML parts. The sheet XML is inflated in chunks
+# of whole rows; a regular expression over the row tags finds where the rows
+# start and which rows a chunk holds. Whole chunks are skipped without parsing
+# when they lie outside the requested rounds. The others are parsed with
+# ElementTree, and only the cells of the needed columns are read. CSV files
+# are read by one csv reader in chunks of whole records (quoted fields may
+# span lines).
+# Each chunk's cells are converted to codes in bulk with np.unique, so a
+# spelling is only looked at once per chunk however many rows use it.
+# Memory stays at one chunk plus the compact result columns, however large
+# the file is.
+
+CHUNK_BYTES = 4 << 20
+PEEK_BYTES = 64 << 10
+PIECE_ROWS = 512  # rows parsed into one ElementTree at a time
+CSV_PIECE_ROWS = 4096  # most CSV records read between checks of the chunk size
+HISTORY_SHEET = "Game History"  # spill sheets are "Game History (2)", "Game History (3)", ...
+COLUMNS = {"round": "Round", "time": "Timestamp", "player": "Player Choice",
+           "computer": "Computer Choice", "result": "Result"}
+
+# Row start tags (any namespace prefix) with their r attribute, the end of the rows and namespace declarations
+ROW_START = re.compile(rb'<(?:[\w.-]+:)?row\b(?:[^>]*?\sr\s*=\s*["\'](\d+)["\'])?[^>]*>')
+SHEET_DATA_END = re.compile(rb'</(?:[\w.-]+:)?sheetData\s*>')
+NAMESPACE = re.compile(rb'\s(xmlns(?::[\w.-]+)?)\s*=\s*("[^"]*"|\'[^\']*\')')
+HISTORY_NAME = re.compile(r"Game History(?: \((\d+)\))?")
+
+# Accepted spellings of the results, after _normal (the app's own are "Draw!", "You win!", "Computer wins!")
+RESULT_NAMES = {"draw": engine.DRAW, "tie": engine.DRAW, "d": engine.DRAW,
+                "you win": engine.WIN, "player wins": engine.WIN, "win": engine.WIN, "won": engine.WIN,
+                "w": engine.WIN,
+                "computer wins": engine.LOSE, "cpu wins": engine.LOSE, "lose": engine.LOSE, "loss": engine.LOSE,
+                "lost": engine.LOSE, "l": engine.LOSE}
+DATE_LAYOUTS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%d/%m/%Y %H:%M:%S")
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+INGEST_COLUMNS = ("time", "player", "computer", "result")  # round numbers are not kept: rounds are appended
+
+
+class ImportedRounds:
+    def __init__(self, players, computers, outcomes, timestamps, rounds, skipped):
+        self.players = players
+        self.computers = computers
+        self.outcomes = outcomes
+        self.timestamps = timestamps
+        self.rounds = rounds    # round numbers from the Round column (None unless a range was read)
+        self.skipped = skipped  # rows dropped because a value was missing or invalid
+
+    def __len__(self):
+        return len(self.players)
+
+
+class RowChunk:
+    # Whole rows of a sheet's XML. Rows without an r attribute are numbered after the row before them.
+    def __init__(self, data, namespaces, starts, numbers):
+        self.data = data              # the rows' XML
+        self.namespaces = namespaces  # the sheet's xmlns declarations, to parse the rows on their own
+        self.starts = starts          # where each row starts in data
+        self.numbers = numbers        # the number of each row
+
+    @property
+    def count(self):
+        return len(self.numbers)
+
+    @property
+    def last(self):
+        return self.numbers[-1]
+
+    # The rows from index `first` on (and before index `end`), without copying the XML before them
+    def rows(self, first, end=None):
+        end = self.count if end is None else end
+        stop = self.starts[end] if end < self.count else len(self.data)
+        base = self.starts[first]
+        return RowChunk(self.data[base:stop], self.namespaces,
+                        [start - base for start in self.starts[first:end]], self.numbers[first:end])
+
+
+# Function to split an ElementTree tag into its namespace part and local name
+def _split_tag(tag):
+    namespace, _, local = tag.rpartition("}")
+    return namespace + "}" if namespace else "", local
+
+
+# Function to read the text of a shared or inline string: plain, or rich text runs (phonetic hints are left out)
+def _string_text(element, ns):
+    if len(element) == 1 and element[0].tag == ns + "t":
+        return element[0].text or ""
+    parts = []
+    for child in element:
+        if child.tag == ns + "t":
+            parts.append(child.text or "")
+        elif child.tag == ns + "r":
+            parts.append(child.findtext(ns + "t") or "")
+    return "".join(parts)
+
+
+# Function to convert column letters to a column number ("A" -> 1) and back
+def _column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord("A") + 1
+    return number
+
+
+def _column_letters(number):
+    letters = ""
+    while number:
+        number, rest = divmod(number - 1, 26)
+        letters = chr(ord("A") + rest) + letters
+    return letters
+
+
+class Workbook:
+    # The parts of an .xlsx file needed to stream its sheets
+    def __init__(self, path):
+        self.path = path
+        try:
+            self.archive = zipfile.ZipFile(path)
+            rels = ET.fromstring(self.archive.read("xl/_rels/workbook.xml.rels"))
+            book = ET.fromstring(self.archive.read("xl/workbook.xml"))
+        except (OSError, KeyError, zipfile.BadZipFile, ET.ParseError) as e:
+            raise ImportFormatError(f"{path} is not a readable .xlsx workbook: {e}")
+        # Elements are matched by local name, so both the transitional and strict namespaces work
+        targets, shared = {}, None
+        for rel in rels.iter():
+            if _split_tag(rel.tag)[1] != "Relationship":
+                continue
+            target = rel.get("Target").lstrip("/")
+            target = target if target.startswith("xl/") else "xl/" + target
+            targets[rel.get("Id")] = target
+            if rel.get("Type", "").endswith("/sharedStrings"):
+                shared = target
+        self.sheets = {}
+        for sheet in book.iter():
+            if _split_tag(sheet.tag)[1] == "sheet":
+                ids = [value for key, value in sheet.attrib.items() if key.endswith("}id")]
+                if ids and ids[0] in targets:
+                    self.sheets[sheet.get("name")] = targets[ids[0]]
+        try:
+            self.shared_strings = self._read_shared_strings(shared) if shared else []
+        except (KeyError, ET.ParseError) as e:
+            raise ImportFormatError(f"{path} has unreadable shared strings: {e}")
+
+    def _read_shared_strings(self, member):
+        strings = []
+        with self.archive.open(member) as f:
+            for _, element in ET.iterparse(f):
+                ns, local = _split_tag(element.tag)
+                if local == "si":
+                    strings.append(_string_text(element, ns))
+                    element.clear()
+        return strings
+
+    # Names of the history sheets, in round order
+    def history_sheets(self):
+        found = []
+        for name in self.sheets:
+            match = HISTORY_NAME.fullmatch(name)
+            if match:
+                found.append((int(match.group(1) or 1), name))
+        if not found:
+            raise ImportFormatError(f"{self.path} has no '{HISTORY_SHEET}' sheet")
+        return [name for _, name in sorted(found)]
+
+    # Stream a sheet's rows as RowChunks of about chunk_bytes. A chunk ends where the next row
+    # starts, so every row in it is complete; the last one ends with the sheet's rows.
+    def row_chunks(self, name, chunk_bytes=CHUNK_BYTES):
+        with self.archive.open(self.sheets[name]) as f:
+            tail, namespaces, number = b"", None, 0
+            while True:
+                data = f.read(chunk_bytes)
+                buffer = tail + data
+                starts = list(ROW_START.finditer(buffer))
+                if namespaces is None:
+                    if not starts:
+                        if not data:
+                            return  # a sheet without rows
+                        tail = buffer
+                        continue
+                    declared = dict(NAMESPACE.findall(buffer, 0, starts[0].start()))
+                    namespaces = b"".join(b" " + prefix + b"=" + uri for prefix, uri in declared.items())
+                if data:
+                    complete = starts[:-1]  # the last row may not be complete yet
+                    end = starts[-1].start() if starts else 0
+                else:
+                    complete = starts
+                    closing = SHEET_DATA_END.search(buffer, starts[-1].end()) if starts else None
+                    end = closing.start() if closing else len(buffer)
+                if complete:
+                    base = complete[0].start()
+                    numbers = []
+                    for match in complete:
+                        found = match.group(1)
+                        number = int(found) if found else number + 1
+                        numbers.append(number)
+                    yield RowChunk(buffer[base:end], namespaces, [m.start() - base for m in complete], numbers)
+                    tail = buffer[end:]
+                else:
+                    tail = buffer
+                if not data:
+                    return
+
+    # Cells of a chunk's rows as lists of row numbers, column letters and texts, only for the
+    # columns in `wanted` if given. Cells without an r attribute follow the cell before them.
+    # The rows are parsed a few hundred at a time, so only a small tree is held at once.
+    def cells(self, chunk, wanted=None, piece_rows=PIECE_ROWS):
+        numbers, columns, texts = [], [], []
+        strings = self.shared_strings
+        for first in range(0, chunk.count, piece_rows):
+            piece = chunk.rows(first, first + piece_rows)
+            try:
+                rows = ET.fromstring(b"<rows" + chunk.namespaces + b">" + piece.data + b"</rows>")
+            except ET.ParseError as e:
+                raise ImportFormatError(f"{self.path} has a sheet that is not valid XML: {e}")
+            if len(rows) != piece.count:
+                raise ImportFormatError(f"{self.path} has a sheet whose rows could not be told apart")
+            if not len(rows):
+                continue
+            ns, _ = _split_tag(rows[0].tag)
+            cell_tag, value_tag, inline_tag = ns + "c", ns + "v", ns + "is"
+            for row, number in zip(rows, piece.numbers):
+                letters = ""
+                for cell in row:
+                    if cell.tag != cell_tag:
+                        continue
+                    found = cell.get("r")
+                    letters = found.rstrip("0123456789") if found else _column_letters(_column_number(letters) + 1)
+                    if wanted is not None and letters not in wanted:
+                        continue
+                    kind = cell.get("t")
+                    if kind == "inlineStr":
+                        inline = cell.find(inline_tag)
+                        text = "" if inline is None else _string_text(inline, ns)
+                    else:
+                        text = cell.findtext(value_tag) or ""
+                        if kind == "s" and text:
+                            index = int(text) if text.isdigit() else -1
+                            text = strings[index] if 0 <= index < len(strings) else ""
+                    numbers.append(number)
+                    columns.append(letters)
+                    texts.append(text)
+        return numbers, columns, texts
+
+    # Cell texts of one row of a sheet, as {column letters: text}
+    def peek_row(self, name, row):
+        for chunk in self.row_chunks(name, PEEK_BYTES):
+            if chunk.last >= row:
+                if row not in chunk.numbers:
+                    return {}
+                index = chunk.numbers.index(row)
+                _, columns, texts = self.cells(chunk.rows(index, index + 1))
+                return dict(zip(columns, texts))
+        return {}
+
+    def close(self):
+        self.archive.close()
+
+
+# Function to map an array of raw cell values to codes through a lookup (-1 when unknown)
+def _lookup(values, mapping, dtype=np.int16):
+    uniques, inverse = np.unique(values, return_inverse=True)
+    table = np.array([mapping(u) for u in uniques.tolist()], dtype=dtype)
+    return table[inverse.reshape(-1)]
+
+
+# Function to normalize a choice or result for lookup ("  You WIN! " -> "you win")
+def _normal(text):
+    return " ".join(text.replace("!", " ").split()).casefold()
+
+
+def _round_number(text):
+    try:
+        return int(float(text))
+    except (TypeError, ValueError):
+        return -1
+
+
+# Function to read a timestamp: a clock time (today), a date and time, or epoch seconds (0 if unreadable)
+def _timestamp(text):
+    text = text.strip()
+    for layout in DATE_LAYOUTS:
+        try:
+            return int(time.mktime(time.strptime(text, layout)))
+        except (ValueError, OverflowError):
+            pass
+    if ":" in text:
+        return parse_clock(text)
+    try:
+        return int(float(text))
+    except ValueError:
+        return 0
+
+
+# Function to convert a column of timestamps. "HH:MM:SS" clocks (what the app
+# writes) are converted with array arithmetic; anything else one spelling at a time.
+def _timestamps(raw, text):
+    result = np.zeros(raw.shape[0], dtype=np.int64)
+    clocks = np.char.str_len(raw) == 8
+    if clocks.any():
+        try:
+            digits = np.frombuffer(raw[clocks].astype("S8").tobytes(), dtype=np.uint8).reshape(-1, 8).astype(np.int64)
+        except UnicodeEncodeError:
+            digits = None
+        if digits is not None:
+            numbers = digits[:, [0, 1, 3, 4, 6, 7]] - ord("0")
+            hours, minutes, seconds = (numbers[:, 0::2] * 10 + numbers[:, 1::2]).T
+            matched = ((digits[:, 2] == ord(":")) & (digits[:, 5] == ord(":")) & ((numbers >= 0) & (numbers <= 9)).all(axis=1)
+                       & (hours < 24) & (minutes < 60) & (seconds < 60))
+            rows = np.flatnonzero(clocks)
+            result[rows[matched]] = parse_clock("00:00:00") + hours[matched] * 3600 + minutes[matched] * 60 + seconds[matched]
+            clocks[rows[~matched]] = False
+    others = ~clocks
+    if others.any():
+        result[others] = _lookup(raw[others], lambda value: _timestamp(text(value)), np.int64)
+    return result
+
+
+class _SheetColumns:
+    # Column letters of the needed headers in a history sheet
+    def __init__(self, workbook, sheet, names):
+        header = {text.strip(): letters for letters, text in workbook.peek_row(sheet, 1).items() if text}
+        missing = [COLUMNS[key] for key in names if COLUMNS[key] not in header]
+        if missing:
+            raise ImportFormatError(f"sheet '{sheet}' is missing the column(s) {', '.join(missing)}")
+        self.letters = {header[COLUMNS[key]]: key for key in names}
+
+
+# Function to convert a column of raw values into codes. Choices and results are
+# matched ignoring case, spacing and "!"; `text` turns a raw value into a string.
+def _codes(key, raw, rules, text=str):
+    if key in ("player", "computer"):
+        names = {choice.casefold(): code for code, choice in enumerate(rules.choices)}
+        return _lookup(raw, lambda value: names.get(_normal(text(value)), -1))
+    if key == "result":
+        return _lookup(raw, lambda value: RESULT_NAMES.get(_normal(text(value)), -1))
+    if key == "round":
+        try:
+            return raw.astype(np.float64).astype(np.int64)
+        except ValueError:
+            return _lookup(raw, lambda value: _round_number(text(value)), np.int64)
+    return _timestamps(raw, text)
+
+
+# Function to convert the needed cells of one chunk into code columns
+def _convert_chunk(workbook, columns, chunk, rules):
+    rows, letters, cells = workbook.cells(chunk, columns.letters)
+    if not rows:
+        return _no_rows(columns)
+    rows = np.array(rows, dtype=np.int64)
+    letters = np.array(letters)
+    cells = np.array(cells)
+
+    # Rows are aligned by row number, so a missing cell only drops its own row
+    all_rows = np.unique(rows)
+    result = {}
+    for letter, key in columns.letters.items():
+        mine = letters == letter
+        column = np.full(all_rows.shape[0], -1, dtype=np.int64)
+        if mine.any():
+            column[np.searchsorted(all_rows, rows[mine])] = _codes(key, cells[mine], rules)
+        result[key] = column
+    return all_rows, result
+
+
+# Function to return the code columns of a chunk without rows
+def _no_rows(columns):
+    return np.empty(0, dtype=np.int64), {key: np.empty(0, dtype=np.int64) for key in columns.letters.values()}
+
+
+# Function to convert the needed cells of some chunks, one chunk at a time
+def _convert(workbook, columns, chunks, rules):
+    pieces = [_convert_chunk(workbook, columns, chunk, rules) for chunk in chunks] or [_no_rows(columns)]
+    rows = np.concatenate([rows for rows, _ in pieces])
+    return rows, {key: np.concatenate([values[key] for _, values in pieces]) for key in columns.letters.values()}
+
+
+# Function to pick the chunks of a sheet that hold rows first_row..last_row
+def _chunks_in_rows(workbook, sheet, first_row, last_row, chunk_bytes):
+    for chunk in workbook.row_chunks(sheet, chunk_bytes):
+        if chunk.last < first_row:
+            continue  # inflated but never parsed
+        # Only the rows in the range are parsed
+        wanted = [i for i, number in enumerate(chunk.numbers) if first_row <= number <= last_row]
+        if wanted:
+            yield chunk.rows(wanted[0], wanted[-1] + 1)
+        if chunk.last >= last_row:
+            return
+
+
+# Function to keep only the final chunks of a sheet that hold its last `count` rows
+def _tail_chunks(workbook, sheet, count, chunk_bytes):
+    kept, rows = deque(), 0
+    for chunk in workbook.row_chunks(sheet, chunk_bytes):
+        kept.append(chunk)
+        rows += chunk.count
+        while len(kept) > 1 and rows - kept[0].count >= count:
+            rows -= kept.popleft().count
+    if kept and rows > count:
+        kept[0] = kept[0].rows(min(rows - count, kept[0].count - 1))  # the oldest rows are never parsed
+    return list(kept)
+
+
+# Function to read rounds from the history sheets of an exported workbook.
+# last: only the last N rounds. first_round/last_round: only that range of the
+# Round column (inclusive). Only the needed columns are ever parsed.
+def read_workbook(path, rules=engine.CLASSIC, last=None, first_round=None, last_round=None,
+                  chunk_bytes=CHUNK_BYTES):
+    ranged = first_round is not None or last_round is not None
+    first_round = 1 if first_round is None else first_round
+    last_round = np.iinfo(np.int64).max if last_round is None else last_round
+    # The Round column is only parsed when it is needed to pick a range
+    names = ["time", "player", "computer", "result"] + (["round"] if ranged else [])
+
+    workbook = Workbook(path)
+    try:
+        sheets = workbook.history_sheets()
+        pieces = []
+
+        if last is not None:
+            # Newest sheets first, until enough rows are collected
+            remaining = last
+            for sheet in reversed(sheets):
+                columns = _SheetColumns(workbook, sheet, names)
+                rows, values = _convert(workbook, columns, _tail_chunks(workbook, sheet, remaining + 1, chunk_bytes), rules)
+                keep = (rows > 1) & (np.arange(rows.shape[0]) >= rows.shape[0] - remaining)
+                pieces.insert(0, {key: column[keep] for key, column in values.items()})
+                remaining -= int(keep.sum())
+                if remaining <= 0:
+                    break
+        elif not ranged:
+            for sheet in sheets:
+                columns = _SheetColumns(workbook, sheet, names)
+                rows, values = _convert(workbook, columns, workbook.row_chunks(sheet, chunk_bytes), rules)
+                pieces.append({key: column[rows > 1] for key, column in values.items()})
+        else:
+            # The first Round value of each sheet tells which sheets hold the range
+            columns = [_SheetColumns(workbook, sheet, names) for sheet in sheets]
+            starts = []
+            for sheet, sheet_columns in zip(sheets, columns):
+                letters = next(l for l, key in sheet_columns.letters.items() if key == "round")
+                starts.append(_round_number(workbook.peek_row(sheet, 2).get(letters, "-1")))
+            sequential = starts[0] > 0 and all(b > a for a, b in zip(starts, starts[1:]))
+            for i, sheet in enumerate(sheets):
+                chunks = workbook.row_chunks(sheet, chunk_bytes)
+                if sequential:
+                    if last_round < starts[i] or (i + 1 < len(starts) and first_round >= starts[i + 1]):
+                        continue
+                    # Rounds are numbered along the rows, so skip straight to the needed rows
+                    chunks = _chunks_in_rows(workbook, sheet, first_round - starts[i] + 2,
+                                             last_round - starts[i] + 2, chunk_bytes)
+                rows, values = _convert(workbook, columns[i], chunks, rules)
+                if sequential:
+                    numbered = (rows > 1) & (values["round"] >= 0)
+                    if not np.array_equal(values["round"][numbered], starts[i] + rows[numbered] - 2):
+                        # Not numbered along the rows after all: read the whole sheet
+                        rows, values = _convert(workbook, columns[i], workbook.row_chunks(sheet, chunk_bytes), rules)
+                keep = (rows > 1) & (values["round"] >= first_round) & (values["round"] <= last_round)
+                pieces.append({key: column[keep] for key, column in values.items()})
+    finally:
+        workbook.close()
+
+    if not pieces:
+        empty = np.empty(0, dtype=np.int64)
+        pieces = [{key: empty for key in names}]
+    return _validated({key: np.concatenate([piece[key] for piece in pieces]) for key in names}, rules)
+
+
+# Function to keep the rows whose codes are all known and whose result is consistent with the choices
+def _validated(columns, rules):
+    valid = (columns["player"] >= 0) & (columns["computer"] >= 0) & (columns["result"] >= 0)
+    valid[valid] = rules.resolve_batch(columns["player"][valid], columns["computer"][valid]) == columns["result"][valid]
+    return ImportedRounds(columns["player"][valid].astype(np.uint8), columns["computer"][valid].astype(np.uint8),
+                          columns["result"][valid].astype(np.uint8),
+                          np.clip(columns["time"][valid], 0, np.iinfo(np.uint32).max).astype(np.uint32),
+                          columns["round"][valid] if "round" in columns else None, int((~valid).sum()))
+
+
+# Function to stream the rounds of a workbook's history sheets: yields (rounds, fraction of the file read)
+def _workbook_rounds(path, rules, chunk_bytes):
+    workbook = Workbook(path)
+    try:
+        sheets = workbook.history_sheets()
+        total = sum(workbook.archive.getinfo(workbook.sheets[sheet]).file_size for sheet in sheets)
+        done = 0
+        for sheet in sheets:
+            columns = _SheetColumns(workbook, sheet, INGEST_COLUMNS)
+            for chunk in workbook.row_chunks(sheet, chunk_bytes):
+                rows, values = _convert_chunk(workbook, columns, chunk, rules)
+                done += len(chunk.data)
+                yield _validated({key: column[rows > 1] for key, column in values.items()}, rules), done / max(total, 1)
+    finally:
+        workbook.close()
+
+
+# Function to stream the rounds of a CSV file: yields (rounds, fraction of the file read)
+def _csv_rounds(path, rules, chunk_bytes):
+    size = max(os.path.getsize(path), 1)
+    with open(path, "rb") as f:
+        # One reader over the whole file, so quoted fields may hold newlines and chunks end on a record
+        reader = csv.reader(io.TextIOWrapper(f, encoding="utf-8-sig", errors="replace", newline=""))
+        header = next(reader, [])
+        positions = {name.strip(): i for i, name in enumerate(header)}
+        missing = [COLUMNS[key] for key in INGEST_COLUMNS if COLUMNS[key] not in positions]
+        if missing:
+            raise ImportFormatError(f"{path} is missing the column(s) {', '.join(missing)}")
+        wanted = {key: positions[COLUMNS[key]] for key in INGEST_COLUMNS}
+        piece_rows = max(1, min(CSV_PIECE_ROWS, chunk_bytes // 256))
+        while True:
+            start = f.tell()
+            rows = []
+            while f.tell() - start < chunk_bytes:
+                try:
+                    piece = list(itertools.islice(reader, piece_rows))
+                except csv.Error as e:
+                    # e.g. a quote that is never closed runs into the field size limit
+                    raise ImportFormatError(f"{path} line {reader.line_num}: {e}")
+                rows += [row for row in piece if row]
+                if len(piece) < piece_rows:
+                    break
+            if rows:
+                try:
+                    raw = {key: np.array([row[i] for row in rows]) for key, i in wanted.items()}
+                except IndexError:
+                    # Short rows: pad them so they fail validation instead of the whole chunk
+                    width = max(wanted.values()) + 1
+                    rows = [row + [""] * (width - len(row)) for row in rows]
+                    raw = {key: np.array([row[i] for row in rows]) for key, i in wanted.items()}
+                yield _validated({key: _codes(key, column, rules, str) for key, column in raw.items()}, rules), f.tell() / size
+            if len(piece) < piece_rows:
+                return
+
+
+# Function to stream the rounds of a CSV file or exported workbook in chunks
+def read_rounds(path, rules=engine.CLASSIC, chunk_bytes=CHUNK_BYTES):
+    if path.lower().endswith(".csv"):
+        return _csv_rounds(path, rules, chunk_bytes)
+    return _workbook_rounds(path, rules, chunk_bytes)
+
+
+# Function to expand a list of paths and glob patterns into the log files they name
+def expand_paths(patterns):
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(os.path.expanduser(pattern)))
+        paths.extend(matches if matches else [pattern])
+    return paths
+
+
+class IngestJob:
+    # Bulk import of external round logs on a worker thread. The rounds are
+    # collected in compact columns; the caller appends them once the job is done.
+    def __init__(self, paths, rules=engine.CLASSIC, chunk_bytes=CHUNK_BYTES):
+        self.paths = list(paths)
+        self.rules = rules
+        self.chunk_bytes = chunk_bytes
+        self.total_bytes = sum(os.path.getsize(p) for p in self.paths if os.path.exists(p))
+        self.read_bytes = 0
+        self.rounds = 0
+        self.skipped = 0
+        self.failed = []  # (path, error) for files that could not be read
+        self.error = None
+        self.cancelled = False
+        self._pieces = []
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="history-ingest", daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self):
+        self._thread.join()
+        return self
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+    @property
+    def progress(self):
+        return min(self.read_bytes / self.total_bytes, 1.0) if self.total_bytes else 1.0
+
+    def _run(self):
+        try:
+            for path in self.paths:
+                done_before = self.read_bytes
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                try:
+                    for rounds, fraction in read_rounds(path, self.rules, self.chunk_bytes):
+                        if self._cancel.is_set():
+                            self.cancelled = True
+                            return
+                        self._pieces.append(rounds)
+                        self.rounds += len(rounds)
+                        self.skipped += rounds.skipped
+                        self.read_bytes = done_before + int(fraction * size)
+                        time.sleep(0)  # let the render thread have the GIL between chunks
+                except (OSError, ImportFormatError) as e:
+                    self.failed.append((path, e))
+                self.read_bytes = done_before + size
+        except Exception as e:
+            self.error = e
+
+    # All the rounds read, in file order
+    def result(self):
+        pieces = self._pieces or [_validated({key: np.empty(0, dtype=np.int64) for key in INGEST_COLUMNS},
+                                             self.rules)]
+        return ImportedRounds(*(np.concatenate([getattr(piece, name) for piece in pieces])
+                                for name in ("players", "computers", "outcomes", "timestamps")),
+                              None, self.skipped)
+
+
+# Function to find the rule set recorded in a workbook's Statistics sheet (None if absent)
+def workbook_rules(path):
+    workbook = Workbook(path)
+    try:
+        if "Statistics" not in workbook.sheets:
+            return None
+        cells = {}
+        for chunk in workbook.row_chunks("Statistics"):
+            for row, letters, text in zip(*workbook.cells(chunk, ("A", "B"))):
+                cells[(letters, row)] = text
+        for (letters, row), text in cells.items():
+            if letters == "A" and text == "Rule Set":
+                return engine.RULESETS.get(cells.get(("B", row), ""))
+        return None
+    finally:
+        workbook.close()
+
+
+# Command line: append round logs to a session log (while the app is closed)
+def main(argv=None):
+    from autosave import recover
+    from roundlog import save_log
+
+    parser = argparse.ArgumentParser(description="Append CSV/xlsx round logs to a session log.")
+    parser.add_argument("paths", nargs="+", help="CSV or .xlsx files (glob patterns are expanded)")
+    parser.add_argument("--into", default="rps_session.rpslog", help="session log to append to")
+    parser.add_argument("--rules", default=None, choices=list(engine.RULESETS),
+                        help="rule set of the logs (default: the session log's, or Classic for a new one)")
+    args = parser.parse_args(argv)
+
+    journal = os.path.splitext(args.into)[0] + ".journal"
+    rules = engine.RULESETS[args.rules] if args.rules else engine.CLASSIC
+    history, _ = recover(args.into, journal, rules)
+    if args.rules and len(history) and history.rules is not rules:
+        print(f"{args.into} holds a {history.rules.name} game, not {rules.name}")
+        return 1
+    job = IngestJob(expand_paths(args.paths), history.rules).start().wait()
+    for path, e in job.failed:
+        print(f"Skipped {path}: {e}")
+    if job.error is not None:
+        print(f"Import failed: {job.error}")
+        return 1
+    imported = job.result()
+    elapsed = time.perf_counter() - job.started_at
+    history.extend(imported.players, imported.computers, imported.outcomes, imported.timestamps)
+    save_log(args.into, history.rules, history.codes(), history.timestamps())
+    if os.path.exists(journal):
+        os.remove(journal)  # folded into the log above
+    print(f"Imported {len(imported):,} rounds ({imported.skipped:,} invalid rows skipped) from "
+          f"{len(job.paths) - len(job.failed)} file(s) in {elapsed:.2f}s "
+          f"({len(imported) / max(elapsed, 1e-9):,.0f} rounds/s); {args.into} now holds {len(history):,} rounds")
+    return 1 if job.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
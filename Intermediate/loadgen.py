@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import engine
+from client import parse_address
+from displays import OUTCOME_COLORS, queue_game_displays, round_text
+from headless import HeadlessDPG
+from opponents import STRATEGIES
+from server import GameServer
+from uibind import UIBindings
+
+# Load generator for the round pipeline.
+# Synthetic players push choices through the same pipeline the game uses:
+# resolve, statistics, history and batched persistence. In-process mode plays
+# through the game server's request handling (GameServer.handle, the round
+# path of server.py and of the GUI in thin-client mode, not app.py's local
+# play_round), then queues the game view's updates with the GUI's own
+# queue_game_displays through UIBindings on a headless Dear PyGui stand-in,
+# flushed at the frame rate, so it runs without a display. Server mode plays
+# over TCP against a running server.py. Either way the latency of every round
+# is recorded and reported as percentiles.
+
+FRAME_RATE = 60
+DISPLAY_TAGS = ["result_text", "result_outcome", "player_score", "computer_score",
+                "win_percentage", "draw_percentage", "total_rounds_text", "history_list"]
+
+
+class LoadReport:
+    def __init__(self, mode, players, rounds, rules, opponent):
+        self.mode = mode
+        self.players = players
+        self.rounds_per_player = rounds
+        self.rules = rules
+        self.opponent = opponent
+        self.latency_ns = []
+        self.frame_ns = []
+        self.widget_updates = 0
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def add(self, latency_ns, ok):
+        self.latency_ns.append(latency_ns)
+        if not ok:
+            self.errors += 1
+
+    def summary(self):
+        latency = np.asarray(self.latency_ns, dtype=np.float64) / 1000
+        rounds = latency.size
+        result = {
+            "mode": self.mode,
+            "players": self.players,
+            "rounds_per_player": self.rounds_per_player,
+            "rules": self.rules.name,
+            "opponent": self.opponent,
+            "rounds": rounds,
+            "errors": self.errors,
+            "elapsed": round(self.elapsed, 3),
+            "rounds_per_sec": round(rounds / self.elapsed) if self.elapsed > 0 else 0,
+        }
+        if rounds:
+            p50, p95, p99 = np.percentile(latency, [50, 95, 99]).tolist()
+            result["latency_us"] = {"p50": round(p50, 2), "p95": round(p95, 2), "p99": round(p99, 2),
+                                    "max": round(float(latency.max()), 2)}
+        if self.frame_ns:
+            frames = np.asarray(self.frame_ns, dtype=np.float64) / 1e6
+            p50, p95, p99 = np.percentile(frames, [50, 95, 99]).tolist()
+            result["ui_flush_ms"] = {"frames": frames.size, "p50": round(p50, 3), "p95": round(p95, 3),
+                                     "p99": round(p99, 3), "widget_updates": self.widget_updates}
+        return result
+
+    def print(self):
+        result = self.summary()
+        print(f"{result['mode']}: {self.players} players x {self.rounds_per_player:,} rounds, "
+              f"{self.rules.name} vs {self.opponent}")
+        print(f"{result['rounds']:,} rounds in {result['elapsed']:.2f}s "
+              f"({result['rounds_per_sec']:,} rounds/s), {result['errors']} errors")
+        if "latency_us" in result:
+            latency = result["latency_us"]
+            print(f"round latency us: p50 {latency['p50']:.1f}  p95 {latency['p95']:.1f}  "
+                  f"p99 {latency['p99']:.1f}  max {latency['max']:.1f}")
+        if "ui_flush_ms" in result:
+            flush = result["ui_flush_ms"]
+            print(f"ui flush per frame ms: p50 {flush['p50']:.3f}  p95 {flush['p95']:.3f}  p99 {flush['p99']:.3f}  "
+                  f"({flush['frames']:,} frames, {flush['widget_updates']:,} widget updates)")
+
+
+# Function to make a synthetic player: favours one choice with probability `bias`
+def make_chooser(rules, seed, bias):
+    rng = random.Random(seed)
+    favourite = rng.randrange(rules.size)
+
+    def choose():
+        if rng.random() < bias:
+            return favourite
+        return rng.randrange(rules.size)
+    return choose
+
+
+# Function to wait for the next round slot (rate 0 only yields to the other players)
+async def pace(next_at, interval):
+    if interval == 0:
+        await asyncio.sleep(0)
+        return next_at
+    next_at += interval
+    delay = next_at - time.perf_counter()
+    await asyncio.sleep(max(0.0, delay))
+    return next_at
+
+
+async def run_in_process(players, rounds, rate=0.0, rules=engine.CLASSIC, opponent="Random", seed=0, bias=0.0):
+    report = LoadReport("in-process", players, rounds, rules, opponent)
+    interval = 1.0 / rate if rate > 0 else 0
+    with tempfile.TemporaryDirectory() as data_dir:
+        game_server = GameServer(data_dir)
+        backends, bindings = [], []
+        running = True
+
+        async def player(i):
+            choose = make_chooser(rules, seed + i, bias)
+            backend = HeadlessDPG(DISPLAY_TAGS)
+            ui = UIBindings(backend=backend)
+            backends.append(backend)
+            bindings.append(ui)
+            session, reply = game_server.handle(None, {"op": "hello", "session": f"load-{i}",
+                                                       "rules": rules.name, "opponent": opponent})
+            if not reply["ok"]:
+                raise RuntimeError(reply["error"])
+            next_at = time.perf_counter()
+            for _ in range(rounds):
+                start = time.perf_counter_ns()
+                session, reply = game_server.handle(session, {"op": "play", "choice": choose()})
+                if reply["ok"]:
+                    queue_game_displays(ui, session.stats, session.history,
+                                        round_text(session.rules, reply["player"], reply["computer"]),
+                                        reply["result"], OUTCOME_COLORS[reply["outcome"]])
+                report.add(time.perf_counter_ns() - start, reply["ok"])
+                next_at = await pace(next_at, interval)
+            game_server.detach(session)
+
+        # Stand-in for the render loop: flush the UI every frame, save rounds every flush interval.
+        # One last frame is drawn after the players finish, so the widgets show the final rounds.
+        async def frames():
+            last_save = time.perf_counter()
+            while True:
+                start = time.perf_counter_ns()
+                for ui in bindings:
+                    ui.flush()
+                report.frame_ns.append(time.perf_counter_ns() - start)
+                if not running:
+                    break
+                if time.perf_counter() - last_save >= game_server.flush_interval:
+                    await game_server.flush()
+                    last_save = time.perf_counter()
+                await asyncio.sleep(1.0 / FRAME_RATE)
+
+        frame_task = asyncio.create_task(frames())
+        started = time.perf_counter()
+        await asyncio.gather(*(player(i) for i in range(players)))
+        await game_server.flush()
+        report.elapsed = time.perf_counter() - started
+        running = False
+        await frame_task
+        report.widget_updates = sum(backend.configure_calls for backend in backends)
+    return report
+
+
+async def run_against_server(address, players, rounds, rate=0.0, rules=engine.CLASSIC, opponent="Random",
+                             seed=0, bias=0.0):
+    report = LoadReport(f"server {address}", players, rounds, rules, opponent)
+    interval = 1.0 / rate if rate > 0 else 0
+    host, port = parse_address(address)
+    run_id = f"{int(time.time()):x}"
+
+    async def player(i):
+        choose = make_chooser(rules, seed + i, bias)
+        reader, writer = await asyncio.open_connection(host, port)
+
+        async def call(request):
+            writer.write((json.dumps(request) + "\n").encode())
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("server closed the connection")
+            return json.loads(line)
+
+        try:
+            reply = await call({"op": "hello", "session": f"load-{run_id}-{i}", "rules": rules.name,
+                                "opponent": opponent})
+            if not reply["ok"]:
+                raise RuntimeError(reply["error"])
+            next_at = time.perf_counter()
+            for _ in range(rounds):
+                start = time.perf_counter_ns()
+                reply = await call({"op": "play", "choice": choose()})
+                report.add(time.perf_counter_ns() - start, reply["ok"])
+                next_at = await pace(next_at, interval)
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(player(i) for i in range(players)))
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive the round pipeline with synthetic players.")
+    parser.add_argument("--players", type=int, default=100, help="concurrent synthetic players")
+    parser.add_argument("--rounds", type=int, default=1000, help="rounds per player")
+    parser.add_argument("--rate", type=float, default=0.0, help="rounds per second per player (0: as fast as possible)")
+    parser.add_argument("--server", default=None, help="host:port of a running server.py (default: in-process)")
+    parser.add_argument("--rules", default=engine.CLASSIC.name, choices=list(engine.RULESETS))
+    parser.add_argument("--opponent", default="Random", choices=list(STRATEGIES))
+    parser.add_argument("--bias", type=float, default=0.0, help="how often players repeat a favourite choice")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    rules = engine.RULESETS[args.rules]
+    if args.server:
+        run = run_against_server(args.server, args.players, args.rounds, args.rate, rules, args.opponent,
+                                 args.seed, args.bias)
+    else:
+        run = run_in_process(args.players, args.rounds, args.rate, rules, args.opponent, args.seed, args.bias)
+    report = asyncio.run(run)
+    report.print()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report.summary(), f, indent=2)
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
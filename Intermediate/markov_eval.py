@@ -0,0 +1,290 @@
+import random
+import sys
+import time
+
+import numpy as np
+
+import engine
+
+# Exact matchup evaluation for finite-memory strategies.
+# A strategy is a finite set of internal states, a move distribution per
+# state and a deterministic next-state rule given both moves. Two strategies
+# playing each other form a Markov chain over joint states; its long-run
+# distribution gives the exact expected draw/win/loss rates without playing a
+# single round. Rates are expectations over the strategies' start
+# distributions. Chains that are periodic or split into several closed classes
+# (common for deterministic cycles) are handled by solving each closed class
+# and weighting it by the probability of ending up there. The number of moves
+# comes from the policy, so any rule set from engine.RULESETS can be evaluated.
+
+
+class FiniteStrategy:
+    def __init__(self, name, policy, next_state, initial=None):
+        self.name = name
+        self.policy = np.asarray(policy, dtype=np.float64)         # [state, move] probabilities
+        self.next_state = np.asarray(next_state, dtype=np.intp)     # [state, own move, other move]
+        states = self.policy.shape[0]
+        if initial is None:
+            initial = np.zeros(states)
+            initial[0] = 1.0
+        self.initial = np.asarray(initial, dtype=np.float64)
+        moves = self.policy.shape[1]
+        self.rules = engine.rules_for_size(moves)
+        if self.next_state.shape != (states, moves, moves):
+            raise ValueError(f"{name}: next_state must have shape ({states}, {moves}, {moves})")
+        if not np.allclose(self.policy.sum(axis=1), 1.0):
+            raise ValueError(f"{name}: every policy row must sum to 1")
+
+    @property
+    def states(self):
+        return self.policy.shape[0]
+
+
+# Function to build a strategy that always plays the same mix of moves
+def fixed_mix(probs, name=None):
+    probs = np.asarray(probs, dtype=np.float64)
+    moves = probs.shape[0]
+    return FiniteStrategy(name or f"Mix {np.round(probs, 3).tolist()}", probs[None, :],
+                          np.zeros((1, moves, moves), dtype=np.intp))
+
+
+# Function to build a strategy that repeats a fixed move pattern
+def cycle(pattern, name=None, rules=engine.CLASSIC):
+    n = len(pattern)
+    moves = rules.size
+    policy = np.zeros((n, moves))
+    policy[np.arange(n), pattern] = 1.0
+    next_state = np.broadcast_to(((np.arange(n) + 1) % n)[:, None, None], (n, moves, moves)).copy()
+    return FiniteStrategy(name or "Cycle " + "".join(rules.choices[m][0] for m in pattern), policy, next_state)
+
+
+# Function to build an order-k strategy that reacts to the last k moves.
+# watch="opponent" or "own" remembers one side (m**k states for m moves);
+# "both" remembers move pairs (m**(2k) states). table[state] is the move
+# distribution in that state, and play starts from a uniformly random
+# remembered history.
+def reactive(order, table, watch="opponent", name=None):
+    table = np.asarray(table, dtype=np.float64)
+    moves = table.shape[1]
+    base = moves * moves if watch == "both" else moves
+    states = base ** order
+    if table.shape != (states, moves):
+        raise ValueError(f"table must have shape ({states}, {moves})")
+    own, other = np.meshgrid(np.arange(moves), np.arange(moves), indexing="ij")
+    if watch == "opponent":
+        symbol = other
+    elif watch == "own":
+        symbol = own
+    else:
+        symbol = own * moves + other
+    next_state = (np.arange(states)[:, None, None] * base + symbol[None, :, :]) % states
+    return FiniteStrategy(name or f"Order-{order} reactive ({watch})", table, next_state,
+                          initial=np.full(states, 1.0 / states))
+
+
+# Function to build a strategy that plays what beats the opponent's last move
+def beat_last(rules=engine.CLASSIC):
+    moves = np.arange(rules.size)
+    table = np.zeros((rules.size, rules.size))
+    table[moves, rules.counter(moves)] = 1.0
+    return reactive(1, table, "opponent", "Beat last")
+
+
+# Function to build win-stay, lose-shift (draws also shift to the next move)
+def win_stay_lose_shift(rules=engine.CLASSIC):
+    size = rules.size
+    table = np.zeros((size * size, size))
+    for own in range(size):
+        for other in range(size):
+            move = own if rules.resolve(own, other) == engine.WIN else (own + 1) % size
+            table[own * size + other, move] = 1.0
+    return reactive(1, table, "both", "Win-stay lose-shift")
+
+
+# Function to build the joint chain: transition matrix and per-state outcome probabilities
+def joint_chain(a, b):
+    if a.rules is not b.rules:
+        raise ValueError(f"{a.name} plays {a.rules.name} but {b.name} plays {b.rules.name}")
+    sa, sb = a.states, b.states
+    n = sa * sb
+    moves = a.rules.size
+    grid = np.indices((sa, sb, moves, moves)).reshape(4, -1)
+    state_a, state_b, move_a, move_b = grid
+    prob = a.policy[state_a, move_a] * b.policy[state_b, move_b]
+    source = state_a * sb + state_b
+    dest = a.next_state[state_a, move_a, move_b] * sb + b.next_state[state_b, move_b, move_a]
+    transitions = np.zeros((n, n))
+    np.add.at(transitions, (source, dest), prob)
+    outcome = a.rules.outcome[move_a, move_b]
+    rewards = np.zeros((n, 3))
+    np.add.at(rewards, (source, outcome), prob)
+    initial = np.outer(a.initial, b.initial).ravel()
+    return transitions, rewards, initial
+
+
+# Function to find strongly connected components (iterative Tarjan)
+def _components(adjacency):
+    n = len(adjacency)
+    index, low = [-1] * n, [0] * n
+    on_stack, stack, components = [False] * n, [], []
+    counter = 0
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, edge = work.pop()
+            if edge == 0:
+                index[node] = low[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            recurse = False
+            for i in range(edge, len(adjacency[node])):
+                nxt = adjacency[node][i]
+                if index[nxt] == -1:
+                    work.append((node, i + 1))
+                    work.append((nxt, 0))
+                    recurse = True
+                    break
+                if on_stack[nxt]:
+                    low[node] = min(low[node], index[nxt])
+            if recurse:
+                continue
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+    return components
+
+
+# Function to compute the long-run state distribution of a chain from its start distribution
+def long_run_distribution(transitions, initial):
+    n = transitions.shape[0]
+    # Only states reachable from the start matter
+    reachable = np.zeros(n, dtype=bool)
+    frontier = np.flatnonzero(initial > 0)
+    reachable[frontier] = True
+    while frontier.size:
+        nxt = np.flatnonzero((transitions[frontier] > 0).any(axis=0) & ~reachable)
+        reachable[nxt] = True
+        frontier = nxt
+    states = np.flatnonzero(reachable)
+    P = transitions[np.ix_(states, states)]
+    start = initial[states]
+    adjacency = [np.flatnonzero(row > 0).tolist() for row in P]
+
+    components = _components(adjacency)
+    component_of = np.empty(len(states), dtype=np.intp)
+    for c, members in enumerate(components):
+        component_of[members] = c
+    closed = [c for c, members in enumerate(components)
+              if all(component_of[j] == c for i in members for j in adjacency[i])]
+
+    # Probability of ending in each closed class
+    in_closed = np.isin(component_of, closed)
+    transient = np.flatnonzero(~in_closed)
+    absorb = np.zeros(len(closed))
+    for k, c in enumerate(closed):
+        absorb[k] = start[component_of == c].sum()
+    if transient.size:
+        Q = P[np.ix_(transient, transient)]
+        visits = np.linalg.solve((np.eye(transient.size) - Q).T, start[transient])
+        for k, c in enumerate(closed):
+            members = np.flatnonzero(component_of == c)
+            absorb[k] += visits @ P[np.ix_(transient, members)].sum(axis=1)
+
+    # Stationary distribution inside each closed class (periodic classes included)
+    distribution = np.zeros(len(states))
+    for k, c in enumerate(closed):
+        if absorb[k] <= 0:
+            continue
+        members = np.flatnonzero(component_of == c)
+        block = P[np.ix_(members, members)]
+        system = np.vstack((block.T - np.eye(members.size), np.ones((1, members.size))))
+        target = np.zeros(members.size + 1)
+        target[-1] = 1.0
+        pi = np.linalg.lstsq(system, target, rcond=None)[0]
+        distribution[members] += absorb[k] * pi
+
+    full = np.zeros(n)
+    full[states] = distribution
+    return full
+
+
+# Function to compute the exact long-run draw/win/loss rates of a against b
+def evaluate(a, b):
+    transitions, rewards, initial = joint_chain(a, b)
+    distribution = long_run_distribution(transitions, initial)
+    draw, win, loss = (distribution @ rewards).tolist()
+    return {"draw": draw, "win": win, "loss": loss}
+
+
+# Function to estimate the same rates by playing rounds (for comparison).
+# Rounds are split over independent runs, each from a freshly drawn start state,
+# because the exact rates are an expectation over the start distribution.
+def simulate(a, b, rounds, seed=0, runs=20):
+    rng = np.random.default_rng(seed)
+    cumulative_a = np.cumsum(a.policy, axis=1)
+    cumulative_b = np.cumsum(b.policy, axis=1)
+    counts = [0, 0, 0]
+    last_move = a.rules.size - 1
+    resolve = a.rules.resolve
+    per_run = max(1, rounds // runs)
+    for _ in range(runs):
+        state_a = rng.choice(a.states, p=a.initial)
+        state_b = rng.choice(b.states, p=b.initial)
+        draws = rng.random((per_run, 2))
+        for i in range(per_run):
+            move_a = min(last_move, int(np.searchsorted(cumulative_a[state_a], draws[i, 0], side="right")))
+            move_b = min(last_move, int(np.searchsorted(cumulative_b[state_b], draws[i, 1], side="right")))
+            counts[resolve(move_a, move_b)] += 1
+            state_a = a.next_state[state_a, move_a, move_b]
+            state_b = b.next_state[state_b, move_b, move_a]
+    total = per_run * runs
+    return {"draw": counts[0] / total, "win": counts[1] / total, "loss": counts[2] / total}
+
+
+def main(rounds=200_000):
+    spock = engine.RULESETS["Lizard Spock"]
+    leagues = [
+        [
+            fixed_mix([1, 0, 0], "Always Rock"),
+            fixed_mix([0.5, 0.3, 0.2]),
+            cycle([engine.ROCK, engine.PAPER, engine.SCISSORS]),
+            cycle([engine.ROCK, engine.ROCK, engine.PAPER]),
+            beat_last(),
+            win_stay_lose_shift(),
+        ],
+        [
+            fixed_mix([0.4, 0.15, 0.15, 0.15, 0.15], "Mostly Rock"),
+            cycle([0, 1, 2, 3, 4], rules=spock),
+            beat_last(spock),
+            win_stay_lose_shift(spock),
+        ],
+    ]
+    print(f"{'matchup':<50} {'exact win':>10} {'time':>8}   {'simulated':>10} {'time':>8}")
+    for strategies in leagues:
+        print(strategies[0].rules.name)
+        for i, a in enumerate(strategies):
+            for b in strategies[i + 1:]:
+                start = time.perf_counter()
+                exact = evaluate(a, b)
+                exact_time = time.perf_counter() - start
+                start = time.perf_counter()
+                sim = simulate(a, b, rounds, seed=random.randrange(1 << 30))
+                sim_time = time.perf_counter() - start
+                print(f"{a.name + ' vs ' + b.name:<50} {exact['win']:10.4f} {exact_time * 1000:6.2f}ms"
+                      f"   {sim['win']:10.4f} {sim_time:7.2f}s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,189 @@
+import random
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import engine
+
+# Computer opponents.
+# Every opponent learns from the player's move sequence with fixed-size
+# tables, so choose() and observe() cost the same on round 10 and round
+# 10 million. Predictors guess the player's next move; the opponent then
+# plays the choice that beats the guess. Tables are sized from the rule set.
+# Markov contexts are only stored once they have been seen, and at most
+# MAX_CONTEXTS of them are kept (the least recently seen one is dropped), so
+# games with many choices cost no more per move and the tables stay bounded:
+# an order-3 table for 101 choices would otherwise grow towards 101^3 rows.
+
+DEFAULT_BUDGET_US = 50.0  # per-move time budget (choose + observe), p99
+PROBE_MOVES = 2000
+COUNT_LIMIT = 1 << 20     # counts are halved past this so tables adapt and stay small
+MAX_CONTEXTS = 4096       # Markov contexts kept per predictor (least recently seen are dropped)
+
+
+class OpponentTooSlow(Exception):
+    pass
+
+
+# Function to find the choice that beats a given choice
+def counter(choice, rules=engine.CLASSIC):
+    return rules.counter(choice)
+
+
+# Function to halve a row of counts in place
+def _decay(row):
+    for i in range(len(row)):
+        row[i] >>= 1
+
+
+class FrequencyPredictor:
+    # The most common move is tracked as counts grow, so predict() never scans the counts
+    def __init__(self, choices=3):
+        self.counts = [0] * choices
+        self.best = 0
+
+    def predict(self):
+        return self.best if self.counts[self.best] else None
+
+    def update(self, player):
+        counts = self.counts
+        counts[player] += 1
+        if counts[player] > counts[self.best]:
+            self.best = player
+        if counts[player] > COUNT_LIMIT:
+            _decay(counts)
+
+
+class MarkovPredictor:
+    def __init__(self, order=1, choices=3, max_contexts=MAX_CONTEXTS):
+        self.order = order
+        self.choices = choices
+        self.states = choices ** order
+        self.max_contexts = max_contexts
+        self.table = OrderedDict()  # state -> counts of the next move, least recently seen first
+        self.best = {}              # state -> most common next move in that state
+        self.state = 0  # last `order` moves as a base-`choices` number
+        self.seen = 0
+
+    def predict(self):
+        if self.seen < self.order:
+            return None
+        return self.best.get(self.state)
+
+    def update(self, player):
+        if self.seen >= self.order:
+            row = self.table.get(self.state)
+            if row is None:
+                if len(self.table) >= self.max_contexts:
+                    oldest, _ = self.table.popitem(last=False)
+                    del self.best[oldest]
+                row = self.table[self.state] = [0] * self.choices
+                self.best[self.state] = player
+            else:
+                self.table.move_to_end(self.state)
+            row[player] += 1
+            if row[player] > row[self.best[self.state]]:
+                self.best[self.state] = player
+            if row[player] > COUNT_LIMIT:
+                _decay(row)
+        else:
+            self.seen += 1
+        self.state = (self.state * self.choices + player) % self.states
+
+
+class MixturePredictor:
+    # Mixture of experts: follows whichever predictor has been right most often lately
+    def __init__(self, experts, decay=0.95):
+        self.experts = experts
+        self.decay = decay
+        self.scores = [0.0] * len(experts)
+        self.guesses = [None] * len(experts)
+
+    def predict(self):
+        self.guesses = [expert.predict() for expert in self.experts]
+        best = max(range(len(self.experts)), key=self.scores.__getitem__)
+        return self.guesses[best]
+
+    def update(self, player):
+        for i, expert in enumerate(self.experts):
+            guess = self.guesses[i]
+            hit = 1.0 if guess == player else (0.0 if guess is None else -1.0)
+            self.scores[i] = self.scores[i] * self.decay + hit
+            expert.update(player)
+
+
+class Opponent:
+    def __init__(self, name, predictor=None, rng=random, rules=engine.CLASSIC):
+        self.name = name
+        self.predictor = predictor
+        self.rng = rng
+        self.rules = rules
+
+    def choose(self):
+        guess = self.predictor.predict() if self.predictor is not None else None
+        if guess is None:
+            return self.rng.randrange(self.rules.size)
+        return self.rules.counter(guess)
+
+    def observe(self, player, computer):
+        if self.predictor is not None:
+            self.predictor.update(player)
+
+
+STRATEGIES = {
+    "Random": lambda rng, rules=engine.CLASSIC: Opponent("Random", None, rng, rules),
+    "Frequency": lambda rng, rules=engine.CLASSIC: Opponent(
+        "Frequency", FrequencyPredictor(rules.size), rng, rules),
+    "Markov (order 1)": lambda rng, rules=engine.CLASSIC: Opponent(
+        "Markov (order 1)", MarkovPredictor(1, rules.size), rng, rules),
+    "Markov (order 2)": lambda rng, rules=engine.CLASSIC: Opponent(
+        "Markov (order 2)", MarkovPredictor(2, rules.size), rng, rules),
+    "Markov (order 3)": lambda rng, rules=engine.CLASSIC: Opponent(
+        "Markov (order 3)", MarkovPredictor(3, rules.size), rng, rules),
+    "Mixture of experts": lambda rng, rules=engine.CLASSIC: Opponent("Mixture of experts", MixturePredictor(
+        [FrequencyPredictor(rules.size), MarkovPredictor(1, rules.size), MarkovPredictor(2, rules.size),
+         MarkovPredictor(3, rules.size)]), rng, rules),
+}
+
+
+# Function to time choose() + observe() per move, in microseconds (p50, p99)
+def measure_latency(opponent, moves=PROBE_MOVES, seed=0):
+    player_rng = random.Random(seed)
+    samples = np.empty(moves, dtype=np.float64)
+    for i in range(moves):
+        player = player_rng.randrange(opponent.rules.size)
+        start = time.perf_counter_ns()
+        computer = opponent.choose()
+        opponent.observe(player, computer)
+        samples[i] = (time.perf_counter_ns() - start) / 1000
+    p50, p99 = np.percentile(samples, [50, 99]).tolist()
+    return p50, p99
+
+
+# Function to create an opponent, rejecting it if it is over the per-move budget
+def build_opponent(name, rng=random, budget_us=DEFAULT_BUDGET_US, rules=engine.CLASSIC):
+    factory = STRATEGIES[name]
+    _, p99 = measure_latency(factory(random.Random(0), rules))
+    if p99 > budget_us:
+        raise OpponentTooSlow(f"{name} takes {p99:.1f} us per move (budget {budget_us:.1f} us)")
+    return factory(rng, rules)
+
+
+# Function to print the latency of every strategy at two session lengths
+def benchmark(moves=100_000, rules=engine.CLASSIC):
+    print(f"{rules.name} ({rules.size} choices)")
+    print(f"{'strategy':<20} {'p50 us':>8} {'p99 us':>8} {'p99 after':>10}")
+    for name, factory in STRATEGIES.items():
+        opponent = factory(random.Random(0), rules)
+        p50, p99 = measure_latency(opponent, PROBE_MOVES)
+        measure_latency(opponent, moves, seed=1)  # grow the session
+        _, late_p99 = measure_latency(opponent, PROBE_MOVES, seed=2)
+        verdict = "ok" if p99 <= DEFAULT_BUDGET_US else "over budget"
+        print(f"{name:<20} {p50:8.2f} {p99:8.2f} {late_p99:10.2f}  {verdict}")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000,
+              engine.RULESETS[sys.argv[2]] if len(sys.argv) > 2 else engine.CLASSIC)
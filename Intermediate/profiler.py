@@ -0,0 +1,151 @@
+import csv
+import time
+
+import numpy as np
+import dearpygui.dearpygui as dpg
+
+# Optional callback and frame-time profiler.
+# Durations are measured with time.perf_counter_ns and kept per name in
+# fixed-size ring buffers, so profiling never grows memory. Percentiles are
+# only computed when the debug window is refreshed.
+
+SAMPLE_CAPACITY = 16384
+GRAPH_FRAMES = 600
+
+
+class SampleRing:
+    def __init__(self, capacity=SAMPLE_CAPACITY):
+        self._samples = np.zeros(capacity, dtype=np.float64)
+        self.count = 0  # total samples ever recorded
+
+    def add(self, ms):
+        self._samples[self.count % self._samples.shape[0]] = ms
+        self.count += 1
+
+    # Retained samples, oldest first
+    def values(self):
+        capacity = self._samples.shape[0]
+        if self.count <= capacity:
+            return self._samples[:self.count]
+        start = self.count % capacity
+        return np.concatenate((self._samples[start:], self._samples[:start]))
+
+    def percentiles(self):
+        values = self.values()
+        if values.size == 0:
+            return 0.0, 0.0, 0.0
+        return tuple(np.percentile(values, [50, 95, 99]).tolist())
+
+
+class Profiler:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.rings = {}
+        self.errors = 0
+
+    def record(self, name, ms):
+        ring = self.rings.get(name)
+        if ring is None:
+            ring = self.rings[name] = SampleRing()
+        ring.add(ms)
+
+    # Decorator that times a function under the given name while profiling is on.
+    # Dear PyGui picks how many arguments to pass a callback from its
+    # co_argcount, so the wrapper keeps the wrapped function's arity.
+    def timed(self, name):
+        def decorate(fn):
+            def run(args, kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(name, (time.perf_counter_ns() - start) / 1e6)
+
+            argcount = fn.__code__.co_argcount
+            if argcount == 0:
+                def wrapper():
+                    return run((), {})
+            elif argcount == 3 and not fn.__defaults__:
+                def wrapper(sender=None, app_data=None, user_data=None):
+                    return run((sender, app_data, user_data), {})
+            else:
+                def wrapper(*args, **kwargs):
+                    return run(args, kwargs)
+            wrapper.__name__ = fn.__name__
+            wrapper.__doc__ = fn.__doc__
+            return wrapper
+        return decorate
+
+    # Context for timing a block, e.g. one frame
+    def measure(self, name):
+        return _Measure(self, name)
+
+    def summary(self):
+        rows = []
+        for name in sorted(self.rings):
+            ring = self.rings[name]
+            rows.append((name, ring.count) + ring.percentiles())
+        return rows
+
+    # Write every retained sample as name,index,milliseconds
+    def dump(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "sample", "ms"])
+            for name in sorted(self.rings):
+                ring = self.rings[name]
+                first = max(0, ring.count - SAMPLE_CAPACITY)
+                for i, ms in enumerate(ring.values().tolist(), first):
+                    writer.writerow([name, i, f"{ms:.4f}"])
+
+
+class _Measure:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns() if self.profiler.enabled else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            self.profiler.record(self.name, (time.perf_counter_ns() - self.start) / 1e6)
+        return False
+
+
+# Function to build the debug window (hidden until toggled)
+def build_profiler_window(profiler, dump_callback):
+    with dpg.window(label="Profiler", tag="profiler_window", show=False, width=620, height=520, pos=(240, 40)):
+        with dpg.group(horizontal=True):
+            dpg.add_button(label="Dump samples", callback=dump_callback)
+            dpg.add_text("", tag="profiler_status")
+        with dpg.table(header_row=True, tag="profiler_table"):
+            for label in ["Name", "Calls", "p50 ms", "p95 ms", "p99 ms"]:
+                dpg.add_table_column(label=label)
+        with dpg.plot(label="Frame time (ms)", height=220, width=-1):
+            dpg.add_plot_axis(dpg.mvXAxis, tag="profiler_x_axis", no_tick_labels=True)
+            with dpg.plot_axis(dpg.mvYAxis, tag="profiler_y_axis"):
+                dpg.add_line_series([], [], tag="profiler_frame_series")
+
+
+# Function to refresh the debug window from the collected samples
+def refresh_profiler_window(profiler):
+    dpg.delete_item("profiler_table", children_only=True, slot=1)  # slot 1 holds the rows
+    for name, count, p50, p95, p99 in profiler.summary():
+        with dpg.table_row(parent="profiler_table"):
+            dpg.add_text(name)
+            dpg.add_text(f"{count:,}")
+            dpg.add_text(f"{p50:.3f}")
+            dpg.add_text(f"{p95:.3f}")
+            dpg.add_text(f"{p99:.3f}")
+    dpg.configure_item("profiler_status", default_value=f"Errors in main loop: {profiler.errors}")
+
+    ring = profiler.rings.get("frame")
+    if ring is not None:
+        frames = ring.values()[-GRAPH_FRAMES:]
+        dpg.set_value("profiler_frame_series", [list(range(frames.size)), frames.tolist()])
+        dpg.fit_axis_data("profiler_x_axis")
+        dpg.fit_axis_data("profiler_y_axis")
@@ -0,0 +1,149 @@
+import numpy as np
+
+import engine
+
+# Outcome counts for any window of the history, without rescanning it.
+# The index keeps the number of wins and draws before every round (losses
+# are the rest), 8 bytes a round. Counts for rounds [start, end) are a
+# difference of two entries. Time windows find their rounds by binary search
+# over the history's timestamps, which works as long as rounds were recorded
+# in time order (live play always is). Appending logs from other stations
+# can break that order. In that case a time-sorted copy of the counts is
+# built when a time window is first asked for, and extended cheaply while
+# later rounds keep arriving in order (its buffers double like the index's).
+
+
+# Function to convert a time to the history's timestamp type. Searching a uint32
+# array for a Python int would convert the whole array first.
+def _as_time(timestamp):
+    return np.uint32(min(max(int(timestamp), 0), np.iinfo(np.uint32).max))
+
+
+class RangeIndex:
+    def __init__(self, history):
+        self.history = history  # timestamps are read from the history when a time window is asked for
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self._wins = np.zeros(1024, dtype=np.uint32)   # wins in rounds [0, i)
+        self._draws = np.zeros(1024, dtype=np.uint32)  # draws in rounds [0, i)
+        self.in_time_order = True
+        self._last_time = 0
+        self._by_time = None  # (sorted times, wins before, draws before) buffers when out of order
+        self._sorted = 0      # rounds in the time-sorted copy
+
+    def _reserve(self, needed):
+        capacity = self._wins.shape[0]
+        if needed < capacity:
+            return
+        while capacity <= needed:
+            capacity *= 2
+        for name in ("_wins", "_draws"):
+            grown = np.zeros(capacity, dtype=np.uint32)
+            grown[:self.count + 1] = getattr(self, name)[:self.count + 1]
+            setattr(self, name, grown)
+
+    # Index a round that was just appended to the history
+    def append(self, outcome, timestamp):
+        i = self.count
+        self._reserve(i + 1)
+        self._wins[i + 1] = self._wins[i] + (outcome == engine.WIN)
+        self._draws[i + 1] = self._draws[i] + (outcome == engine.DRAW)
+        self.count += 1
+        if timestamp < self._last_time:
+            self.in_time_order = False
+        self._last_time = max(self._last_time, timestamp)
+
+    # Index a whole array of rounds at once (restores and imports)
+    def extend(self, outcomes, timestamps):
+        outcomes = np.asarray(outcomes)
+        timestamps = np.asarray(timestamps)
+        added = outcomes.shape[0]
+        if added == 0:
+            return
+        i = self.count
+        self._reserve(i + added)
+        self._wins[i + 1:i + added + 1] = self._wins[i] + np.cumsum(outcomes == engine.WIN)
+        self._draws[i + 1:i + added + 1] = self._draws[i] + np.cumsum(outcomes == engine.DRAW)
+        self.count += added
+        if timestamps[0] < self._last_time or (np.diff(timestamps.astype(np.int64)) < 0).any():
+            self.in_time_order = False
+        self._last_time = max(self._last_time, int(timestamps.max()))
+
+    # [draws, wins, losses] for rounds [start, end), indexed like engine outcomes
+    def rounds(self, start=0, end=None):
+        end = self.count if end is None else min(max(end, 0), self.count)
+        start = min(max(start, 0), end)
+        wins = int(self._wins[end]) - int(self._wins[start])
+        draws = int(self._draws[end]) - int(self._draws[start])
+        return [draws, wins, end - start - wins - draws]
+
+    # Rounds [start, end) whose timestamps lie in [since, until), when the history is in time order
+    def round_span(self, since, until=None):
+        times = self.history.timestamps()[:self.count]
+        start = int(np.searchsorted(times, _as_time(since), side="left"))
+        end = self.count if until is None else int(np.searchsorted(times, _as_time(until), side="left"))
+        return start, max(start, end)
+
+    # [draws, wins, losses] for the rounds played in [since, until) (epoch seconds)
+    def between(self, since, until=None):
+        if self.in_time_order:
+            return self.rounds(*self.round_span(since, until))
+        times, wins, draws = self._time_sorted()
+        start = int(np.searchsorted(times, _as_time(since), side="left"))
+        end = times.shape[0] if until is None else max(start, int(np.searchsorted(times, _as_time(until), side="left")))
+        won = int(wins[end]) - int(wins[start])
+        drawn = int(draws[end]) - int(draws[start])
+        return [drawn, won, end - start - won - drawn]
+
+    # Function to grow the time-sorted buffers to hold `needed` rounds
+    def _reserve_sorted(self, needed):
+        times, wins, draws = self._by_time
+        capacity = times.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        grown = (np.empty(capacity, dtype=np.uint32), np.zeros(capacity + 1, dtype=np.uint32),
+                 np.zeros(capacity + 1, dtype=np.uint32))
+        grown[0][:self._sorted] = times[:self._sorted]
+        grown[1][:self._sorted + 1] = wins[:self._sorted + 1]
+        grown[2][:self._sorted + 1] = draws[:self._sorted + 1]
+        self._by_time = grown
+
+    # Counts in time order, brought up to date with the rounds appended since the last call
+    def _time_sorted(self):
+        times = self.history.timestamps()[:self.count]
+        outcomes = self.history.outcomes()[:self.count]
+        done = self._sorted
+        if self._by_time is not None and done != self.count:
+            new_times = times[done:]
+            if (0 < done < self.count and new_times[0] >= self._by_time[0][done - 1]
+                    and not (np.diff(new_times.astype(np.int64)) < 0).any()):
+                # Later rounds arrived in order: append them to the sorted copy
+                new_outcomes = outcomes[done:]
+                self._reserve_sorted(self.count)
+                sorted_times, wins, draws = self._by_time
+                sorted_times[done:self.count] = new_times
+                wins[done + 1:self.count + 1] = wins[done] + np.cumsum(new_outcomes == engine.WIN, dtype=np.uint32)
+                draws[done + 1:self.count + 1] = draws[done] + np.cumsum(new_outcomes == engine.DRAW, dtype=np.uint32)
+            else:
+                self._by_time = None
+        if self._by_time is None:
+            capacity = 1024
+            while capacity < self.count:
+                capacity *= 2
+            order = np.argsort(times, kind="stable")
+            ordered = outcomes[order]
+            self._by_time = (np.empty(capacity, dtype=np.uint32), np.zeros(capacity + 1, dtype=np.uint32),
+                             np.zeros(capacity + 1, dtype=np.uint32))
+            self._by_time[0][:self.count] = times[order]
+            np.cumsum(ordered == engine.WIN, dtype=np.uint32, out=self._by_time[1][1:self.count + 1])
+            np.cumsum(ordered == engine.DRAW, dtype=np.uint32, out=self._by_time[2][1:self.count + 1])
+        self._sorted = self.count
+        sorted_times, wins, draws = self._by_time
+        return sorted_times[:self.count], wins[:self.count + 1], draws[:self.count + 1]
+
+    def memory_bytes(self):
+        return self._wins.nbytes + self._draws.nbytes
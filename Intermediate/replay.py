@@ -0,0 +1,200 @@
+import argparse
+import hashlib
+import os
+import secrets
+import struct
+import sys
+import time
+
+import numpy as np
+
+import engine
+from autosave import recover
+from opponents import STRATEGIES
+from roundlog import LogFormatError
+
+# Seeded sessions and input recordings.
+# Every local session draws the computer's random choices from its own
+# random.Random, seeded when the session starts (RPS_SEED fixes the seed).
+# The player's inputs are appended to a small recording next to the session
+# log, one 6-byte event per input: a choice, an opponent change, or a new
+# seed when a session starts (app start, reset, import). Opponents start
+# learning from scratch at every seed, so the rounds after a seed depend only
+# on the seed and the inputs that follow it. Replaying a recording feeds the
+# same inputs through the same round pipeline and reproduces them exactly.
+
+INPUT_MAGIC = b"RPSINPT\x00"
+INPUT_VERSION = 1
+INPUT_HEADER = struct.Struct("<8sHHQQ")  # magic, version, number of choices, rounds before it, start (epoch ms)
+EVENT = struct.Struct("<BBI")             # kind, value, payload
+EVENT_DTYPE = np.dtype([("kind", "u1"), ("value", "u1"), ("payload", "<u4")])
+
+CHOICE = 0    # value: choice code; payload: ms since the previous event
+OPPONENT = 1  # value: index in STRATEGIES; payload: ms since the previous event
+SEED = 2      # payload: seed of the session's random stream
+
+STRATEGY_NAMES = list(STRATEGIES)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SESSION_INPUTS = os.path.join(HERE, "rps_session.inputs")
+
+
+# Function to pick the seed for a new session (RPS_SEED makes every session use the same one)
+def new_seed():
+    fixed = os.environ.get("RPS_SEED", "")
+    return int(fixed) & 0xFFFFFFFF if fixed else secrets.randbits(32)
+
+
+# Function to read a recording: (rules, rounds before it, start time in ms, events)
+def read_recording(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < INPUT_HEADER.size:
+        raise LogFormatError(f"{path} is too short to be an input recording")
+    magic, version, size, base, started = INPUT_HEADER.unpack_from(data)
+    if magic != INPUT_MAGIC or version != INPUT_VERSION:
+        raise LogFormatError(f"{path} is not an input recording")
+    try:
+        rules = engine.rules_for_size(size)
+    except KeyError:
+        raise LogFormatError(f"{path} was recorded for an unknown {size}-choice game")
+    # A torn final event (crash mid-append) is ignored
+    count = (len(data) - INPUT_HEADER.size) // EVENT.size
+    return rules, base, started, np.frombuffer(data, dtype=EVENT_DTYPE, count=count, offset=INPUT_HEADER.size)
+
+
+# Function to fingerprint a history's rounds from `start` on (timestamps are left out), for
+# comparing a replay with the original session
+def digest(history, start=0):
+    return hashlib.sha256(history.codes()[start:].tobytes()).hexdigest()[:16]
+
+
+class InputRecorder:
+    def __init__(self, path):
+        self.path = path
+        self.rounds = 0  # rounds the recording covers, including the ones before it
+        self._file = None
+        self._last_ms = 0
+
+    # Function to start a new recording for a session that already has `base` rounds
+    def start(self, rules, base, seed, opponent_name):
+        self.close()
+        now = int(time.time() * 1000)
+        self._file = open(self.path, "wb")
+        self._file.write(INPUT_HEADER.pack(INPUT_MAGIC, INPUT_VERSION, rules.size, base, now))
+        self._last_ms = now
+        self.rounds = base
+        self.seed(seed, opponent_name)
+
+    # Function to carry on an existing recording if it covers exactly the restored history
+    def resume(self, history, seed, opponent_name):
+        try:
+            rules, base, _, events = read_recording(self.path)
+            covered = base + int((events["kind"] == CHOICE).sum())
+        except (OSError, LogFormatError):
+            rules, covered = None, -1
+        if rules is not history.rules or covered != len(history):
+            self.start(history.rules, len(history), seed, opponent_name)
+            return False
+        self._file = open(self.path, "r+b")
+        self._file.truncate(INPUT_HEADER.size + len(events) * EVENT.size)  # drop a torn event
+        self._file.seek(0, os.SEEK_END)
+        self._last_ms = int(time.time() * 1000)
+        self.rounds = covered
+        self.seed(seed, opponent_name)
+        return True
+
+    def _write(self, kind, value, payload):
+        self._file.write(EVENT.pack(kind, value, payload))
+        self._file.flush()
+
+    def _elapsed(self):
+        now = int(time.time() * 1000)
+        elapsed = min(max(now - self._last_ms, 0), 0xFFFFFFFF)
+        self._last_ms = now
+        return elapsed
+
+    # A new random stream: the opponent is rebuilt and starts learning again
+    def seed(self, seed, opponent_name):
+        self._write(SEED, 0, seed)
+        self.opponent(opponent_name)
+
+    def opponent(self, name):
+        self._write(OPPONENT, STRATEGY_NAMES.index(name), self._elapsed())
+
+    def choice(self, code):
+        self._write(CHOICE, code, self._elapsed())
+        self.rounds += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Replay:
+    # Steps through a recording's events; the caller plays each one
+    def __init__(self, path):
+        self.path = path
+        self.rules, self.base, self.started_ms, self.events = read_recording(path)
+        self.position = 0
+        self.rounds = int((self.events["kind"] == CHOICE).sum())
+        self.played = 0
+        self.started_at = None  # perf_counter when the first event was played
+        self.recorded_ms = int(self.events["payload"][self.events["kind"] != SEED].sum(dtype=np.int64))
+
+    @property
+    def done(self):
+        return self.position >= len(self.events)
+
+    @property
+    def progress(self):
+        return self.played / self.rounds if self.rounds else 1.0
+
+    # Function to hand out the next events as (kind, value, payload) until `deadline` (perf_counter seconds)
+    def take(self, deadline, check_every=64):
+        events = self.events
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+        while self.position < len(events):
+            end = min(self.position + check_every, len(events))
+            for kind, value, payload in events[self.position:end].tolist():
+                self.position += 1
+                if kind == CHOICE:
+                    self.played += 1
+                yield kind, value, payload
+            if time.perf_counter() >= deadline:
+                return
+
+
+# Function to print what a recording holds and the fingerprint of the session rounds it covers
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Describe an input recording and fingerprint the rounds it "
+                                                 "produced, to compare with a replay (RPS_REPLAY=path app.py).")
+    parser.add_argument("path", nargs="?", default=SESSION_INPUTS, help="input recording")
+    parser.add_argument("--log", default=os.path.join(HERE, "rps_session.rpslog"), help="session log")
+    parser.add_argument("--journal", default=os.path.join(HERE, "rps_session.journal"), help="session journal")
+    args = parser.parse_args(argv)
+
+    try:
+        recording = Replay(args.path)
+    except (OSError, LogFormatError) as e:
+        print(f"Could not read input recording: {e}")
+        return 1
+    kinds = np.bincount(recording.events["kind"], minlength=3)
+    print(f"{recording.rules.name}: {kinds[CHOICE]:,} choices, {kinds[OPPONENT]:,} opponent changes, "
+          f"{kinds[SEED]:,} seeds over {recording.recorded_ms / 1000:.1f}s, after {recording.base:,} earlier rounds")
+    try:
+        history, _ = recover(args.log, args.journal, recording.rules)
+    except (OSError, LogFormatError) as e:
+        print(f"Could not read the session log: {e}")
+        return 1
+    if history.rules is not recording.rules or len(history) != recording.base + recording.rounds:
+        print(f"The session log has {len(history):,} {history.rules.name} rounds; it does not match this recording")
+        return 1
+    print(f"Digest of the recorded rounds: {digest(history, recording.base)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
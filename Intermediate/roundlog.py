@@ -0,0 +1,171 @@
+import mmap
+import os
+import struct
+
+import numpy as np
+
+import engine
+from history import RoundHistory, code_layout
+
+# Append-only binary round log.
+# A 16 byte header is followed by fixed-size records, one per round:
+# a uint32 epoch-seconds timestamp and the packed round code from history.py.
+# Appending is a single small write (5 bytes for the classic game); reading
+# maps the file and views the records as a NumPy array without parsing anything.
+# The header records how many choices the game had, so a log always reloads
+# with its own rule set. Logs written before variants existed store 0 there
+# and are classic games.
+
+MAGIC = b"RPSLOG\x00\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sHHI")  # magic, version, record size, number of choices
+CODE_FORMATS = {1: "B", 2: "H", 4: "I"}
+
+
+# Function to get the record struct and dtype for a rule set's packed codes
+def record_format(rules):
+    code_dtype, _ = code_layout(rules)
+    record = struct.Struct("<I" + CODE_FORMATS[code_dtype.itemsize])  # timestamp, packed code
+    dtype = np.dtype([("time", "<u4"), ("code", code_dtype.newbyteorder("<"))])
+    return record, dtype
+
+
+RECORD, RECORD_DTYPE = record_format(engine.CLASSIC)
+
+
+class LogFormatError(Exception):
+    pass
+
+
+# Function to check a header and return the rule set it declares
+def _check_header(data, path):
+    if len(data) < HEADER.size:
+        raise LogFormatError(f"{path} is too short to be a round log")
+    magic, version, record_size, size = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise LogFormatError(f"{path} is not a round log")
+    try:
+        rules = engine.rules_for_size(size or 3)
+    except KeyError:
+        raise LogFormatError(f"{path} was written for an unknown {size}-choice game")
+    if version != VERSION or record_size != record_format(rules)[0].size:
+        raise LogFormatError(f"{path} uses unsupported log version {version}")
+    return rules
+
+
+# Function to map a log file and return its rule set and records as a structured array
+def read_log(path):
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return engine.CLASSIC, np.empty(0, dtype=RECORD_DTYPE)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    rules = _check_header(mapped, path)
+    record, dtype = record_format(rules)
+    # A torn final record (crash mid-write) is ignored
+    count = (size - HEADER.size) // record.size
+    return rules, np.frombuffer(mapped, dtype=dtype, count=count, offset=HEADER.size)
+
+
+# Function to load a log file into a RoundHistory (a new history uses the given rules)
+def load_history(path, rules=engine.CLASSIC):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return RoundHistory(rules=rules)
+    rules, records = read_log(path)
+    history = RoundHistory(rules=rules)
+    history.extend_packed(records["code"], records["time"])
+    return history
+
+
+# Function to flush a file's directory entry to disk (a rename is only durable after this)
+def sync_dir(path):
+    if not hasattr(os, "O_DIRECTORY"):
+        return  # not possible (or needed) on Windows
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# Function to write a whole log to a temp file and move it into place.
+# A crash leaves either the old log or the new one, never a mix.
+def save_log(path, rules, codes, timestamps, header=None):
+    record, dtype = record_format(rules)
+    records = np.empty(len(codes), dtype=dtype)
+    records["time"] = timestamps
+    records["code"] = codes
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header or HEADER.pack(MAGIC, VERSION, record.size, rules.size))
+        f.write(records.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    sync_dir(path)
+
+
+class RoundLog:
+    def __init__(self, path, rules=engine.CLASSIC):
+        self.path = path
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._set_rules(rules)
+            self._write_header()
+        else:
+            with open(path, "rb") as f:
+                logged = _check_header(f.read(HEADER.size), path)
+            if logged is not rules:
+                self._file.close()
+                raise LogFormatError(f"{path} holds a {logged.name} game, not {rules.name}")
+            self._set_rules(rules)
+            self._drop_torn_record()
+
+    def _set_rules(self, rules):
+        self.rules = rules
+        self._record, self._dtype = record_format(rules)
+
+    def _write_header(self):
+        self._file.write(HEADER.pack(MAGIC, VERSION, self._record.size, self.rules.size))
+        self._file.flush()
+
+    # Cut off a partial record left by a crash so new records stay aligned
+    def _drop_torn_record(self):
+        size = self._file.tell()
+        extra = (size - HEADER.size) % self._record.size
+        if extra:
+            self._file.truncate(size - extra)
+            self._file.seek(0, os.SEEK_END)
+
+    def append(self, code, timestamp):
+        self._file.write(self._record.pack(timestamp, code))
+        self._file.flush()
+
+    # Append many rounds with a single write
+    def append_batch(self, codes, timestamps):
+        records = np.empty(len(codes), dtype=self._dtype)
+        records["time"] = timestamps
+        records["code"] = codes
+        self._file.write(records.tobytes())
+        self._file.flush()
+
+    # Replace the log contents with a whole history (used after imports)
+    def rewrite(self, history):
+        self._set_rules(history.rules)
+        records = np.empty(len(history), dtype=self._dtype)
+        records["time"] = history.timestamps()
+        records["code"] = history.codes()
+        self._file.truncate(0)
+        self._write_header()
+        self._file.write(records.tobytes())
+        self._file.flush()
+
+    # Drop every round; passing a rule set starts a log for that game
+    def clear(self, rules=None):
+        if rules is not None:
+            self._set_rules(rules)
+        self._file.truncate(0)
+        self._write_header()
+
+    def close(self):
+        self._file.close()
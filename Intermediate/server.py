@@ -0,0 +1,301 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import re
+import secrets
+import sys
+import time
+
+import engine
+from opponents import DEFAULT_BUDGET_US, STRATEGIES, measure_latency
+from roundlog import LogFormatError, RoundLog, load_history
+from stats import RoundStats
+
+# Headless game server.
+# Players talk to it over a local TCP connection, one JSON object per line:
+#   {"op": "hello", "session": "...", "rules": "Classic", "opponent": "Random"}
+#   {"op": "play", "choice": "Rock"}           (a choice name or code)
+#   {"op": "stats"}, {"op": "history", "start": 0}, {"op": "reset", "rules": "..."},
+#   {"op": "opponent", "name": "Frequency"}
+# and every request gets exactly one reply line with "ok" set. Requests can be
+# pipelined. Each session has its own history, statistics and opponent, and its
+# own round log in the data directory so it can be resumed by id. Rounds are
+# not written one by one: a flusher collects each session's new rounds every
+# flush interval and writes them in one append per session, off the event loop.
+
+PROTOCOL = 1
+DEFAULT_PORT = 8765
+FLUSH_INTERVAL = 0.5
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions")
+SESSION_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+class RequestError(Exception):
+    pass
+
+
+class GameSession:
+    def __init__(self, session_id, path, rules, opponent_name):
+        self.id = session_id
+        self.path = path
+        self.history = load_history(path, rules)
+        self.rules = self.history.rules
+        self.stats = RoundStats(self.rules.size)
+        self.stats.record_batch(self.history.players(), self.history.computers(), self.history.outcomes())
+        self.rng = random.Random()
+        self.opponent = STRATEGIES[opponent_name](self.rng, self.rules)
+        self.clients = 0
+        self.persisted = len(self.history)  # rounds already in the log
+        self.cleared = False                # log must be started over at the next flush
+
+    # Function to play one round (same pipeline as the GUI's play_round)
+    def play(self, player):
+        computer = self.opponent.choose()
+        outcome = self.rules.resolve(player, computer)
+        self.opponent.observe(player, computer)
+        self.stats.record(player, computer, outcome)
+        timestamp = int(time.time())
+        self.history.append(player, computer, outcome, timestamp)
+        return {
+            "round": len(self.history),
+            "player": player,
+            "computer": computer,
+            "outcome": outcome,
+            "result": engine.RESULTS[outcome],
+            "time": timestamp,
+            "wins": self.stats.wins,
+            "losses": self.stats.losses,
+            "draws": self.stats.draws,
+            "total": self.stats.total,
+        }
+
+    def reset(self, rules=None):
+        self.rules = rules or self.rules
+        self.history.clear(self.rules)
+        self.stats.reset(self.rules.size)
+        self.opponent = STRATEGIES[self.opponent.name](self.rng, self.rules)
+        self.persisted = 0
+        self.cleared = True
+
+    def describe(self):
+        return {"protocol": PROTOCOL, "session": self.id, "rules": self.rules.name,
+                "choices": self.rules.choices, "opponent": self.opponent.name, "total": self.stats.total}
+
+    def snapshot(self):
+        stats = self.stats
+        return {
+            "total": stats.total,
+            "outcome_counts": stats.outcome_counts,
+            "player_counts": stats.player_counts,
+            "computer_counts": stats.computer_counts,
+            "streak_outcome": stats.streak_outcome,
+            "streak_length": stats.streak_length,
+            "longest_streaks": stats.longest_streaks,
+        }
+
+    # Packed rounds from `start` on, base64 encoded little-endian columns
+    def rounds(self, start):
+        start = max(0, min(int(start), len(self.history)))
+        codes = self.history.codes()[start:].astype(self.history.code_dtype.newbyteorder("<"))
+        times = self.history.timestamps()[start:].astype("<u4")
+        return {"rules": self.rules.name, "start": start, "count": len(codes),
+                "codes": base64.b64encode(codes.tobytes()).decode("ascii"),
+                "times": base64.b64encode(times.tobytes()).decode("ascii")}
+
+    # Take the rounds played since the last flush: (path, rules, start over, codes, times)
+    def take_batch(self):
+        if not self.cleared and self.persisted == len(self.history):
+            return None
+        batch = (self.path, self.rules, self.cleared,
+                 self.history.codes()[self.persisted:].copy(), self.history.timestamps()[self.persisted:].copy())
+        self.persisted = len(self.history)
+        self.cleared = False
+        return batch
+
+
+# Function to write collected batches to the session logs (runs on a worker thread)
+def write_batches(batches):
+    for path, rules, start_over, codes, times in batches:
+        try:
+            if start_over and os.path.exists(path):
+                os.remove(path)
+            log = RoundLog(path, rules)
+            try:
+                log.append_batch(codes, times)
+            finally:
+                log.close()
+        except (OSError, LogFormatError) as e:
+            print(f"Could not save {path}: {e}")
+
+
+class GameServer:
+    def __init__(self, data_dir=DATA_DIR, flush_interval=FLUSH_INTERVAL, budget_us=DEFAULT_BUDGET_US):
+        self.data_dir = data_dir
+        self.flush_interval = flush_interval
+        self.budget_us = budget_us
+        self.sessions = {}
+        self.connections = 0
+        self.rounds = 0
+        self._allowed = {}  # (strategy, rule set) -> within the per-move budget
+        os.makedirs(data_dir, exist_ok=True)
+
+    # Function to check a strategy against the move budget once per rule set
+    def _opponent_name(self, name, rules):
+        if name not in STRATEGIES:
+            raise RequestError(f"unknown opponent {name!r}")
+        key = (name, rules.name)
+        if key not in self._allowed:
+            _, p99 = measure_latency(STRATEGIES[name](random.Random(0), rules))
+            self._allowed[key] = p99 <= self.budget_us
+        if not self._allowed[key]:
+            raise RequestError(f"{name} is over the {self.budget_us:.1f} us per-move budget")
+        return name
+
+    def _rules(self, name):
+        if name is None:
+            return None
+        if name not in engine.RULESETS:
+            raise RequestError(f"unknown rule set {name!r}")
+        return engine.RULESETS[name]
+
+    def _attach(self, current, request):
+        session_id = request.get("session") or secrets.token_hex(8)
+        if not isinstance(session_id, str) or not SESSION_ID.fullmatch(session_id):
+            raise RequestError("session ids are 1-64 letters, digits, '-' or '_'")
+        session = self.sessions.get(session_id)
+        if session is None:
+            rules = self._rules(request.get("rules")) or engine.CLASSIC
+            opponent = self._opponent_name(request.get("opponent", "Random"), rules)
+            path = os.path.join(self.data_dir, session_id + ".rpslog")
+            session = self.sessions[session_id] = GameSession(session_id, path, rules, opponent)
+        if current is not None:
+            current.clients -= 1
+        session.clients += 1
+        return session
+
+    def _dispatch(self, session, op, request):
+        if op == "play":
+            choice = request.get("choice")
+            player = session.rules.index.get(choice) if isinstance(choice, str) else choice
+            if type(player) is not int or not 0 <= player < session.rules.size:  # not bool either
+                raise RequestError(f"{choice!r} is not a choice in {session.rules.name}")
+            self.rounds += 1
+            return session.play(player)
+        if op == "stats":
+            return session.snapshot()
+        if op == "history":
+            return session.rounds(request.get("start", 0))
+        if op == "reset":
+            rules = self._rules(request.get("rules")) or session.rules
+            self._opponent_name(session.opponent.name, rules)
+            session.reset(rules)
+            return session.describe()
+        if op == "opponent":
+            name = self._opponent_name(request.get("name"), session.rules)
+            session.opponent = STRATEGIES[name](session.rng, session.rules)
+            return session.describe()
+        raise RequestError(f"unknown op {op!r}")
+
+    # Function to answer one decoded request for a connection.
+    # Returns the connection's session (hello can change it) and the reply.
+    def handle(self, session, request):
+        try:
+            op = request.get("op")
+            if op == "hello":
+                session = self._attach(session, request)
+                reply = session.describe()
+            elif session is None:
+                raise RequestError("send hello first")
+            else:
+                reply = self._dispatch(session, op, request)
+            reply["ok"] = True
+        except (RequestError, LogFormatError, ValueError, TypeError, AttributeError) as e:
+            reply = {"ok": False, "error": str(e)}
+        return session, reply
+
+    # Function to call when a connection using the session goes away
+    def detach(self, session):
+        if session is not None:
+            session.clients -= 1
+
+    async def _handle(self, reader, writer):
+        session = None
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    reply = {"ok": False, "error": str(e)}
+                else:
+                    session, reply = self.handle(session, request)
+                writer.write((json.dumps(reply) + "\n").encode())
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass  # client went away or sent an oversized line
+        finally:
+            self.connections -= 1
+            self.detach(session)
+            writer.close()
+
+    # Function to collect every session's new rounds and write them in one go
+    async def flush(self):
+        batches = []
+        for session_id, session in list(self.sessions.items()):
+            batch = session.take_batch()
+            if batch is not None:
+                batches.append(batch)
+            elif session.clients == 0:
+                # Nobody is connected and everything is on disk, so it can be reloaded later
+                del self.sessions[session_id]
+        if batches:
+            await asyncio.to_thread(write_batches, batches)
+        return len(batches)
+
+    async def _flush_forever(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT, ready=None):
+        server = await asyncio.start_server(self._handle, host, port)
+        flusher = asyncio.create_task(self._flush_forever())
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[1])
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            flusher.cancel()
+            await self.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Rock Paper Scissors sessions over local TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--data-dir", default=DATA_DIR, help="where session logs are kept")
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL, help="seconds between log writes")
+    parser.add_argument("--budget-us", type=float, default=DEFAULT_BUDGET_US, help="per-move opponent budget")
+    args = parser.parse_args(argv)
+
+    game_server = GameServer(args.data_dir, args.flush_interval, args.budget_us)
+
+    def ready(port):
+        print(f"Serving on {args.host}:{port}, session logs in {args.data_dir}", flush=True)
+
+    try:
+        asyncio.run(game_server.serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    print(f"{game_server.rounds:,} rounds played")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,115 @@
+import numpy as np
+
+import engine
+
+# Incremental game statistics.
+# Every counter is updated in O(1) per round and covers the whole session,
+# so reading any statistic never touches the history. Choice counters are
+# sized from the rule set's number of choices.
+
+
+class RoundStats:
+    def __init__(self, choices=3):
+        self.choices = choices
+        self.reset()
+
+    # Clear every counter; passing a number of choices resizes them for another game
+    def reset(self, choices=None):
+        if choices is not None:
+            self.choices = choices
+        self.player_counts = [0] * self.choices
+        self.computer_counts = [0] * self.choices
+        self.outcome_counts = [0, 0, 0]  # indexed by engine.DRAW/WIN/LOSE
+        self.matrix = [[0] * self.choices for _ in range(self.choices)]  # [player][computer]
+        self.streak_outcome = None
+        self.streak_length = 0
+        self.longest_streaks = [0, 0, 0]  # indexed by outcome
+        self.total = 0
+
+    # Fold one round into the statistics
+    def record(self, player, computer, outcome):
+        self.player_counts[player] += 1
+        self.computer_counts[computer] += 1
+        self.outcome_counts[outcome] += 1
+        self.matrix[player][computer] += 1
+        self.total += 1
+
+        if outcome == self.streak_outcome:
+            self.streak_length += 1
+        else:
+            self.streak_outcome = outcome
+            self.streak_length = 1
+        if self.streak_length > self.longest_streaks[outcome]:
+            self.longest_streaks[outcome] = self.streak_length
+
+    # Fold a whole array of rounds in at once (used when restoring a session)
+    def record_batch(self, players, computers, outcomes):
+        players = np.asarray(players, dtype=np.intp)
+        computers = np.asarray(computers, dtype=np.intp)
+        outcomes = np.asarray(outcomes, dtype=np.intp)
+        count = outcomes.shape[0]
+        if count == 0:
+            return
+
+        size = self.choices
+        for i, n in enumerate(np.bincount(players, minlength=size).tolist()):
+            self.player_counts[i] += n
+        for i, n in enumerate(np.bincount(computers, minlength=size).tolist()):
+            self.computer_counts[i] += n
+        for i, n in enumerate(np.bincount(outcomes, minlength=3).tolist()):
+            self.outcome_counts[i] += n
+        pairs = np.bincount(players * size + computers, minlength=size * size).reshape(size, size).tolist()
+        for p in range(size):
+            row = self.matrix[p]
+            for c, n in enumerate(pairs[p]):
+                row[c] += n
+        self.total += count
+
+        # Run-length encode the outcomes to find streaks
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(outcomes)) + 1))
+        lengths = np.diff(np.concatenate((starts, [count])))
+        values = outcomes[starts]
+        if values[0] == self.streak_outcome:
+            lengths[0] += self.streak_length
+        for outcome in range(3):
+            runs = lengths[values == outcome]
+            if runs.size:
+                self.longest_streaks[outcome] = max(self.longest_streaks[outcome], int(runs.max()))
+        self.streak_outcome = int(values[-1])
+        self.streak_length = int(lengths[-1])
+
+    @property
+    def wins(self):
+        return self.outcome_counts[engine.WIN]
+
+    @property
+    def losses(self):
+        return self.outcome_counts[engine.LOSE]
+
+    @property
+    def draws(self):
+        return self.outcome_counts[engine.DRAW]
+
+    # Percentage of all rounds that ended with the given outcome
+    def rate(self, outcome):
+        if self.total == 0:
+            return 0
+        return (self.outcome_counts[outcome] / self.total) * 100
+
+    @property
+    def win_rate(self):
+        return self.rate(engine.WIN)
+
+    @property
+    def loss_rate(self):
+        return self.rate(engine.LOSE)
+
+    @property
+    def draw_rate(self):
+        return self.rate(engine.DRAW)
+
+    # Most played choice and how often it was played (player or computer side)
+    def favourite(self, computer=False):
+        counts = self.computer_counts if computer else self.player_counts
+        best = max(range(self.choices), key=counts.__getitem__)
+        return best, counts[best]
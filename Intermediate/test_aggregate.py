@@ -0,0 +1,84 @@
+import numpy as np
+
+import aggregate
+import engine
+import export
+from aggregate import Summary
+from history import RoundHistory
+from importer import ImportedRounds
+from stats import RoundStats
+
+
+def rounds_with(count, seed, rules=engine.CLASSIC):
+    rng = np.random.default_rng(seed)
+    # Streaky outcomes: computers often repeat the last pairing
+    players = rng.integers(0, rules.size, count)
+    computers = rng.integers(0, rules.size, count)
+    for i in np.flatnonzero(rng.random(count) < 0.5):
+        if i:
+            players[i], computers[i] = players[i - 1], computers[i - 1]
+    times = np.arange(1_700_000_000, 1_700_000_000 + count, dtype=np.uint32)
+    return ImportedRounds(players, computers, rules.resolve_batch(players, computers), times, None, 0)
+
+
+def piece(rounds, start, end):
+    return ImportedRounds(rounds.players[start:end], rounds.computers[start:end], rounds.outcomes[start:end],
+                          rounds.timestamps[start:end], None, 0)
+
+
+# Function to find the longest streak of each outcome with a plain loop
+def longest_streaks(outcomes):
+    longest, run = [0, 0, 0], 0
+    for i, outcome in enumerate(outcomes):
+        run = run + 1 if i and outcome == outcomes[i - 1] else 1
+        longest[outcome] = max(longest[outcome], run)
+    return longest
+
+
+def test_chunks_merge_like_one_summary():
+    rounds = rounds_with(5000, seed=0)
+    whole = Summary.from_rounds(engine.CLASSIC, rounds)
+    assert whole.longest.tolist() == longest_streaks(rounds.outcomes.tolist())
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        # Cut points that include single rounds and runs that span several chunks
+        cuts = [0] + sorted(rng.integers(0, 5000, 30).tolist()) + [5000]
+        merged = Summary(engine.CLASSIC.name)
+        for start, end in zip(cuts, cuts[1:]):
+            merged.then(Summary.from_rounds(engine.CLASSIC, piece(rounds, start, end)))
+        assert merged.to_dict() == whole.to_dict()
+        assert (merged.head, merged.tail) == (whole.head, whole.tail)
+
+
+def test_separate_sessions_do_not_join_streaks():
+    outcomes = np.array([engine.WIN] * 3)
+    a = ImportedRounds(np.ones(3, dtype=np.uint8), np.zeros(3, dtype=np.uint8), outcomes,
+                       np.full(3, 1_700_000_000, dtype=np.uint32), None, 1)
+    total = Summary(engine.CLASSIC.name).add(Summary.from_rounds(engine.CLASSIC, a))
+    total.add(Summary.from_rounds(engine.CLASSIC, a))
+    assert total.rounds == 6 and total.skipped == 2
+    assert total.longest[engine.WIN] == 3
+
+
+def test_run_aggregation_over_files(tmp_path):
+    paths, expected = [], {}
+    for i, rules in enumerate([engine.CLASSIC, engine.CLASSIC, engine.RULESETS["Lizard Spock"]]):
+        rounds = rounds_with(1500 + 500 * i, seed=i + 2, rules=rules)
+        history = RoundHistory(rules=rules)
+        history.extend(rounds.players, rounds.computers, rounds.outcomes, rounds.timestamps)
+        stats = RoundStats(rules.size)
+        stats.record_batch(history.players(), history.computers(), history.outcomes())
+        path = str(tmp_path / f"station{i}.xlsx")
+        job = export.ExportJob(history, stats, path).start()
+        job._thread.join()
+        paths.append(path)
+        expected.setdefault(rules.name, Summary(rules.name)).add(Summary.from_rounds(rules, rounds))
+    broken = tmp_path / "broken.xlsx"
+    broken.write_bytes(b"not a workbook")
+    result = aggregate.run_aggregation(paths + [str(broken)], workers=2)
+    assert result["total_rounds"] == 1500 + 2000 + 2500
+    # Workbooks keep the time of day only, so the time span is left out
+    span = ("first_time", "last_time")
+    assert {total["rules"]: {k: v for k, v in total.items() if k not in span} for total in result["totals"]} == {
+        name: {k: v for k, v in summary.to_dict().items() if k not in span} for name, summary in expected.items()}
+    assert [failure["path"] for failure in result["failed"]] == [str(broken)]
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import engine
+from analytics import RUN_BINS, Analytics, chi2_pvalue
+
+
+# Function to count a window by brute force: moves, transitions, stays after each outcome and finished runs
+def brute_force(players, outcomes, start, end, size):
+    moves = np.zeros(size, dtype=np.int64)
+    transitions = np.zeros((size, size), dtype=np.int64)
+    followed, stayed = np.zeros(3, dtype=np.int64), np.zeros(3, dtype=np.int64)
+    runs = np.zeros(RUN_BINS, dtype=np.int64)
+    run = 0
+    for i in range(end):
+        run = run + 1 if i > 0 and players[i] == players[i - 1] else 1
+        if i >= start:
+            moves[players[i]] += 1
+        if i > start:
+            transitions[players[i - 1], players[i]] += 1
+            followed[outcomes[i - 1]] += 1
+            if players[i] == players[i - 1]:
+                stayed[outcomes[i - 1]] += 1
+            else:
+                runs[min(previous_run, RUN_BINS) - 1] += 1
+        previous_run = run
+    return moves, transitions, followed, stayed, runs
+
+
+def rounds_with(count, size, seed):
+    rng = np.random.default_rng(seed)
+    # Sticky players, so that long runs turn up
+    players = rng.integers(0, size, count)
+    repeat = rng.random(count) < 0.6
+    for i in range(1, count):
+        if repeat[i]:
+            players[i] = players[i - 1]
+    computers = rng.integers(0, size, count)
+    return players.tolist(), engine.rules_for_size(size).resolve_batch(players, computers).tolist()
+
+
+def check(analytics, players, outcomes, rng, tries):
+    size = analytics.rules.size
+    for _ in range(tries):
+        start, end = sorted(rng.integers(0, len(players) + 1, 2).tolist())
+        window = analytics.window(start, end)
+        moves, transitions, followed, stayed, runs = brute_force(players, outcomes, start, end, size)
+        assert window.rounds == end - start
+        assert window.moves.tolist() == moves.tolist()
+        assert window.transitions.tolist() == transitions.tolist()
+        assert window.followed.tolist() == followed.tolist()
+        assert window.stayed.tolist() == stayed.tolist()
+        assert window.runs.tolist() == runs.tolist()
+
+
+@pytest.mark.parametrize("size", [3, 15])
+def test_windows_match_brute_force(size):
+    players, outcomes = rounds_with(3000, size, seed=size)
+    rng = np.random.default_rng(0)
+    one_by_one = Analytics(engine.rules_for_size(size), block=64)
+    for player, outcome in zip(players, outcomes):
+        one_by_one.record(player, outcome)
+    check(one_by_one, players, outcomes, rng, 100)
+    # Batches of any size give the same counts, including across block boundaries
+    batched = Analytics(engine.rules_for_size(size), block=64)
+    for start, end in ((0, 1), (1, 100), (100, 101), (101, 2500), (2500, 3000)):
+        batched.record_batch(players[start:end], outcomes[start:end], chunk_rows=333)
+    check(batched, players, outcomes, rng, 100)
+    assert batched.run_length == one_by_one.run_length
+    assert np.array_equal(batched._snapshots[:batched._snapshot_count],
+                          one_by_one._snapshots[:one_by_one._snapshot_count])
+
+
+def test_rates_and_negative_windows():
+    analytics = Analytics()
+    # Stays after every win, shifts after every loss
+    for player, outcome in [(0, engine.WIN), (0, engine.LOSE), (1, engine.WIN), (1, engine.WIN), (1, engine.DRAW)]:
+        analytics.record(player, outcome)
+    window = analytics.window()
+    assert window.win_stay_rate == 100.0 and window.lose_shift_rate == 100.0
+    assert analytics.last(2).rounds == 2 and analytics.window(-2).start == 3
+    assert window.top_transition() == (1, 1, 2)
+
+
+def test_chi2_pvalue_matches_tables():
+    # Critical values at p = 0.05 and p = 0.01
+    for stat, dof, p in ((3.841, 1, 0.05), (5.991, 2, 0.05), (18.307, 10, 0.05), (6.635, 1, 0.01),
+                         (124.342, 100, 0.05)):
+        assert chi2_pvalue(stat, dof) == pytest.approx(p, rel=1e-3)
+    assert chi2_pvalue(0.0, 3) == 1.0 and chi2_pvalue(5.0, 0) == 1.0
@@ -0,0 +1,197 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import autosave
+import engine
+from autosave import AutoSave, read_journal, recover
+from history import RoundHistory
+
+
+def history_with(rounds, seed=0, rules=engine.CLASSIC):
+    rng = np.random.default_rng(seed)
+    players = rng.integers(0, rules.size, rounds)
+    computers = rng.integers(0, rules.size, rounds)
+    history = RoundHistory(rules=rules)
+    history.extend(players, computers, rules.resolve_batch(players, computers),
+                   np.arange(1_700_000_000, 1_700_000_000 + rounds, dtype=np.uint32))
+    return history
+
+
+def paths(tmp_path):
+    return str(tmp_path / "session.rpslog"), str(tmp_path / "session.journal")
+
+
+# Function to play rounds into a history and its autosave
+def play(history, saver, rounds, seed=1):
+    rng = np.random.default_rng(seed)
+    for player, computer in rng.integers(0, history.rules.size, (rounds, 2)).tolist():
+        history.append(player, computer, history.rules.resolve(player, computer), 1_700_100_000)
+        saver.append(*history.record(-1))
+
+
+def same_rounds(a, b):
+    return a.rules is b.rules and np.array_equal(a.codes(), b.codes()) and np.array_equal(a.timestamps(), b.timestamps())
+
+
+def wait(saver):
+    if saver._thread is not None:
+        saver._thread.join()
+
+
+def test_journal_is_replayed_after_a_crash(tmp_path):
+    log, journal = paths(tmp_path)
+    history = history_with(500)
+    saver = AutoSave(log, journal, history)
+    assert saver.checkpoint()
+    play(history, saver, 40)
+    # Crash: no checkpoint for the last 40 rounds, and half a record at the end of the journal
+    with open(journal, "ab") as f:
+        f.write(b"\x01\x02")
+    recovered, replayed = recover(log, journal)
+    assert replayed == 40
+    assert same_rounds(recovered, history)
+    saver.close()
+
+
+def test_crash_between_checkpoint_and_new_journal(tmp_path):
+    log, journal = paths(tmp_path)
+    history = history_with(300, seed=2)
+    saver = AutoSave(log, journal, history)
+    play(history, saver, 25)
+    old_journal = open(journal, "rb").read()
+    assert saver.checkpoint()
+    # The new checkpoint holds every round, but the old journal is still there
+    with open(journal, "wb") as f:
+        f.write(old_journal)
+    recovered, replayed = recover(log, journal)
+    assert replayed == 0
+    assert same_rounds(recovered, history)
+    saver.close()
+
+
+def test_replayed_rounds_are_checkpointed(tmp_path):
+    log, journal = paths(tmp_path)
+    history = history_with(100, seed=3)
+    saver = AutoSave(log, journal, history, quiet_delay=0)
+    assert saver.checkpoint()
+    play(history, saver, 10)
+    saver._journal.close()  # crash
+    recovered, replayed = recover(log, journal)
+    saver = AutoSave(log, journal, recovered, replayed, quiet_delay=0)
+    assert saver.pending and saver.poll()
+    wait(saver)
+    assert read_journal(journal)[1] == 110
+    assert same_rounds(recover(log, journal)[0], history)
+    saver.close()
+
+
+# A reset or import checkpoints in the background; until then a crash restores the old checkpoint
+def test_rewrite_checkpoints_in_the_background(tmp_path, monkeypatch):
+    log, journal = paths(tmp_path)
+    history = history_with(200, seed=4)
+    saver = AutoSave(log, journal, history)
+    assert saver.checkpoint()
+    before = recover(log, journal)[0]
+    play(history, saver, 5)
+
+    started, release = threading.Event(), threading.Event()
+    save_log = autosave.save_log
+
+    def slow_save_log(path, *args):
+        if path == log:
+            started.set()
+            release.wait(5)
+        save_log(path, *args)
+    monkeypatch.setattr(autosave, "save_log", slow_save_log)
+    history.clear(engine.RULESETS["Lizard Spock"])
+    assert saver.rewrite()
+    assert started.wait(5) and saver.saving
+    play(history, saver, 3, seed=5)  # rounds played before the checkpoint lands
+    assert same_rounds(recover(log, journal)[0], before)
+
+    release.set()
+    wait(saver)
+    play(history, saver, 4, seed=6)
+    recovered, replayed = recover(log, journal)
+    assert replayed == 7
+    assert same_rounds(recovered, history)
+    saver.close()
+    assert same_rounds(recover(log, journal)[0], history)
+
+
+def test_failed_checkpoint_is_reported_and_retried(tmp_path):
+    log, journal = paths(tmp_path)
+    history = history_with(50, seed=7)
+    saver = AutoSave(os.path.join(str(tmp_path), "missing", "session.rpslog"), journal, history, quiet_delay=0)
+    play(history, saver, 5)
+    assert not saver.checkpoint()
+    assert isinstance(saver.error, OSError) and saver.pending
+    saver.path = log
+    assert saver.poll()
+    wait(saver)
+    assert saver.error is None and not saver.pending
+    assert same_rounds(recover(log, journal)[0], history)
+    saver.close()
+
+
+class Crash(Exception):
+    pass
+
+
+# Function to stop a checkpoint right after the new log is in place, before the new journal is started
+def crash_after_checkpoint(saver, monkeypatch):
+    monkeypatch.setattr(saver, "poll", lambda now=None: False)  # checkpoint here, not on the autosave thread
+
+    def crash(base):
+        raise Crash()
+    monkeypatch.setattr(saver, "_start_journal", crash)
+    saver.rewrite()
+    with pytest.raises(Crash):
+        saver.checkpoint()
+
+
+@pytest.mark.parametrize("rules", [engine.CLASSIC, engine.RULESETS["Lizard Spock"]], ids=["same", "other"])
+def test_crash_after_a_reset_checkpoint(tmp_path, monkeypatch, rules):
+    log, journal = paths(tmp_path)
+    history = history_with(0)
+    saver = AutoSave(log, journal, history)
+    play(history, saver, 30)  # only in the journal so far
+    assert saver.checkpoint()
+    play(history, saver, 20)
+    history.clear(rules)
+    crash_after_checkpoint(saver, monkeypatch)
+    recovered, replayed = recover(log, journal)
+    assert replayed == 0
+    assert len(recovered) == 0 and recovered.rules is rules
+
+
+def test_crash_after_an_import_checkpoint(tmp_path, monkeypatch):
+    log, journal = paths(tmp_path)
+    history = history_with(100, seed=8)
+    saver = AutoSave(log, journal, history)
+    assert saver.checkpoint()
+    play(history, saver, 20)
+    imported = history_with(60, seed=9)
+    history.clear()
+    history.extend_packed(imported.codes().copy(), imported.timestamps().copy())
+    crash_after_checkpoint(saver, monkeypatch)
+    recovered, replayed = recover(log, journal)
+    assert replayed == 0
+    assert same_rounds(recovered, imported)
+
+
+def test_journal_past_the_checkpoint_is_ignored(tmp_path):
+    log, journal = paths(tmp_path)
+    history = history_with(40, seed=10)
+    saver = AutoSave(log, journal, history)
+    assert saver.checkpoint()
+    play(history, saver, 5)
+    saver.close()
+    short = history_with(10, seed=11)
+    autosave.save_log(log, short.rules, short.codes(), short.timestamps())
+    recovered, replayed = recover(log, journal)
+    assert replayed == 0
+    assert same_rounds(recovered, short)
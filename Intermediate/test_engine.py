@@ -0,0 +1,101 @@
+import random
+
+import numpy as np
+import pytest
+
+import engine
+from engine import DRAW, LOSE, WIN, RuleSet
+
+
+def test_classic_matches_the_string_rules():
+    for player in engine.CHOICES:
+        for computer in engine.CHOICES:
+            outcome = engine.resolve(engine.CHOICE_INDEX[player], engine.CHOICE_INDEX[computer])
+            assert engine.RESULTS[outcome] == engine._string_winner(player, computer)
+
+
+@pytest.mark.parametrize("rules", list(engine.RULESETS.values()), ids=list(engine.RULESETS))
+def test_every_choice_beats_half_of_the_others(rules):
+    outcome = rules.outcome
+    assert (np.diag(outcome) == DRAW).all()
+    # Zero-sum: a win one way round is a loss the other way
+    assert (outcome == np.where(outcome.T == WIN, LOSE, np.where(outcome.T == LOSE, WIN, DRAW))).all()
+    assert ((outcome == WIN).sum(axis=1) == rules.size // 2).all()
+    for choice in range(rules.size):
+        assert rules.resolve(rules.counter(choice), choice) == WIN
+
+
+def test_lizard_spock_names():
+    rules = engine.RULESETS["Lizard Spock"]
+    beats = {("Rock", "Scissors"), ("Rock", "Lizard"), ("Paper", "Rock"), ("Paper", "Spock"),
+             ("Scissors", "Paper"), ("Scissors", "Lizard"), ("Lizard", "Paper"), ("Lizard", "Spock"),
+             ("Spock", "Rock"), ("Spock", "Scissors")}
+    for player in rules.choices:
+        for computer in rules.choices:
+            expected = DRAW if player == computer else (WIN if (player, computer) in beats else LOSE)
+            assert rules.resolve(rules.index[player], rules.index[computer]) == expected
+
+
+@pytest.mark.parametrize("rules", list(engine.RULESETS.values()), ids=list(engine.RULESETS))
+def test_batch_matches_single_rounds(rules):
+    rng = np.random.default_rng(rules.size)
+    player = rules.random_choices(5000, rng)
+    computer, outcomes = rules.play_batch(player, rng)
+    assert computer.max() < rules.size
+    assert outcomes.tolist() == [rules.resolve(p, c) for p, c in zip(player.tolist(), computer.tolist())]
+    assert engine.tally(outcomes).tolist() == [int((outcomes == code).sum()) for code in (DRAW, WIN, LOSE)]
+    computer, outcome = rules.play_one(int(player[0]), random.Random(0))
+    assert outcome == rules.resolve(int(player[0]), computer)
+
+
+def test_rule_set_lookups():
+    assert engine.rules_for_size(5) is engine.RULESETS["Lizard Spock"]
+    with pytest.raises(KeyError):
+        engine.rules_for_size(4)
+    with pytest.raises(ValueError):
+        RuleSet("Even", ["A", "B", "C", "D"])
+
+
+# Tables for any odd size match the rule they are built from: each choice beats the size // 2 choices before it
+@pytest.mark.parametrize("size", [3, 7, 25, 101, 255, 1001])
+def test_large_tables_match_the_rule(size):
+    rules = RuleSet(f"{size} weapons", [f"W{i}" for i in range(size)])
+    outcome = rules.outcome
+    assert outcome.shape == (size, size) and outcome.dtype == np.uint8 and outcome.nbytes == size * size
+    rng = np.random.default_rng(size)
+    for player, computer in rng.integers(0, size, (2000, 2)).tolist():
+        beaten = {(player - k) % size for k in range(1, size // 2 + 1)}
+        expected = DRAW if player == computer else WIN if computer in beaten else LOSE
+        assert rules.resolve(player, computer) == expected == outcome[player, computer]
+    # A balanced tournament: every choice beats and loses to exactly half of the others
+    assert ((outcome == WIN).sum(axis=0) == size // 2).all()
+    assert ((outcome == LOSE).sum(axis=1) == size // 2).all()
+    assert rules.index[f"W{size - 1}"] == size - 1
+    players = rng.integers(0, size, 10_000)
+    computers = rng.integers(0, size, 10_000)
+    assert rules.resolve_batch(players, computers).tolist() == [
+        rules.resolve(p, c) for p, c in zip(players.tolist(), computers.tolist())]
+
+
+def test_seven_weapons_names():
+    rules = engine.RULESETS["7 weapons"]
+    beats = {"Rock": {"Fire", "Scissors", "Sponge"}, "Fire": {"Scissors", "Sponge", "Paper"},
+             "Scissors": {"Sponge", "Paper", "Air"}, "Sponge": {"Paper", "Air", "Water"},
+             "Paper": {"Air", "Water", "Rock"}, "Air": {"Water", "Rock", "Fire"},
+             "Water": {"Rock", "Fire", "Scissors"}}
+    for player in rules.choices:
+        for computer in rules.choices:
+            expected = DRAW if player == computer else (WIN if computer in beats[player] else LOSE)
+            assert rules.resolve(rules.index[player], rules.index[computer]) == expected
+
+
+def test_built_in_sizes_and_names():
+    sizes = [rules.size for rules in engine.RULESETS.values()]
+    assert sizes == [3, 5, 7, 9, 15, 101]
+    for size in sizes:
+        assert engine.rules_for_size(size).size == size
+    assert engine.RULESETS["101 weapons"].choices[0] == "Weapon 1"
+    assert engine.RULESETS["101 weapons"].choices[-1] == "Weapon 101"
+    for size in (0, 1, 2, 100):
+        with pytest.raises(ValueError, match="odd number"):
+            RuleSet("Bad", [str(i) for i in range(size)])
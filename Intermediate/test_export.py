@@ -0,0 +1,129 @@
+import csv
+import os
+
+import numpy as np
+import pytest
+from openpyxl import load_workbook
+
+import engine
+import export
+from export import HISTORY_COLUMNS, ExportJob, stats_rows
+from history import RoundHistory, format_clock
+from stats import RoundStats
+
+
+def history_with(rounds, seed=0, rules=engine.CLASSIC):
+    rng = np.random.default_rng(seed)
+    players = rng.integers(0, rules.size, rounds)
+    computers = rng.integers(0, rules.size, rounds)
+    history = RoundHistory(rules=rules)
+    history.extend(players, computers, rules.resolve_batch(players, computers),
+                   np.arange(1_700_000_000, 1_700_000_000 + rounds, dtype=np.uint32))
+    return history
+
+
+def stats_for(history):
+    stats = RoundStats(history.rules.size)
+    stats.record_batch(history.players(), history.computers(), history.outcomes())
+    return stats
+
+
+# Function to list the rows the history sheet or CSV file should hold
+def expected_rows(history):
+    choices = history.rules.choices
+    return [[i + 1, format_clock(t), choices[p], choices[c], engine.RESULTS[o]]
+            for i, (p, c, o, t) in enumerate(history.row(i) for i in range(len(history)))]
+
+
+def exported(history, path, **options):
+    job = ExportJob(history, stats_for(history), str(path), **options).start()
+    job._thread.join()
+    return job
+
+
+def test_csv_output(tmp_path):
+    history = history_with(2500, rules=engine.RULESETS["Lizard Spock"])
+    job = exported(history, tmp_path / "rounds.csv", chunk_rows=300)
+    assert job.error is None and not job.cancelled
+    assert job.written == job.total == 2500 and job.progress == 1.0
+    with open(tmp_path / "rounds.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == HISTORY_COLUMNS
+    assert rows[1:] == [[str(cell) for cell in row] for row in expected_rows(history)]
+    assert os.listdir(tmp_path) == ["rounds.csv"]  # the temp file is gone
+
+
+def test_xlsx_output_with_spill_sheets(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "XLSX_MAX_ROWS", 400)
+    history = history_with(1000, seed=1)
+    stats = stats_for(history)
+    job = exported(history, tmp_path / "rounds.xlsx", chunk_rows=150)
+    assert job.error is None
+    workbook = load_workbook(tmp_path / "rounds.xlsx", read_only=True)
+    assert workbook.sheetnames == ["Game History", "Game History (2)", "Game History (3)", "Statistics"]
+    rows = []
+    for name in workbook.sheetnames[:-1]:
+        sheet = [list(row) for row in workbook[name].iter_rows(values_only=True)]
+        assert sheet[0] == HISTORY_COLUMNS and len(sheet) <= 401
+        rows += sheet[1:]
+    assert rows == expected_rows(history)
+    statistics = [list(row) for row in workbook["Statistics"].iter_rows(values_only=True)]
+    assert statistics == [["Statistic", "Value"]] + stats_rows(stats, history.rules)
+    workbook.close()
+
+
+# The export works on a snapshot: rounds played while it runs are not in the file
+def test_export_uses_a_snapshot(tmp_path):
+    history = history_with(100, seed=2)
+    job = ExportJob(history, stats_for(history), str(tmp_path / "rounds.csv"))
+    history.append(0, 0, engine.DRAW, 1_700_100_000)
+    job.start()._thread.join()
+    with open(tmp_path / "rounds.csv", newline="") as f:
+        assert len(list(csv.reader(f))) == 101
+
+
+@pytest.mark.parametrize("name", ["rounds.csv", "rounds.xlsx"])
+def test_cancel_keeps_the_old_file(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b"previous export")
+    history = history_with(5000, seed=3)
+    job = ExportJob(history, stats_for(history), str(path), chunk_rows=100)
+    job.cancel()  # before the first chunk
+    job.start()._thread.join()
+    assert job.cancelled and job.error is None and job.done
+    assert job.written == 0 and job.progress == 0.0
+    assert path.read_bytes() == b"previous export"
+    assert os.listdir(tmp_path) == [name]
+
+
+# Cancelled between chunks: the rows so far are thrown away
+def test_cancel_during_the_export(tmp_path, monkeypatch):
+    history = history_with(5000, seed=4)
+    job = ExportJob(history, stats_for(history), str(tmp_path / "rounds.csv"), chunk_rows=100)
+    chunks = job._chunks
+
+    def cancel_after_three():
+        for i, rows in enumerate(chunks()):
+            if i == 2:
+                job.cancel()
+            yield rows
+    monkeypatch.setattr(job, "_chunks", cancel_after_three)
+    job.start()._thread.join()
+    assert job.cancelled and job.written == 300
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_export_is_reported(tmp_path):
+    history = history_with(10, seed=5)
+    job = exported(history, tmp_path / "missing" / "rounds.csv")
+    assert isinstance(job.error, OSError) and not job.cancelled
+
+
+def test_empty_history(tmp_path):
+    history = history_with(0)
+    job = exported(history, tmp_path / "rounds.xlsx")
+    assert job.error is None and job.progress == 1.0
+    workbook = load_workbook(tmp_path / "rounds.xlsx", read_only=True)
+    assert [list(row) for row in workbook["Game History"].iter_rows(values_only=True)] == [HISTORY_COLUMNS]
+    assert ["Win Rate", "0%"] in [list(row) for row in workbook["Statistics"].iter_rows(values_only=True)]
+    workbook.close()
@@ -0,0 +1,156 @@
+import numpy as np
+import pytest
+
+import engine
+import history_db
+from history import RoundHistory
+from history_db import DBHistoryPager, HistoryDB
+from history_view import HistoryPager
+
+
+def history_with(rounds, seed=0, rules=engine.CLASSIC):
+    rng = np.random.default_rng(seed)
+    players = rng.integers(0, rules.size, rounds)
+    computers = rng.integers(0, rules.size, rounds)
+    history = RoundHistory(rules=rules)
+    history.extend(players, computers, rules.resolve_batch(players, computers),
+                   np.arange(1_700_000_000, 1_700_000_000 + rounds, dtype=np.uint32))
+    return history
+
+
+def synced(db, history):
+    db.sync(history)
+    if db._thread is not None:
+        db._thread.join()
+    return db
+
+
+def pages(pager):
+    seen = []
+    pager.show_oldest()
+    while True:
+        seen.append(pager.visible())
+        if pager.page == 1:
+            return seen
+        pager.newer()
+
+
+FILTERS = [{}, {"outcome": engine.WIN}, {"player": engine.ROCK}, {"computer": engine.SCISSORS},
+           {"outcome": engine.WIN, "player": engine.PAPER}, {"outcome": engine.DRAW, "computer": engine.ROCK},
+           {"player": engine.ROCK, "computer": engine.PAPER},
+           {"outcome": engine.WIN, "player": engine.ROCK, "computer": engine.PAPER},  # cannot happen
+           {"since": 1_700_003_000}, {"outcome": engine.LOSE, "player": engine.SCISSORS, "since": 1_700_001_234},
+           {"since": 1_800_000_000}]
+
+
+# Blocks of 576 rounds (the smallest for the classic game), so whole and partial blocks both turn up
+@pytest.mark.parametrize("in_order", [True, False], ids=["in-order", "out-of-order"])
+def test_pages_and_jumps_match_the_memory_pager(tmp_path, monkeypatch, in_order):
+    monkeypatch.setattr(history_db, "BATCH_ROWS", 1000)  # a bulk copy over several batches
+    monkeypatch.setattr(history_db, "BLOCK_ROUNDS", 1)
+    history = history_with(5000)
+    if not in_order:
+        times = history.timestamps()
+        times[2000:2100] = times[2000:2100][::-1].copy()
+    db = synced(HistoryDB(str(tmp_path / "rounds.sqlite3")), history)
+    assert db.ready and db.error is None and len(db) == len(history)
+    assert db.block == 576 and db.in_time_order == in_order
+    for where in FILTERS:
+        memory, stored = HistoryPager(history, 20), DBHistoryPager(db, history, 20)
+        memory.set_filter(**where)
+        stored.set_filter(**where)
+        assert stored.count == memory.count
+        assert pages(stored) == pages(memory)
+        assert db.count(**where) == memory.count
+        for round_number in (1, 575, 576, 577, 1153, 2050, 4999, 5000, 6000):
+            memory.jump_to_round(round_number)
+            stored.jump_to_round(round_number)
+            assert stored.visible() == memory.visible()
+            assert stored.page == memory.page
+    db.close()
+
+
+def test_live_rounds_keep_counts_and_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_db, "BLOCK_ROUNDS", 1)
+    history = history_with(1500, seed=3)
+    db = synced(HistoryDB(str(tmp_path / "rounds.sqlite3")), history)
+    memory, stored = HistoryPager(history, 20), DBHistoryPager(db, history, 20)
+    where = {"outcome": engine.WIN, "since": 1_700_000_700}
+    memory.set_filter(**where)
+    stored.set_filter(**where)
+    rng = np.random.default_rng(4)
+    for player, computer in rng.integers(0, 3, (800, 2)).tolist():
+        history.append(player, computer, engine.resolve(player, computer), 1_700_002_000)
+        db.add(len(history), *history.row(len(history) - 1))
+        memory.on_append()
+        stored.on_append()
+    assert db.in_time_order
+    assert stored.count == memory.count == db.count(**where)
+    assert pages(stored) == pages(memory)
+    # A round from the past turns time-order seeks off for good
+    history.append(0, 0, engine.DRAW, 1_600_000_000)
+    db.add(len(history), *history.row(len(history) - 1))
+    db.flush()
+    assert not db.in_time_order
+    assert db.count(**where) == memory.count
+    db.close()
+    assert not HistoryDB(str(tmp_path / "rounds.sqlite3")).in_time_order
+
+
+# Rounds played during an interrupted copy are stored past the copied ones; the gap forces a new copy
+def test_gap_in_the_store_is_copied_again(tmp_path):
+    history = history_with(300, seed=1)
+    db = HistoryDB(str(tmp_path / "rounds.sqlite3"))
+    for i in list(range(100)) + [299]:
+        player, computer, outcome, timestamp = history.row(i)
+        db.add(i + 1, player, computer, outcome, timestamp)
+    db.flush()
+    synced(db, history)
+    assert db.count() == 300
+    assert db._db.execute("SELECT count(*) FROM rounds").fetchone()[0] == 300
+    assert db.count(outcome=engine.DRAW) == int((history.outcomes() == engine.DRAW).sum())
+    db.close()
+
+
+class FailingHistory:
+    # Raises once the copy reaches its second batch
+    def __init__(self, history):
+        self.history = history
+        self.rules = history.rules
+        self.calls = 0
+
+    def __len__(self):
+        return len(self.history)
+
+    def row(self, i):
+        return self.history.row(i)
+
+    def players(self):
+        self.calls += 1
+        if self.calls > 1:
+            raise MemoryError("out of memory")
+        return self.history.players()
+
+    def computers(self):
+        return self.history.computers()
+
+    def outcomes(self):
+        return self.history.outcomes()
+
+    def timestamps(self):
+        return self.history.timestamps()
+
+
+def test_failed_copy_keeps_the_indexes_and_reports(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_db, "BATCH_ROWS", 1000)
+    history = history_with(3000, seed=2)
+    db = synced(HistoryDB(str(tmp_path / "rounds.sqlite3")), FailingHistory(history))
+    assert not db.ready
+    assert isinstance(db.error, MemoryError)
+    indexes = {name for name, in db._db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"rounds_outcome", "rounds_player", "rounds_computer", "rounds_time"} <= indexes
+    assert not db._db.in_transaction
+    # The next sync finishes the copy
+    synced(db, history)
+    assert db.ready and db.error is None and db.count() == 3000
+    db.close()
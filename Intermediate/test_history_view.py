@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+import engine
+from history import RoundHistory
+from history_view import HistoryPager
+
+
+def history_with(rounds, seed=0, rules=engine.CLASSIC):
+    rng = np.random.default_rng(seed)
+    players = rng.integers(0, rules.size, rounds)
+    computers = rng.integers(0, rules.size, rounds)
+    history = RoundHistory(rules=rules)
+    history.extend(players, computers, rules.resolve_batch(players, computers),
+                   np.arange(1_700_000_000, 1_700_000_000 + rounds, dtype=np.uint32))
+    return history
+
+
+# Function to list the matching round indices by brute force, oldest first
+def matching(history, outcome=None, player=None, computer=None, since=None):
+    return [i for i in range(len(history))
+            if (outcome is None or history.row(i)[2] == outcome) and
+            (player is None or history.row(i)[0] == player) and
+            (computer is None or history.row(i)[1] == computer) and
+            (since is None or history.row(i)[3] >= since)]
+
+
+# Function to split the matches into pages, newest first; the oldest page is the short one
+def expected_pages(matches, rows):
+    newest_first = matches[::-1]
+    return [newest_first[i:i + rows] for i in range(0, len(newest_first), rows)] or [[]]
+
+
+FILTERS = [{}, {"outcome": engine.WIN}, {"player": engine.ROCK, "computer": engine.PAPER},
+           {"since": 1_700_000_777}, {"outcome": engine.DRAW, "since": 1_700_000_100}, {"since": 1_800_000_000}]
+
+
+@pytest.mark.parametrize("where", FILTERS, ids=lambda where: ",".join(where) or "all")
+def test_paging_both_ways(where):
+    history = history_with(1013)
+    pager = HistoryPager(history, 20)
+    pager.set_filter(**where)
+    pages = expected_pages(matching(history, **where), 20)
+    assert pager.count == sum(map(len, pages)) and pager.page_count == len(pages)
+    assert pager.filtered == bool(where)
+    # Newest page first, stepping to older pages, then back from the oldest one
+    assert pager.page == 1 and pager.visible() == pages[0]
+    for number, page in enumerate(pages[1:], start=2):
+        pager.older()
+        assert pager.page == number and pager.visible() == page
+    pager.older()  # already on the oldest page
+    assert pager.page == len(pages) and pager.visible() == pages[-1]
+    pager.show_latest()
+    pager.show_oldest()
+    assert pager.visible() == pages[-1]
+    for number in range(len(pages) - 1, 0, -1):
+        pager.newer()
+        assert pager.page == number and pager.visible() == pages[number - 1]
+    assert pager.follow_latest
+
+
+def test_new_rounds_follow_the_latest_page_only():
+    history = history_with(100, seed=1)
+    pager = HistoryPager(history, 10)
+    pager.set_filter(outcome=engine.WIN)
+    rng = np.random.default_rng(2)
+    for player, computer in rng.integers(0, 3, (50, 2)).tolist():
+        history.append(player, computer, engine.resolve(player, computer), 1_700_001_000)
+        pager.on_append()
+        assert pager.visible() == expected_pages(matching(history, outcome=engine.WIN), 10)[0]
+    # Off the latest page the view stays on the same rows while rounds arrive
+    pager.older()
+    shown = pager.visible()
+    for _ in range(5):
+        history.append(engine.PAPER, engine.ROCK, engine.WIN, 1_700_002_000)
+        pager.on_append()
+    assert pager.visible() == shown and pager.page == 2  # pages count from the newest round
+    assert pager.count == len(matching(history, outcome=engine.WIN))
+
+
+def test_jumps():
+    history = history_with(500, seed=3)
+    pager = HistoryPager(history, 20)
+    pager.jump_to_round(123)
+    assert pager.visible() == list(range(122, 102, -1))
+    assert not pager.follow_latest
+    pager.jump_to_round(0)
+    assert pager.visible() == [0]
+    pager.jump_to_round(10_000)  # past the end shows the latest page
+    assert pager.follow_latest and pager.visible() == list(range(499, 479, -1))
+
+    # With a filter, a round that does not match jumps to the next one that does
+    pager.set_filter(outcome=engine.LOSE)
+    matches = matching(history, outcome=engine.LOSE)
+    target = next(i for i in range(200, 500) if i not in matches)
+    pager.jump_to_round(target + 1)
+    following = next(i for i in matches if i > target)
+    assert pager.visible()[0] == following
+    assert pager.visible() == [i for i in matches if i <= following][::-1][:20]
+    pager.jump_to_round(1)
+    assert pager.visible() == [matches[0]]
+
+
+def test_empty_history_and_reset():
+    history = history_with(0)
+    pager = HistoryPager(history, 20)
+    assert pager.visible() == [] and pager.page == 1 and pager.page_count == 1
+    pager.older()
+    pager.newer()
+    pager.jump_to_round(5)
+    assert pager.visible() == []
+    history.extend_packed(history_with(30, seed=4).codes().copy(), history_with(30, seed=4).timestamps().copy())
+    pager.reset()  # e.g. after an import
+    assert pager.count == 30 and pager.visible() == list(range(29, 9, -1))
+
+
+# On a single page (or none) the oldest page is the latest, so new matches still show up
+def test_oldest_of_a_single_page_follows_new_rounds():
+    history = history_with(50, seed=5)
+    pager = HistoryPager(history, 20)
+    pager.set_filter(since=1_800_000_000)
+    pager.show_oldest()
+    history.append(engine.ROCK, engine.ROCK, engine.DRAW, 1_800_000_001)
+    pager.on_append()
+    assert pager.visible() == [50]
@@ -0,0 +1,203 @@
+import csv
+import zipfile
+
+import numpy as np
+import pytest
+
+import engine
+import export
+import importer
+from history import RoundHistory
+from stats import RoundStats
+
+MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+RELS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+HEADER = ["Round", "Timestamp", "Player Choice", "Computer Choice", "Result"]
+
+
+# Function to write a minimal .xlsx by hand: {sheet name: sheet XML}, plus an optional sharedStrings part
+def write_xlsx(path, sheets, shared=None):
+    rels = [f'<Relationship Id="rId{i}" Type="{RELS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+            for i in range(1, len(sheets) + 1)]
+    if shared is not None:
+        rels.append(f'<Relationship Id="rIdS" Type="{RELS}/sharedStrings" Target="sharedStrings.xml"/>')
+    book = "".join(f'<sheet name="{name}" sheetId="{i}" r:id="rId{i}"/>' for i, name in enumerate(sheets, 1))
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("xl/workbook.xml", f'<workbook xmlns="{MAIN}" xmlns:r="{RELS}"><sheets>{book}</sheets></workbook>')
+        archive.writestr("xl/_rels/workbook.xml.rels",
+                         '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                         + "".join(rels) + "</Relationships>")
+        for i, xml in enumerate(sheets.values(), 1):
+            archive.writestr(f"xl/worksheets/sheet{i}.xml", xml)
+        if shared is not None:
+            archive.writestr("xl/sharedStrings.xml", f'<sst xmlns="{MAIN}">{"".join(shared)}</sst>')
+    return str(path)
+
+
+def sheet(rows, extra=""):
+    return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<worksheet xmlns="{MAIN}" {extra}>'
+            f'<dimension ref="A1:E{len(rows)}"/><sheetData>{"".join(rows)}</sheetData>'
+            f'<pageMargins left="0.7" right="0.7" top="0.75" bottom="0.75" header="0.3" footer="0.3"/></worksheet>')
+
+
+def history_with(rounds, seed=0, rules=engine.CLASSIC):
+    rng = np.random.default_rng(seed)
+    players = rng.integers(0, rules.size, rounds)
+    computers = rng.integers(0, rules.size, rounds)
+    history = RoundHistory(rules=rules)
+    history.extend(players, computers, rules.resolve_batch(players, computers),
+                   np.full(rounds, 1_700_000_000, dtype=np.uint32))
+    return history
+
+
+def export_history(history, path):
+    stats = RoundStats(history.rules.size)
+    stats.record_batch(history.players(), history.computers(), history.outcomes())
+    job = export.ExportJob(history, stats, str(path)).start()
+    job._thread.join()
+    assert job.error is None
+    return str(path)
+
+
+def test_exported_workbook_round_trip(tmp_path):
+    history = history_with(3000)
+    path = export_history(history, tmp_path / "rounds.xlsx")
+    imported = importer.read_workbook(path, chunk_bytes=16 << 10)
+    assert imported.skipped == 0
+    assert np.array_equal(imported.players, history.players())
+    assert np.array_equal(imported.computers, history.computers())
+    assert np.array_equal(imported.outcomes, history.outcomes())
+    assert importer.workbook_rules(path) is engine.CLASSIC
+
+
+def test_partial_reads_match_the_full_read(tmp_path):
+    history = history_with(3000, seed=1)
+    path = export_history(history, tmp_path / "rounds.xlsx")
+    last = importer.read_workbook(path, last=700, chunk_bytes=16 << 10)
+    assert np.array_equal(last.players, history.players()[-700:])
+    ranged = importer.read_workbook(path, first_round=1234, last_round=2345, chunk_bytes=16 << 10)
+    assert ranged.rounds.tolist() == list(range(1234, 2346))
+    assert np.array_equal(ranged.outcomes, history.outcomes()[1233:2345])
+
+
+def test_read_rounds_streams_csv_and_xlsx_alike(tmp_path):
+    history = history_with(2000, seed=2, rules=engine.RULESETS["Lizard Spock"])
+    xlsx = export_history(history, tmp_path / "rounds.xlsx")
+    csv_path = export_history(history, tmp_path / "rounds.csv")
+    for path in (xlsx, csv_path):
+        chunks = [rounds for rounds, _ in importer.read_rounds(path, history.rules, chunk_bytes=8 << 10)]
+        assert len(chunks) > 1
+        assert np.array_equal(np.concatenate([c.players for c in chunks]), history.players())
+        assert np.array_equal(np.concatenate([c.outcomes for c in chunks]), history.outcomes())
+
+
+
+# Quoted fields can hold newlines (a notes column from a spreadsheet); chunks must end on a record, not a line
+def test_csv_records_with_quoted_newlines(tmp_path):
+    history = history_with(600, seed=3)
+    path = tmp_path / "notes.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Round", "Notes", "Timestamp", "Player Choice", "Computer Choice", "Result"])
+        for i in range(len(history)):
+            player, computer, outcome, _ = history.row(i)
+            note = "\n".join(["line"] * (i % 7)) + ("\r\n\"quoted\", comma\n" if i % 5 == 0 else "")
+            writer.writerow([i + 1, note, "2024-01-01 10:00:00", history.rules.choices[player],
+                             history.rules.choices[computer], engine.RESULTS[outcome]])
+    chunks = [rounds for rounds, _ in importer.read_rounds(str(path), history.rules, chunk_bytes=1 << 10)]
+    assert len(chunks) > 1
+    assert sum(c.skipped for c in chunks) == 0
+    assert np.array_equal(np.concatenate([c.players for c in chunks]), history.players())
+    assert np.array_equal(np.concatenate([c.computers for c in chunks]), history.computers())
+
+# Excel writes strings to sharedStrings.xml, puts t before r, and adds style and span attributes
+def test_excel_saved_workbook(tmp_path):
+    strings = HEADER + ["10:00:00", "Rock", "Paper", "Computer wins!", "Scissors", "You win!"]
+    shared = [f"<si><t>{text}</t></si>" for text in strings]
+    index = {text: i for i, text in enumerate(strings)}
+
+    def row(number, cells):
+        xml = "".join(f'<c t="s" s="1" r="{column}{number}"><v>{index[text]}</v></c>' if isinstance(text, str)
+                      else f'<c r="{column}{number}" s="2"><v>{text}</v></c>' for column, text in zip("ABCDE", cells))
+        return f'<row r="{number}" spans="1:5" x14ac:dyDescent="0.25">{xml}</row>'
+
+    rows = [row(1, HEADER), row(2, [1, "10:00:00", "Rock", "Paper", "Computer wins!"]),
+            row(3, [2, "10:00:00", "Rock", "Scissors", "You win!"])]
+    path = write_xlsx(tmp_path / "excel.xlsx", {"Game History": sheet(rows, 'xmlns:x14ac="urn:x14ac"')}, shared)
+    imported = importer.read_workbook(path)
+    assert imported.skipped == 0
+    assert imported.players.tolist() == [engine.ROCK, engine.ROCK]
+    assert imported.computers.tolist() == [engine.PAPER, engine.SCISSORS]
+    assert imported.outcomes.tolist() == [engine.LOSE, engine.WIN]
+    assert imported.timestamps[0] > 0
+
+
+# Rich text runs in shared and inline strings; phonetic hints are not part of the text
+def test_rich_text_workbook(tmp_path):
+    shared = ["<si><r><rPr><b/></rPr><t>Ro</t></r><r><t>ck</t></r><rPh sb=\"0\" eb=\"1\"><t>x</t></rPh></si>"]
+    header = "".join(f'<c r="{column}1" t="inlineStr"><is><r><t>{text[:2]}</t></r><r><t xml:space="preserve">'
+                     f'{text[2:]}</t></r></is></c>' for column, text in zip("ABCDE", HEADER))
+    rows = [f'<row r="1">{header}</row>',
+            '<row r="2"><c r="A2"><v>1</v></c><c r="B2" t="str"><f>TEXT(0.5,"hh:mm:ss")</f><v>12:00:00</v></c>'
+            '<c r="C2" t="s"><v>0</v></c><c r="D2" t="inlineStr"><is><r><rPr><i/></rPr><t>Pa</t></r><r><t>per</t>'
+            '</r></is></c><c r="E2" t="inlineStr"><is><t>Computer wins!</t></is></c></row>']
+    path = write_xlsx(tmp_path / "rich.xlsx", {"Game History": sheet(rows)}, shared)
+    imported = importer.read_workbook(path)
+    assert imported.skipped == 0
+    assert imported.players.tolist() == [engine.ROCK]
+    assert imported.computers.tolist() == [engine.PAPER]
+
+
+# The r attributes are optional; a namespace prefix may be used instead of the default namespace
+def test_cells_without_references_and_prefixed_namespace(tmp_path):
+    def cells(values, prefix=""):
+        return "".join(f'<{prefix}c t="inlineStr"><{prefix}is><{prefix}t>{value}</{prefix}t></{prefix}is></{prefix}c>'
+                       for value in values)
+
+    plain = [f"<row>{cells(HEADER)}</row>", f"<row>{cells(['1', '09:00:00', 'Paper', 'Rock', 'You win!'])}</row>",
+             f'<row r="5"><c r="C5" t="inlineStr"><is><t>Rock</t></is></c>{cells(["Rock", "Draw!"])}</row>']
+    prefixed = (f'<x:worksheet xmlns:x="{MAIN}"><x:sheetData>'
+                + "".join(f"<x:row>{cells(values, 'x:')}</x:row>"
+                          for values in (HEADER, ["1", "09:00:00", "Scissors", "Paper", "You win!"]))
+                + "</x:sheetData></x:worksheet>")
+    path = write_xlsx(tmp_path / "refs.xlsx", {"Game History": sheet(plain), "Game History (2)": prefixed})
+    imported = importer.read_workbook(path)
+    # Row 5 has no Round or Timestamp cell; its choices and result are still read
+    assert imported.skipped == 0
+    assert imported.players.tolist() == [engine.PAPER, engine.ROCK, engine.SCISSORS]
+    assert imported.computers.tolist() == [engine.ROCK, engine.ROCK, engine.PAPER]
+    assert imported.outcomes.tolist() == [engine.WIN, engine.DRAW, engine.WIN]
+
+
+# ElementTree unescapes text once; a literal "&amp;" in a value must survive
+def test_escaped_text_is_unescaped_once(tmp_path):
+    shared = ["<si><t>Rule Set</t></si>", "<si><t>R&amp;amp;D</t></si>"]
+    rows = ['<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c></row>']
+    path = write_xlsx(tmp_path / "escaped.xlsx", {"Statistics": sheet(rows)}, shared)
+    workbook = importer.Workbook(path)
+    try:
+        assert workbook.peek_row("Statistics", 1) == {"A": "Rule Set", "B": "R&amp;D"}
+    finally:
+        workbook.close()
+    assert importer.workbook_rules(path) is None
+
+
+def test_missing_columns_and_broken_xml_are_reported(tmp_path):
+    rows = ['<row r="1"><c r="A1" t="inlineStr"><is><t>Round</t></is></c></row>']
+    path = write_xlsx(tmp_path / "columns.xlsx", {"Game History": sheet(rows)})
+    with pytest.raises(importer.ImportFormatError, match="missing the column"):
+        importer.read_workbook(path)
+    header = "".join(f'<c r="{column}1" t="inlineStr"><is><t>{text}</t></is></c>' for column, text in zip("ABCDE", HEADER))
+    broken = sheet([f'<row r="1">{header}</row>', '<row r="2"><c r="A2"><v>1</c></row>'])
+    path = write_xlsx(tmp_path / "broken.xlsx", {"Game History": broken})
+    with pytest.raises(importer.ImportFormatError):
+        importer.read_workbook(path)
+
+
+def test_unclosed_quote_in_a_csv_is_reported(tmp_path):
+    path = tmp_path / "unclosed.csv"
+    lines = [",".join(HEADER), '1,"2024-01-01 10:00:00,Rock,Paper,Computer wins!']
+    lines += ["2,2024-01-01 10:00:01,Rock,Paper,Computer wins!"] * 20_000
+    path.write_text("\n".join(lines) + "\n")
+    with pytest.raises(importer.ImportFormatError, match="line"):
+        list(importer.read_rounds(str(path)))
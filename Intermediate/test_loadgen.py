@@ -0,0 +1,91 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import engine
+import loadgen
+from headless import HeadlessDPG
+from loadgen import DISPLAY_TAGS, make_chooser, run_in_process
+from server import GameServer
+from uibind import UIBindings
+
+
+# Function to run the in-process load generator, keeping its sessions and headless widgets for inspection
+def run(monkeypatch, players, rounds, **options):
+    sessions, backends = [], []
+
+    class KeptServer(GameServer):
+        def _attach(self, current, request):
+            session = super()._attach(current, request)
+            sessions.append(session)
+            return session
+
+    class KeptDPG(HeadlessDPG):
+        def __init__(self, tags=()):
+            super().__init__(tags)
+            backends.append(self)
+    monkeypatch.setattr(loadgen, "GameServer", KeptServer)
+    monkeypatch.setattr(loadgen, "HeadlessDPG", KeptDPG)
+    report = asyncio.run(run_in_process(players, rounds, **options))
+    return report, sessions, backends
+
+
+@pytest.mark.parametrize("rules", [engine.CLASSIC, engine.RULESETS["Lizard Spock"]], ids=["classic", "spock"])
+def test_in_process_run(monkeypatch, rules):
+    report, sessions, backends = run(monkeypatch, 3, 200, rules=rules, opponent="Frequency", seed=5)
+    summary = report.summary()
+    assert summary["rounds"] == len(report.latency_ns) == 600
+    assert summary["errors"] == 0 and summary["rules"] == rules.name
+    assert summary["rounds_per_sec"] == round(600 / report.elapsed)
+
+    # Every player's session holds its rounds, and its widgets show the final totals
+    assert len(sessions) == len(backends) == 3
+    for session, backend in zip(sessions, backends):
+        assert len(session.history) == session.stats.total == 200
+        assert session.history.rules is rules
+        items = backend.items
+        assert items["total_rounds_text"]["default_value"] == "Total Rounds: 200"
+        assert items["player_score"]["default_value"] == str(session.stats.wins)
+        assert items["history_list"]["items"] == session.history.recent(len(items["history_list"]["items"]))
+
+    # Percentiles in order and matching the recorded latencies
+    latency = summary["latency_us"]
+    assert 0 < latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+    expected = np.percentile(np.asarray(report.latency_ns) / 1000, [50, 95, 99])
+    assert [latency["p50"], latency["p95"], latency["p99"]] == pytest.approx(expected.tolist(), abs=0.01)
+    flush = summary["ui_flush_ms"]
+    assert flush["frames"] == len(report.frame_ns) >= 1
+    assert flush["p50"] <= flush["p95"] <= flush["p99"]
+    assert flush["widget_updates"] == sum(backend.configure_calls for backend in backends) > 0
+
+
+def test_paced_run(monkeypatch):
+    report, sessions, _ = run(monkeypatch, 2, 15, rate=300.0)
+    assert report.summary()["rounds"] == 30
+    # 15 rounds at 300 a second take at least 14 intervals
+    assert report.elapsed >= 14 / 300
+    assert [len(session.history) for session in sessions] == [15, 15]
+
+
+def test_biased_players_favour_one_choice():
+    choose = make_chooser(engine.CLASSIC, 3, 1.0)
+    assert len({choose() for _ in range(50)}) == 1
+    choose = make_chooser(engine.CLASSIC, 3, 0.0)
+    assert {choose() for _ in range(200)} == {0, 1, 2}
+
+
+def test_headless_backend_with_bindings():
+    backend = HeadlessDPG(DISPLAY_TAGS)
+    ui = UIBindings(backend=backend)
+    ui.set("result_text", default_value="a")
+    ui.set("result_text", default_value="b")
+    ui.set("missing_item", default_value="x")  # skipped: the item does not exist
+    assert ui.flush() == 1
+    assert backend.get_value("result_text") == "b" and backend.configure_calls == 1
+    ui.set("result_text", default_value="b")  # already shown
+    assert ui.flush() == 0 and backend.configure_calls == 1
+    with pytest.raises(KeyError):
+        backend.configure_item("missing_item", default_value="x")
+    backend.delete_item("result_text")
+    assert not backend.does_item_exist("result_text")
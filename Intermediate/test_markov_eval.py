@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import engine
+from markov_eval import (FiniteStrategy, _components, beat_last, cycle, evaluate, fixed_mix, joint_chain,
+                         long_run_distribution, simulate, win_stay_lose_shift)
+
+SPOCK = engine.RULESETS["Lizard Spock"]
+
+
+# Function to average the outcomes of a set of move pairs, as evaluate() reports them
+def rates(pairs, rules=engine.CLASSIC):
+    counts = np.bincount([rules.resolve(a, b) for a, b in pairs], minlength=3) / len(pairs)
+    return {"draw": counts[engine.DRAW], "win": counts[engine.WIN], "loss": counts[engine.LOSE]}
+
+
+def close(a, b, tolerance=1e-9):
+    return all(abs(a[key] - b[key]) <= tolerance for key in ("draw", "win", "loss"))
+
+
+@pytest.mark.parametrize("rules", [engine.CLASSIC, SPOCK], ids=["classic", "spock"])
+def test_fixed_mixes(rules):
+    rng = np.random.default_rng(rules.size)
+    p, q = rng.dirichlet(np.ones(rules.size)), rng.dirichlet(np.ones(rules.size))
+    expected = {"draw": 0.0, "win": 0.0, "loss": 0.0}
+    for i in range(rules.size):
+        for j in range(rules.size):
+            key = ("draw", "win", "loss")[rules.resolve(i, j)]
+            expected[key] += p[i] * q[j]
+    assert close(evaluate(fixed_mix(p), fixed_mix(q)), expected)
+
+
+def test_cycles_from_a_fixed_start():
+    # Period 4, and only the class holding (0, 0) is ever reached
+    a = cycle([engine.ROCK, engine.PAPER])
+    b = cycle([engine.ROCK, engine.PAPER, engine.SCISSORS, engine.SCISSORS])
+    expected = rates([(engine.ROCK, engine.ROCK), (engine.PAPER, engine.PAPER),
+                      (engine.ROCK, engine.SCISSORS), (engine.PAPER, engine.SCISSORS)])
+    assert close(evaluate(a, b), expected)
+
+
+def test_cycles_with_several_closed_classes():
+    # Random start states: the 8 joint states split into two closed classes of period 4, reached
+    # with probability 1/2 each, so every pair of pattern positions is equally likely
+    a_pattern, b_pattern = [engine.ROCK, engine.PAPER], [engine.ROCK, engine.PAPER, engine.SCISSORS, engine.SCISSORS]
+    a, b = cycle(a_pattern), cycle(b_pattern)
+    a = FiniteStrategy(a.name, a.policy, a.next_state, initial=[0.5, 0.5])
+    b = FiniteStrategy(b.name, b.policy, b.next_state, initial=[0.25] * 4)
+    transitions, _, _ = joint_chain(a, b)
+    adjacency = [np.flatnonzero(row > 0).tolist() for row in transitions]
+    assert sorted(map(sorted, _components(adjacency))) == [[0, 2, 5, 7], [1, 3, 4, 6]]
+    assert close(evaluate(a, b), rates([(x, y) for x in a_pattern for y in b_pattern]))
+
+
+def test_transient_states_are_absorbed():
+    # Beat-last starts from a random remembered move, then plays Paper against Rock for ever
+    result = evaluate(beat_last(), fixed_mix([1, 0, 0], "Always Rock"))
+    assert close(result, {"draw": 0.0, "win": 1.0, "loss": 0.0})
+    transitions, _, initial = joint_chain(beat_last(), fixed_mix([1, 0, 0]))
+    distribution = long_run_distribution(transitions, initial)
+    assert distribution.sum() == pytest.approx(1.0)
+    assert distribution[engine.ROCK] == pytest.approx(1.0)  # beat-last remembers Rock
+
+
+def test_components_of_a_known_graph():
+    # 0 -> 1 -> 2 -> 0 is a cycle, 3 leads into it, 4 <-> 5 is separate, 6 is alone
+    adjacency = [[1], [2], [0], [0, 4], [5], [4], []]
+    components = sorted(sorted(c) for c in _components(adjacency))
+    assert components == [[0, 1, 2], [3], [4, 5], [6]]
+
+
+@pytest.mark.parametrize("pair", ["wsls-mix", "beat-last-wsls", "spock"])
+def test_exact_rates_match_simulation(pair):
+    a, b = {
+        "wsls-mix": (win_stay_lose_shift(), fixed_mix([0.5, 0.3, 0.2])),
+        "beat-last-wsls": (beat_last(), win_stay_lose_shift()),
+        "spock": (win_stay_lose_shift(SPOCK), fixed_mix([0.4, 0.15, 0.15, 0.15, 0.15])),
+    }[pair]
+    exact = evaluate(a, b)
+    assert sum(exact.values()) == pytest.approx(1.0)
+    assert close(simulate(a, b, 60_000, seed=1, runs=30), exact, tolerance=0.02)
+
+
+def test_bad_strategies_are_rejected():
+    with pytest.raises(ValueError, match="shape"):
+        FiniteStrategy("Bad shape", [[1, 0, 0]], np.zeros((1, 3, 2), dtype=int))
+    with pytest.raises(ValueError, match="sum to 1"):
+        FiniteStrategy("Bad policy", [[0.5, 0.2, 0.2]], np.zeros((1, 3, 3), dtype=int))
+    with pytest.raises(ValueError, match="plays"):
+        evaluate(fixed_mix([1, 0, 0]), fixed_mix([1, 0, 0, 0, 0]))
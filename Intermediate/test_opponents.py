@@ -0,0 +1,51 @@
+import random
+
+import engine
+import opponents
+from opponents import STRATEGIES, MarkovPredictor
+
+
+# Function to count how often an opponent wins against a fixed sequence of player moves
+def wins_against(opponent, moves, rules=engine.CLASSIC):
+    wins = 0
+    for player in moves:
+        computer = opponent.choose()
+        wins += rules.resolve(player, computer) == engine.LOSE
+        opponent.observe(player, computer)
+    return wins
+
+
+def test_markov_learns_a_cycle():
+    moves = [engine.ROCK, engine.PAPER, engine.SCISSORS] * 300
+    for order in (1, 2, 3):
+        opponent = STRATEGIES[f"Markov (order {order})"](random.Random(0))
+        assert wins_against(opponent, moves) > 0.95 * len(moves)
+
+
+# With many choices the contexts seen are capped; the least recently seen ones are dropped
+def test_markov_contexts_are_bounded():
+    predictor = MarkovPredictor(3, 101, max_contexts=500)
+    rng = random.Random(1)
+    for _ in range(20_000):
+        predictor.update(rng.randrange(101))
+    assert len(predictor.table) == len(predictor.best) == 500
+    # A context seen again within max_contexts new ones is kept, and still predicts what followed it
+    for _ in range(50):
+        for move in (1, 2, 3, 4):
+            predictor.update(move)
+        for _ in range(300):
+            predictor.update(rng.randrange(101))
+    for move in (1, 2, 3):
+        predictor.update(move)
+    assert predictor.predict() == 4
+    assert len(predictor.table) == 500
+
+
+def test_default_cap_keeps_large_games_small():
+    rules = engine.RULESETS["101 weapons"]
+    opponent = STRATEGIES["Mixture of experts"](random.Random(2), rules)
+    rng = random.Random(3)
+    wins_against(opponent, [rng.randrange(rules.size) for _ in range(30_000)], rules)
+    for expert in opponent.predictor.experts:
+        if isinstance(expert, MarkovPredictor):
+            assert len(expert.table) <= opponents.MAX_CONTEXTS
@@ -0,0 +1,67 @@
+import numpy as np
+
+import engine
+from history import RoundHistory
+from rangestats import RangeIndex
+
+START = 1_700_000_000
+
+
+def history_with(rounds, seed=0, shuffled=False):
+    rng = np.random.default_rng(seed)
+    players = rng.integers(0, 3, rounds)
+    computers = rng.integers(0, 3, rounds)
+    times = START + np.sort(rng.integers(0, 10 * rounds, rounds))
+    if shuffled:
+        rng.shuffle(times)
+    history = RoundHistory()
+    history.extend(players, computers, engine.CLASSIC.resolve_batch(players, computers), times.astype(np.uint32))
+    return history
+
+
+# Function to count outcomes by brute force, as [draws, wins, losses]
+def counted(outcomes):
+    return np.bincount(outcomes, minlength=3).tolist()
+
+
+def check_windows(index, history, rng, tries=200):
+    outcomes, times = history.outcomes(), history.timestamps()
+    for _ in range(tries):
+        start, end = sorted(rng.integers(0, len(history) + 1, 2).tolist())
+        assert index.rounds(start, end) == counted(outcomes[start:end])
+        since, until = sorted(rng.integers(START - 5, int(times.max()) + 5, 2).tolist())
+        assert index.between(since, until) == counted(outcomes[(times >= since) & (times < until)])
+        assert index.between(since) == counted(outcomes[times >= since])
+
+
+def test_windows_in_time_order():
+    history = history_with(5000)
+    index = RangeIndex(history)
+    index.extend(history.outcomes(), history.timestamps())
+    assert index.in_time_order
+    check_windows(index, history, np.random.default_rng(1))
+
+
+def test_windows_out_of_order_and_growing():
+    rng = np.random.default_rng(2)
+    history = history_with(3000, seed=3, shuffled=True)
+    index = RangeIndex(history)
+    index.extend(history.outcomes(), history.timestamps())
+    assert not index.in_time_order
+    check_windows(index, history, rng, tries=50)
+    # Later rounds in time order extend the sorted copy in place until it is full
+    last = int(history.timestamps().max())
+    buffers = index._by_time
+    for i in range(2000):
+        outcome = int(rng.integers(0, 3))
+        history.append(0, 0, outcome, last + i)
+        index.append(outcome, last + i)
+        if i % 97 == 0:
+            check_windows(index, history, rng, tries=5)
+    assert index._by_time[0].shape[0] >= len(history)
+    assert index._by_time[0].shape[0] < 2 * max(len(history), 4096)
+    assert buffers[0].shape[0] == 4096 and index._by_time[0] is not buffers[0]
+    # An earlier round forces a new sort
+    history.append(0, 0, engine.WIN, START)
+    index.append(engine.WIN, START)
+    check_windows(index, history, rng, tries=50)
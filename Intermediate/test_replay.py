@@ -0,0 +1,101 @@
+import random
+
+import numpy as np
+import pytest
+
+import engine
+import replay
+from history import RoundHistory
+from opponents import STRATEGIES
+from replay import CHOICE, OPPONENT, SEED, InputRecorder, Replay, digest, read_recording
+from roundlog import LogFormatError
+
+
+# Stand-in for the app's round pipeline: a seeded random stream per session and a fresh opponent at every seed
+class Session:
+    def __init__(self, rules):
+        self.history = RoundHistory(rules=rules)
+        self.rng = None
+        self.opponent = None
+
+    def seed(self, seed, name):
+        self.rng = random.Random(seed)
+        self.opponent = STRATEGIES[name](self.rng, self.history.rules)
+
+    def play(self, player):
+        computer = self.opponent.choose()
+        self.opponent.observe(player, computer)
+        self.history.append(player, computer, self.history.rules.resolve(player, computer), 1_700_000_000)
+
+    # Function to play a recording's events
+    def replay(self, events):
+        for kind, value, payload in events:
+            if kind == SEED:
+                self.rng = random.Random(payload)
+            elif kind == OPPONENT:
+                self.opponent = STRATEGIES[replay.STRATEGY_NAMES[value]](self.rng, self.history.rules)
+            else:
+                self.play(value)
+
+
+def record_session(path, rules, rounds, seed=0):
+    inputs = random.Random(seed)
+    session, recorder = Session(rules), InputRecorder(path)
+    session.seed(11, "Mixture of experts")
+    recorder.start(rules, 0, 11, "Mixture of experts")
+    for i in range(rounds):
+        if i == rounds // 2:
+            session.seed(22, "Markov (order 2)")
+            recorder.seed(22, "Markov (order 2)")
+        player = inputs.randrange(rules.size)
+        session.play(player)
+        recorder.choice(player)
+    recorder.close()
+    return session.history
+
+
+@pytest.mark.parametrize("rules", [engine.CLASSIC, engine.RULESETS["Lizard Spock"]], ids=["classic", "spock"])
+def test_replay_reproduces_the_rounds(tmp_path, rules):
+    path = str(tmp_path / "session.inputs")
+    original = record_session(path, rules, 3000)
+    recording = Replay(path)
+    assert recording.rules is rules and recording.rounds == 3000 and recording.base == 0
+    replayed = Session(rules)
+    while not recording.done:
+        replayed.replay(recording.take(0.0, check_every=500))
+    assert recording.progress == 1.0
+    assert digest(replayed.history) == digest(original)
+    assert np.array_equal(replayed.history.codes(), original.codes())
+
+
+def test_resume_keeps_a_matching_recording(tmp_path):
+    path = str(tmp_path / "session.inputs")
+    history = record_session(path, engine.CLASSIC, 100)
+    with open(path, "ab") as f:
+        f.write(b"\x00\x01")  # torn event
+    recorder = InputRecorder(path)
+    assert recorder.resume(history, 33, "Random")
+    recorder.choice(engine.ROCK)
+    recorder.close()
+    rules, base, _, events = read_recording(path)
+    assert (events["kind"] == CHOICE).sum() == 101
+    assert events[-3:]["kind"].tolist() == [SEED, OPPONENT, CHOICE] and events[-3]["payload"] == 33
+    # A history the recording does not cover starts a new one after it
+    history.append(0, 0, engine.DRAW, 1_700_000_000)
+    history.append(0, 0, engine.DRAW, 1_700_000_000)
+    recorder = InputRecorder(path)
+    assert not recorder.resume(history, 44, "Random")
+    recorder.close()
+    assert read_recording(path)[1] == len(history)
+
+
+def test_bad_recordings_are_rejected(tmp_path, monkeypatch):
+    path = tmp_path / "bad.inputs"
+    path.write_bytes(b"RPS")
+    with pytest.raises(LogFormatError, match="too short"):
+        read_recording(str(path))
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(LogFormatError, match="not an input recording"):
+        read_recording(str(path))
+    monkeypatch.setenv("RPS_SEED", "123")
+    assert replay.new_seed() == replay.new_seed() == 123
@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pytest
+
+import engine
+from history import RoundHistory
+from roundlog import HEADER, LogFormatError, RoundLog, load_history, read_log, save_log
+
+
+def history_with(rounds, seed=0, rules=engine.CLASSIC):
+    rng = np.random.default_rng(seed)
+    players = rng.integers(0, rules.size, rounds)
+    computers = rng.integers(0, rules.size, rounds)
+    history = RoundHistory(rules=rules)
+    history.extend(players, computers, rules.resolve_batch(players, computers),
+                   np.arange(1_700_000_000, 1_700_000_000 + rounds, dtype=np.uint32))
+    return history
+
+
+def same_rounds(a, b):
+    return a.rules is b.rules and np.array_equal(a.codes(), b.codes()) and np.array_equal(a.timestamps(), b.timestamps())
+
+
+@pytest.mark.parametrize("rules", [engine.CLASSIC, engine.RULESETS["101 weapons"]], ids=["classic", "101"])
+def test_appended_rounds_reload(tmp_path, rules):
+    path = str(tmp_path / "session.rpslog")
+    history = history_with(1000, rules=rules)
+    log = RoundLog(path, rules)
+    log.append_batch(history.codes()[:900], history.timestamps()[:900])
+    for i in range(900, 1000):
+        log.append(*history.record(i))
+    log.close()
+    assert os.path.getsize(path) == HEADER.size + 1000 * (5 if rules is engine.CLASSIC else 6)
+    assert same_rounds(load_history(path), history)
+
+
+def test_torn_record_is_dropped(tmp_path):
+    path = str(tmp_path / "session.rpslog")
+    history = history_with(50, seed=1)
+    log = RoundLog(path)
+    log.append_batch(history.codes(), history.timestamps())
+    log.close()
+    with open(path, "ab") as f:
+        f.write(b"\x07\x07\x07")  # crash in the middle of a record
+    assert same_rounds(load_history(path), history)
+    # Reopening cuts the partial record off, so new rounds stay aligned
+    log = RoundLog(path)
+    history.append(0, 1, engine.LOSE, 1_800_000_000)
+    log.append(*history.record(-1))
+    log.close()
+    assert same_rounds(load_history(path), history)
+
+
+def test_rewrite_clear_and_save(tmp_path):
+    path = str(tmp_path / "session.rpslog")
+    classic = history_with(20)
+    log = RoundLog(path)
+    log.append_batch(classic.codes(), classic.timestamps())
+    spock = history_with(30, seed=2, rules=engine.RULESETS["Lizard Spock"])
+    log.rewrite(spock)
+    assert same_rounds(load_history(path), spock)
+    log.clear(engine.CLASSIC)
+    log.close()
+    assert len(load_history(path)) == 0 and load_history(path).rules is engine.CLASSIC
+    saved = str(tmp_path / "saved.rpslog")
+    save_log(saved, spock.rules, spock.codes(), spock.timestamps())
+    assert same_rounds(load_history(saved), spock)
+    assert not os.path.exists(saved + ".tmp")
+
+
+def test_bad_logs_are_rejected(tmp_path):
+    path = str(tmp_path / "session.rpslog")
+    assert len(load_history(path)) == 0  # no log yet
+    with open(path, "wb") as f:
+        f.write(b"not a round log at all")
+    with pytest.raises(LogFormatError, match="not a round log"):
+        read_log(path)
+    spock = history_with(5, rules=engine.RULESETS["Lizard Spock"])
+    save_log(path, spock.rules, spock.codes(), spock.timestamps())
+    with pytest.raises(LogFormatError, match="Lizard Spock"):
+        RoundLog(path, engine.CLASSIC)
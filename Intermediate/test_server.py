@@ -0,0 +1,150 @@
+import asyncio
+import json
+import os
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+import engine
+from client import GameClient, ServerError, parse_address
+from history import RoundHistory
+from roundlog import load_history
+from server import DEFAULT_PORT, GameServer
+
+
+# Function to run a game server on its own event loop thread; yields the server and its address
+@pytest.fixture
+def server(tmp_path):
+    game_server = GameServer(str(tmp_path), flush_interval=0.05)
+    started, state = threading.Event(), {}
+
+    def ready(port):
+        state["port"] = port
+        state["loop"] = asyncio.get_running_loop()
+        started.set()
+
+    async def run():
+        state["task"] = asyncio.current_task()
+        await game_server.serve("127.0.0.1", 0, ready)
+
+    def thread_main():
+        try:
+            asyncio.run(run())
+        except asyncio.CancelledError:
+            pass
+    thread = threading.Thread(target=thread_main, daemon=True)
+    thread.start()
+    assert started.wait(10)
+    game_server.address = f"127.0.0.1:{state['port']}"
+    game_server.stop = lambda: (state["loop"].call_soon_threadsafe(state["task"].cancel), thread.join(10))
+    yield game_server
+    if thread.is_alive():
+        game_server.stop()
+
+
+@pytest.fixture
+def connect(server):
+    clients = []
+
+    def open_client():
+        clients.append(GameClient(server.address))
+        return clients[-1]
+    yield open_client
+    for client in clients:
+        client.close()
+
+
+def test_parse_address():
+    assert parse_address("example.org:9000") == ("example.org", 9000)
+    assert parse_address("localhost") == ("localhost", DEFAULT_PORT)
+
+
+def test_sessions_keep_their_own_state(server, connect):
+    alice, bob = connect(), connect()
+    assert alice.hello("alice")["rules"] == "Classic"
+    described = bob.hello("bob", rules="Lizard Spock", opponent="Frequency")
+    assert described["choices"] == list(engine.RULESETS["Lizard Spock"].choices)
+    assert described["opponent"] == "Frequency"
+    for _ in range(12):
+        reply = alice.play("Rock")
+        assert reply["player"] == engine.ROCK
+    for choice in ("Spock", 3, "Lizard"):
+        bob.play(choice)
+    assert alice.stats()["total"] == 12 and bob.stats()["total"] == 3
+    assert alice.stats()["player_counts"] == [12, 0, 0]
+    spock = engine.RULESETS["Lizard Spock"].index
+    expected = [0] * 5
+    for choice in (spock["Spock"], 3, spock["Lizard"]):
+        expected[choice] += 1
+    assert bob.stats()["player_counts"] == expected
+    # A second connection resumes the same session; a reset of one leaves the other alone
+    again = connect()
+    assert again.hello("alice")["total"] == 12
+    assert again.play("Paper")["round"] == 13
+    assert alice.stats()["total"] == 13
+    bob.reset("Classic")
+    assert bob.stats()["total"] == 0 and alice.stats()["total"] == 13
+    assert server.sessions["alice"].clients == 2 and server.sessions["bob"].clients == 1
+
+
+def test_bad_requests_get_error_replies(server, connect):
+    client = connect()
+    with pytest.raises(ServerError, match="hello first"):
+        client.play("Rock")
+    with pytest.raises(ServerError, match="session ids"):
+        client.hello("not a valid id!")
+    with pytest.raises(ServerError, match="unknown rule set"):
+        client.hello("carol", rules="Checkers")
+    with pytest.raises(ServerError, match="unknown opponent"):
+        client.hello("carol", opponent="Nobody")
+    client.hello("carol")
+    for choice in ("Spock", "rock", 3, -1, True, False, 1.0, None, [0]):
+        with pytest.raises(ServerError, match="not a choice"):
+            client.play(choice)
+    with pytest.raises(ServerError, match="unknown op"):
+        client.request("dance")
+    with pytest.raises(ServerError, match="unknown opponent"):
+        client.set_opponent("Nobody")
+    with pytest.raises(ServerError, match="unknown rule set"):
+        client.reset("Checkers")
+    assert client.stats()["total"] == 0
+    assert client.play(2)["player"] == engine.SCISSORS
+
+
+# Raw lines: a malformed one gets an error reply, and the connection carries on with pipelined requests
+def test_malformed_lines_and_pipelining(server):
+    with socket.create_connection(("127.0.0.1", int(server.address.rpartition(":")[2])), timeout=5) as sock:
+        lines = [b"{not json\n", b'"just a string"\n', b'{"op": "hello", "session": "dave"}\n',
+                 b'{"op": "play", "choice": "Rock"}\n', b'{"op": "play", "choice": "Paper"}\n', b'{"op": "stats"}\n']
+        sock.sendall(b"".join(lines))
+        file = sock.makefile("rb")
+        replies = [json.loads(file.readline()) for _ in lines]
+    assert [reply["ok"] for reply in replies] == [False, False, True, True, True, True]
+    assert [reply["round"] for reply in replies[3:5]] == [1, 2]
+    assert replies[5]["player_counts"] == [1, 1, 0]
+
+
+def test_rounds_round_trip(server, connect, tmp_path):
+    client = connect()
+    client.hello("erin", rules="Lizard Spock")
+    rng = np.random.default_rng(0)
+    for choice in rng.integers(0, 5, 60).tolist():
+        client.play(choice)
+    session = server.sessions["erin"]
+    history = RoundHistory(rules=engine.RULESETS["Lizard Spock"])
+    assert client.load_rounds(history) == 60
+    assert np.array_equal(history.codes(), session.history.codes())
+    assert np.array_equal(history.timestamps(), session.history.timestamps())
+    # From a later round on, and past the end
+    tail = RoundHistory(rules=history.rules)
+    assert client.load_rounds(tail, start=45) == 15
+    assert np.array_equal(tail.codes(), history.codes()[45:])
+    assert client.load_rounds(RoundHistory(rules=history.rules), start=1000) == 0
+    # Rounds reach the session log once the server stops
+    client.close()
+    server.stop()
+    saved = load_history(os.path.join(str(tmp_path), "erin.rpslog"))
+    assert saved.rules is history.rules
+    assert np.array_equal(saved.codes(), history.codes())
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+import engine
+from stats import RoundStats
+
+
+def rounds_with(count, seed, rules=engine.CLASSIC):
+    rng = np.random.default_rng(seed)
+    players = rng.integers(0, rules.size, count)
+    # Long runs of one outcome turn up when the computer keeps answering the same way
+    computers = np.where(rng.random(count) < 0.5, players, rng.integers(0, rules.size, count))
+    return players, computers, rules.resolve_batch(players, computers)
+
+
+# Function to compute the statistics by brute force: counts, matrix, current streak and longest streaks
+def brute_force(players, computers, outcomes, size):
+    matrix = np.zeros((size, size), dtype=np.int64)
+    np.add.at(matrix, (players, computers), 1)
+    longest, run = [0, 0, 0], 0
+    for i, outcome in enumerate(outcomes.tolist()):
+        run = run + 1 if i and outcome == outcomes[i - 1] else 1
+        longest[outcome] = max(longest[outcome], run)
+    return {"player_counts": np.bincount(players, minlength=size).tolist(),
+            "computer_counts": np.bincount(computers, minlength=size).tolist(),
+            "outcome_counts": np.bincount(outcomes, minlength=3).tolist(),
+            "matrix": matrix.tolist(), "streak_outcome": int(outcomes[-1]), "streak_length": run,
+            "longest_streaks": longest, "total": len(outcomes)}
+
+
+def state(stats):
+    return {key: getattr(stats, key) for key in ("player_counts", "computer_counts", "outcome_counts", "matrix",
+                                                 "streak_outcome", "streak_length", "longest_streaks", "total")}
+
+
+@pytest.mark.parametrize("rules", [engine.CLASSIC, engine.RULESETS["9 weapons"]], ids=["classic", "9 weapons"])
+def test_single_rounds_match_brute_force(rules):
+    players, computers, outcomes = rounds_with(3000, 1, rules)
+    stats = RoundStats(rules.size)
+    for round_ in zip(players.tolist(), computers.tolist(), outcomes.tolist()):
+        stats.record(*round_)
+    assert state(stats) == brute_force(players, computers, outcomes, rules.size)
+
+
+# Batches of any size, mixed with single rounds, give the same totals and streaks (including runs across batches)
+@pytest.mark.parametrize("split", [[1], [2, 7], [500, 1], [3000]])
+def test_batches_match_single_rounds(split):
+    players, computers, outcomes = rounds_with(3000, 2)
+    stats = RoundStats()
+    start, turn = 0, 0
+    while start < len(outcomes):
+        size = split[turn % len(split)]
+        if turn % 3 == 2:
+            for i in range(start, min(start + size, len(outcomes))):
+                stats.record(int(players[i]), int(computers[i]), int(outcomes[i]))
+        else:
+            stats.record_batch(players[start:start + size], computers[start:start + size], outcomes[start:start + size])
+        start += size
+        turn += 1
+    assert state(stats) == brute_force(players, computers, outcomes, 3)
+
+
+def test_streak_carries_into_a_batch():
+    stats = RoundStats()
+    for _ in range(4):
+        stats.record(engine.ROCK, engine.SCISSORS, engine.WIN)
+    stats.record_batch([engine.PAPER] * 3, [engine.ROCK] * 3, [engine.WIN] * 3)
+    assert stats.streak_outcome == engine.WIN and stats.streak_length == 7
+    assert stats.longest_streaks == [0, 7, 0]
+    stats.record_batch([], [], [])
+    assert stats.total == 7 and stats.streak_length == 7
+
+
+def test_rates_and_favourites():
+    stats = RoundStats()
+    assert stats.win_rate == stats.loss_rate == stats.draw_rate == 0
+    assert stats.favourite() == (0, 0)
+    stats.record_batch([0, 1, 1, 2], [2, 2, 0, 0], [engine.WIN, engine.LOSE, engine.WIN, engine.LOSE])
+    stats.record(2, 2, engine.DRAW)
+    assert (stats.wins, stats.losses, stats.draws) == (2, 2, 1)
+    assert stats.win_rate == pytest.approx(40.0) and stats.draw_rate == pytest.approx(20.0)
+    assert stats.win_rate + stats.loss_rate + stats.draw_rate == pytest.approx(100.0)
+    assert stats.favourite() == (1, 2)  # ties go to the first choice
+    assert stats.favourite(computer=True) == (2, 3)
+
+
+def test_reset_resizes_for_another_game():
+    stats = RoundStats()
+    stats.record(0, 1, engine.LOSE)
+    stats.reset(15)
+    assert stats.total == 0 and stats.streak_outcome is None
+    assert stats.player_counts == [0] * 15 and len(stats.matrix) == 15 and len(stats.matrix[0]) == 15
+    stats.record(14, 0, engine.RULESETS["15 weapons"].resolve(14, 0))
+    assert stats.player_counts[14] == 1 and stats.matrix[14][0] == 1
+    stats.reset()
+    assert stats.choices == 15 and stats.total == 0
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+import engine
+from timeseries import OutcomeSeries, lttb
+
+
+def outcomes_with(count, seed):
+    return np.random.default_rng(seed).integers(0, 3, count).astype(np.uint8)
+
+
+# Function to compute every point by brute force: round, rolling win/loss/draw rates and score
+def brute_force(outcomes, window):
+    points, score = [], 0
+    for i, outcome in enumerate(outcomes.tolist()):
+        score += 1 if outcome == engine.WIN else -1 if outcome == engine.LOSE else 0
+        last = outcomes[max(0, i + 1 - window):i + 1]
+        points.append((i + 1, 100.0 * np.sum(last == engine.WIN) / len(last),
+                       100.0 * np.sum(last == engine.LOSE) / len(last),
+                       100.0 * np.sum(last == engine.DRAW) / len(last), score))
+    return np.array(points)
+
+
+def small_series():
+    return OutcomeSeries(window=10, recent_points=64, coarse_points=16)
+
+
+# Chunks smaller than the window, around it and past the whole ring, after some single rounds
+@pytest.mark.parametrize("chunk_rows", [3, 10, 37, 1 << 20])
+def test_batch_matches_single_rounds(chunk_rows):
+    outcomes = outcomes_with(1500, chunk_rows)
+    single, batch = small_series(), small_series()
+    for outcome in outcomes.tolist():
+        single.record(outcome)
+    for outcome in outcomes[:7].tolist():
+        batch.record(outcome)
+    batch.record_batch(outcomes[7:], chunk_rows=chunk_rows)
+    assert batch.rounds == single.rounds and batch.score == single.score and batch.stride == single.stride
+    assert batch._counts == single._counts
+    assert np.array_equal(batch._last, single._last)
+    assert np.allclose(batch._recent, single._recent)
+    assert batch._coarse_count == single._coarse_count
+    assert np.allclose(batch._coarse[:batch._coarse_count], single._coarse[:single._coarse_count])
+    # Later rounds carry on from the same window
+    for series in (single, batch):
+        series.record_batch(outcomes[:25])
+    assert np.allclose(batch.points(), single.points())
+
+
+def test_ring_wraps_around():
+    outcomes = outcomes_with(200, 1)
+    series = small_series()
+    expected = brute_force(outcomes, 10)
+    for count, outcome in enumerate(outcomes.tolist(), start=1):
+        series.record(outcome)
+        if count in (63, 64, 65, 128, 200):
+            points = series.points()
+            tail = points[-min(count, 64):]
+            # The last 64 rounds at full resolution and in order, whatever slot the ring is at
+            assert np.allclose(tail, expected[count - tail.shape[0]:count])
+            assert np.all(np.diff(points[:, 0]) > 0)
+    # Older rounds only as coarse points, at multiples of the stride
+    coarse = points[:-64]
+    assert coarse.shape[0] > 0 and np.all(coarse[:, 0] % series.stride == 0)
+    assert np.allclose(coarse, expected[coarse[:, 0].astype(int) - 1])
+    assert series._coarse_count <= 16
+
+
+def test_memory_stays_bounded():
+    series = small_series()
+    series.record_batch(outcomes_with(100_000, 2), chunk_rows=4096)
+    assert series.rounds == 100_000
+    assert series._coarse_count <= 16 and series.stride >= 100_000 // 16
+    assert series.points().shape[0] <= 16 + 64
+
+
+@pytest.mark.parametrize("count", [3, 10, 100, 600])
+def test_lttb_keeps_the_ends_under_the_cap(count):
+    rng = np.random.default_rng(count)
+    x = np.arange(2000, dtype=float)
+    y = np.cumsum(rng.normal(size=2000))
+    keep = lttb(x, y, count)
+    assert len(keep) == count
+    assert keep[0] == 0 and keep[-1] == 1999
+    assert keep == sorted(set(keep))
+
+
+def test_lttb_keeps_a_spike():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[517] = 50.0
+    assert 517 in lttb(x, y, 20)
+
+
+def test_plot_data_stays_under_the_cap():
+    series = OutcomeSeries()
+    outcomes = outcomes_with(5000, 3)
+    series.record_batch(outcomes)
+    data = series.plot_data(count=100)
+    for name in ("win", "loss", "draw", "score"):
+        x, y = data[name]
+        assert len(x) == len(y) <= 100
+        assert x[0] == series.points()[0, 0] and x[-1] == 5000
+    assert data["score"][1][-1] == series.score
+    # Fewer points than the cap are all kept
+    short = OutcomeSeries()
+    short.record_batch(outcomes[:50])
+    assert short.plot_data(count=100)["win"][0] == list(range(1, 51))
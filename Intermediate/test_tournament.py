@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+import engine
+import tournament
+from tournament import play_shard, run_tournament, shard_seed
+
+
+def test_shard_seeds_differ_per_matchup_and_block():
+    seeds = [shard_seed(0, a, b, block) for a in range(6) for b in range(a, 6) for block in range(4)]
+    assert len(set(seeds)) == len(seeds)
+    assert shard_seed(0, 1, 2, 3) == shard_seed(0, 1, 2, 3)
+    assert shard_seed(0, 1, 2, 3) != shard_seed(1, 1, 2, 3)
+    assert shard_seed(0, 1, 2, 3) != shard_seed(0, 2, 1, 3)
+
+
+def test_shards_replay_from_their_seed(monkeypatch):
+    monkeypatch.setattr(tournament, "_rules", engine.CLASSIC)
+    first = play_shard("Random", "Frequency", 2000, shard_seed(0, 0, 1, 0))
+    assert first == play_shard("Random", "Frequency", 2000, shard_seed(0, 0, 1, 0))
+    assert first != play_shard("Random", "Frequency", 2000, shard_seed(0, 0, 1, 1))
+    assert sum(first[2]) == 2000
+
+
+def test_small_tournament():
+    rules = engine.RULESETS["Lizard Spock"]
+    humans = {"Human: test": [0, 1, 2, 3, 4, 4]}
+    result = run_tournament(3000, humans, ["Random", "Frequency"], workers=2, shard_rounds=1000, rules=rules)
+    assert result["rules"] == rules.name
+    assert result["players"] == ["Random", "Frequency", "Human: test"]
+    # Random-Frequency, each strategy against the human, and each strategy against itself
+    assert result["total_rounds"] == 5 * 3000
+    win, draw = np.array(result["win_rate"], dtype=float), np.array(result["draw_rate"], dtype=float)
+    assert np.isnan(win[2, 2]) and np.isnan(draw[2, 2])  # humans do not play each other
+    # Off the diagonal the column player's wins are the row player's losses
+    played = ~np.isnan(win) & ~np.eye(3, dtype=bool)
+    assert np.allclose((win + draw + win.T)[played], 1.0, atol=1e-4)
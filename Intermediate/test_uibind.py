@@ -0,0 +1,124 @@
+import threading
+
+from headless import HeadlessDPG
+from uibind import UIBindings
+
+
+class CountingDPG(HeadlessDPG):
+    # Counts existence checks and can make one item fail to configure
+    def __init__(self, tags=(), failing=None):
+        super().__init__(tags)
+        self.exists_calls = 0
+        self.failing = failing
+        self.configured = []
+
+    def does_item_exist(self, tag):
+        self.exists_calls += 1
+        return super().does_item_exist(tag)
+
+    def configure_item(self, tag, **config):
+        if tag == self.failing:
+            raise RuntimeError("widget is gone")
+        super().configure_item(tag, **config)
+        self.configured.append((tag, config))
+
+
+def test_sets_are_coalesced_until_the_flush():
+    backend = CountingDPG(["score", "label"])
+    dirty = []
+    ui = UIBindings(on_dirty=lambda: dirty.append(1), backend=backend)
+    for n in range(100):
+        ui.set("score", default_value=str(n))
+    ui.set("score", color=(255, 0, 0))
+    ui.set("label", default_value="Total")
+    assert ui.dirty and len(dirty) == 2  # once per item that became dirty
+    assert backend.configured == []
+    assert ui.flush() == 2
+    assert backend.configured == [("score", {"default_value": "99", "color": (255, 0, 0)}),
+                                  ("label", {"default_value": "Total"})]
+    assert not ui.dirty and ui.flush() == 0
+
+
+def test_unchanged_values_are_dropped():
+    backend = CountingDPG(["score"])
+    ui = UIBindings(backend=backend)
+    ui.set("score", default_value="1", color=(1, 2, 3))
+    ui.flush()
+    ui.set("score", default_value="1")  # already shown: not even marked dirty
+    assert not ui.dirty
+    # Changed and changed back before the frame: nothing to push
+    ui.set("score", default_value="2")
+    ui.set("score", default_value="1")
+    assert ui.flush() == 0
+    # Only the keys that changed are pushed
+    ui.set("score", default_value="1", color=(4, 5, 6))
+    assert ui.flush() == 1
+    assert backend.configured[-1] == ("score", {"color": (4, 5, 6)})
+    assert len(backend.configured) == 2
+
+
+def test_existence_is_cached_until_invalidated():
+    backend = CountingDPG()
+    ui = UIBindings(backend=backend)
+    for n in range(3):
+        ui.set("later", default_value=str(n))
+        assert ui.flush() == 0  # the item does not exist yet
+    assert backend.exists_calls == 1
+    backend.add_item("later")
+    ui.set("later", default_value="x")
+    assert ui.flush() == 0  # still cached as missing
+    ui.invalidate()
+    ui.set("later", default_value="x")
+    assert ui.flush() == 1 and backend.get_value("later") == "x"
+    assert backend.exists_calls == 2
+
+
+def test_forget_pushes_again():
+    backend = CountingDPG(["a", "b"])
+    ui = UIBindings(backend=backend)
+    ui.set("a", default_value="1")
+    ui.set("b", default_value="1")
+    ui.flush()
+    # A rebuilt view shows defaults again, so the same values have to be pushed
+    ui.forget("a")
+    ui.set("a", default_value="1")
+    ui.set("b", default_value="1")
+    assert ui.flush() == 1
+    ui.forget()
+    ui.set("a", default_value="1")
+    ui.set("b", default_value="1")
+    assert ui.flush() == 2
+
+
+def test_a_failing_item_does_not_stop_the_others(capsys):
+    backend = CountingDPG(["bad", "good"], failing="bad")
+    ui = UIBindings(backend=backend)
+    ui.set("bad", default_value="1")
+    ui.set("good", default_value="1")
+    assert ui.flush() == 1
+    assert "Error configuring item bad" in capsys.readouterr().out
+    # The failed value was not recorded as shown, so it is tried again
+    backend.failing = None
+    ui.set("bad", default_value="1")
+    assert ui.flush() == 1 and backend.get_value("bad") == "1"
+
+
+# Callbacks set values on their own thread while the render loop flushes
+def test_sets_from_another_thread():
+    backend = CountingDPG(["counter"])
+    ui = UIBindings(backend=backend)
+    done = threading.Event()
+
+    def writer():
+        for n in range(20_000):
+            ui.set("counter", default_value=n)
+        done.set()
+    thread = threading.Thread(target=writer)
+    thread.start()
+    flushes = 0
+    while not done.is_set():
+        flushes += ui.flush()
+    thread.join()
+    flushes += ui.flush()
+    assert backend.get_value("counter") == 19_999
+    assert flushes == backend.configure_calls < 20_000
@@ -0,0 +1,47 @@
+import json
+import os
+import time
+
+# Startup timeline.
+# Records named marks from process start to the first rendered frame so the
+# time-to-first-frame budget can be measured on the target machines.
+
+
+# Function to find how long ago the process was started (Linux only, else 0)
+def process_age():
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        start_ticks = int(fields[19])  # field 22 of the stat line
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class StartupTimeline:
+    def __init__(self):
+        self._origin = time.perf_counter() - process_age()
+        self.marks = [("process start", 0.0)]
+        self.mark("interpreter ready")
+
+    def mark(self, label):
+        self.marks.append((label, (time.perf_counter() - self._origin) * 1000))
+
+    @property
+    def total_ms(self):
+        return self.marks[-1][1]
+
+    def report(self):
+        lines = []
+        previous = 0.0
+        for label, at in self.marks:
+            lines.append(f"{at:9.1f} ms  (+{at - previous:7.1f})  {label}")
+            previous = at
+        return "\n".join(lines)
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"marks": [{"label": label, "ms": round(at, 3)} for label, at in self.marks],
+                       "total_ms": round(self.total_ms, 3)}, f, indent=2)
@@ -0,0 +1,167 @@
+import numpy as np
+
+import engine
+
+# Round-by-round series for the statistics plots: rolling win, loss and draw
+# rates over the last `window` rounds, and the cumulative score (wins minus
+# losses). Each round updates the series in O(1).
+# Memory stays bounded however long the session runs. The latest rounds are
+# kept at full resolution in a ring buffer. The whole session is kept as a
+# coarse series with one point every `stride` rounds; when it fills up, every
+# other point is dropped and the stride doubles. Before plotting, the points
+# are downsampled with Largest-Triangle-Three-Buckets, which keeps the peaks
+# and dips a plain stride would skip.
+
+ROLLING_WINDOW = 100
+RECENT_POINTS = 2048
+COARSE_POINTS = 2048
+PLOT_POINTS = 600
+
+SERIES = ("win", "loss", "draw", "score")
+COLUMNS = ("round",) + SERIES
+
+
+# Function to pick the indices of up to `count` points that keep the shape of a line (LTTB)
+def lttb(x, y, count):
+    n = len(x)
+    if count >= n or count < 3:
+        return list(range(n))
+    every = (n - 2) / (count - 2)
+    xs, ys = x.tolist(), y.tolist()
+    selected = [0]
+    a = 0
+    for i in range(count - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        # Average of the next bucket (the last point for the final bucket)
+        next_hi = min(int((i + 2) * every) + 1, n)
+        if hi >= next_hi:
+            avg_x, avg_y = xs[-1], ys[-1]
+        else:
+            avg_x = sum(xs[hi:next_hi]) / (next_hi - hi)
+            avg_y = sum(ys[hi:next_hi]) / (next_hi - hi)
+        # Keep the point that makes the largest triangle with the last kept point and that average
+        xa, ya = xs[a], ys[a]
+        best, a = -1.0, lo
+        for j in range(lo, hi):
+            area = abs((xa - avg_x) * (ys[j] - ya) - (xa - xs[j]) * (avg_y - ya))
+            if area > best:
+                best, a = area, j
+        selected.append(a)
+    selected.append(n - 1)
+    return selected
+
+
+class OutcomeSeries:
+    def __init__(self, window=ROLLING_WINDOW, recent_points=RECENT_POINTS, coarse_points=COARSE_POINTS):
+        self.window = window
+        self.recent_points = recent_points
+        self.coarse_points = coarse_points
+        self.version = 0  # changes whenever the points change, so plots know when to redraw
+        self.reset()
+
+    def reset(self):
+        self.rounds = 0
+        self.score = 0
+        self._last = np.zeros(self.window, dtype=np.uint8)  # ring of the last `window` outcomes
+        self._counts = [0, 0, 0]  # outcomes in the window, indexed by engine.DRAW/WIN/LOSE
+        self._recent = np.zeros((self.recent_points, len(COLUMNS)))
+        self._coarse = np.zeros((self.coarse_points, len(COLUMNS)))
+        self._coarse_count = 0
+        self.stride = 1
+        self.version += 1
+
+    # Fold one round into the series
+    def record(self, outcome):
+        slot = self.rounds % self.window
+        if self.rounds >= self.window:
+            self._counts[self._last[slot]] -= 1
+        self._last[slot] = outcome
+        self._counts[outcome] += 1
+        self.rounds += 1
+        self.score += 1 if outcome == engine.WIN else -1 if outcome == engine.LOSE else 0
+
+        span = min(self.rounds, self.window)
+        point = (self.rounds, 100.0 * self._counts[engine.WIN] / span, 100.0 * self._counts[engine.LOSE] / span,
+                 100.0 * self._counts[engine.DRAW] / span, self.score)
+        self._recent[(self.rounds - 1) % self.recent_points] = point
+        if self.rounds % self.stride == 0:
+            if self._coarse_count == self.coarse_points:
+                self._halve()
+            if self.rounds % self.stride == 0:
+                self._coarse[self._coarse_count] = point
+                self._coarse_count += 1
+        self.version += 1
+
+    # Drop every other coarse point and double the stride
+    def _halve(self):
+        keep = self._coarse[:self._coarse_count]
+        keep = keep[keep[:, 0] % (2 * self.stride) == 0]
+        self._coarse[:keep.shape[0]] = keep
+        self._coarse_count = keep.shape[0]
+        self.stride *= 2
+
+    # Fold a whole array of rounds in at once (used when restoring or importing a session)
+    def record_batch(self, outcomes, chunk_rows=1 << 20):
+        outcomes = np.asarray(outcomes, dtype=np.uint8)
+        if outcomes.shape[0] == 0:
+            return
+        for start in range(0, outcomes.shape[0], chunk_rows):
+            self._record_chunk(outcomes[start:start + chunk_rows])
+        self.version += 1
+
+    def _record_chunk(self, outcomes):
+        count = outcomes.shape[0]
+        # Prepend the outcomes still in the window so the rolling counts can be differenced
+        carried = min(self.rounds, self.window)
+        order = (np.arange(self.rounds - carried, self.rounds)) % self.window
+        joined = np.concatenate((self._last[order], outcomes))
+        ones = np.zeros((joined.shape[0] + 1, 3), dtype=np.int64)
+        ones[np.arange(1, joined.shape[0] + 1), joined] = 1
+        cumulative = np.cumsum(ones, axis=0)
+        ends = np.arange(carried + 1, carried + count + 1)
+        starts = np.maximum(ends - self.window, 0)
+        window_counts = cumulative[ends] - cumulative[starts]
+        rounds = np.arange(self.rounds + 1, self.rounds + count + 1)
+        span = np.minimum(rounds, self.window)
+        score = self.score + np.cumsum((outcomes == engine.WIN).astype(np.int64) - (outcomes == engine.LOSE))
+        points = np.column_stack((rounds, 100.0 * window_counts[:, engine.WIN] / span,
+                                  100.0 * window_counts[:, engine.LOSE] / span,
+                                  100.0 * window_counts[:, engine.DRAW] / span, score))
+
+        # Window ring, counters and the full-resolution tail
+        kept = outcomes[-self.window:]
+        self._last[np.arange(self.rounds + count - kept.shape[0], self.rounds + count) % self.window] = kept
+        self._counts = window_counts[-1].tolist()
+        tail = points[-self.recent_points:]
+        self._recent[(tail[:, 0].astype(np.int64) - 1) % self.recent_points] = tail
+        self.rounds += count
+        self.score = int(score[-1])
+
+        # Coarse points at multiples of the stride, halving until they fit
+        while True:
+            picked = points[points[:, 0] % self.stride == 0]
+            if self._coarse_count + picked.shape[0] <= self.coarse_points:
+                break
+            self._halve()
+        self._coarse[self._coarse_count:self._coarse_count + picked.shape[0]] = picked
+        self._coarse_count += picked.shape[0]
+
+    # Every kept point in round order: coarse points up to the recent tail, then the tail
+    def points(self):
+        held = min(self.rounds, self.recent_points)
+        if held == 0:
+            return np.zeros((0, len(COLUMNS)))
+        first = self.rounds - held + 1
+        order = (np.arange(first, self.rounds + 1) - 1) % self.recent_points
+        coarse = self._coarse[:self._coarse_count]
+        return np.concatenate((coarse[coarse[:, 0] < first], self._recent[order]))
+
+    # Plot data per series: {name: (x list, y list)} with at most `count` points each
+    def plot_data(self, count=PLOT_POINTS):
+        points = self.points()
+        x = points[:, 0]
+        data = {}
+        for column, name in enumerate(SERIES, start=1):
+            keep = lttb(x, points[:, column], count)
+            data[name] = (x[keep].tolist(), points[keep, column].tolist())
+        return data
@@ -0,0 +1,220 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import engine
+from opponents import STRATEGIES
+from roundlog import load_history
+
+# Headless strategy tournament.
+# Every strategy plays every other one (and recorded human move sequences)
+# for many rounds. Work is split into shards of one matchup and one seed
+# block each and spread over a process pool. Workers send back only their
+# draw/win/loss counts, which are merged into win-rate matrices as they arrive.
+# Rounds are resolved with the rule set's resolve, the same rule determine_winner uses.
+
+SHARD_ROUNDS = 50_000
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tournament_results.json")
+
+_humans = {}  # name -> recorded player moves, set in each worker
+_rules = engine.CLASSIC  # rule set being played, set in each worker
+
+
+class HumanSequence:
+    # Replays a recorded player move sequence, cycling when it runs out
+    def __init__(self, name, moves, offset=0):
+        self.name = name
+        self.moves = moves
+        self.position = offset % len(moves)
+
+    def choose(self):
+        move = self.moves[self.position]
+        self.position += 1
+        if self.position == len(self.moves):
+            self.position = 0
+        return move
+
+    def observe(self, player, computer):
+        pass
+
+
+def _init_worker(humans, rules_name):
+    global _rules
+    _humans.update(humans)
+    _rules = engine.RULESETS[rules_name]
+
+
+# Function to create a player for a shard (a strategy or a recorded human)
+def make_player(name, seed):
+    if name in _humans:
+        return HumanSequence(name, _humans[name], offset=seed)
+    return STRATEGIES[name](random.Random(seed), _rules)
+
+
+# Function to play one shard and return [draws, a wins, b wins]
+def play_shard(a_name, b_name, rounds, seed):
+    a = make_player(a_name, seed * 2 + 1)
+    b = make_player(b_name, seed * 2 + 2)
+    counts = [0, 0, 0]
+    resolve = _rules.resolve
+    for _ in range(rounds):
+        a_move = a.choose()
+        b_move = b.choose()
+        counts[resolve(a_move, b_move)] += 1
+        # Each side sees the other as "the player" it is trying to predict
+        a.observe(b_move, a_move)
+        b.observe(a_move, b_move)
+    return a_name, b_name, counts
+
+
+# Function to read the player moves from recorded session logs of the same game
+def load_human_sequences(paths, rules=engine.CLASSIC):
+    humans = {}
+    for path in paths:
+        history = load_history(path)
+        if history.rules is not rules:
+            print(f"Skipping {path}: it is a {history.rules.name} game, not {rules.name}")
+            continue
+        moves = history.players().tolist()
+        if moves:
+            humans[f"Human: {os.path.basename(path)}"] = moves
+    return humans
+
+
+# Function to derive a shard's seed from the run seed, the matchup and the seed block, so that
+# no two shards (of one matchup or of different ones) replay the same random streams
+def shard_seed(seed, a_index, b_index, block):
+    return int(np.random.SeedSequence([seed, a_index, b_index, block]).generate_state(1)[0])
+
+
+def run_tournament(rounds=200_000, humans=None, strategies=None, workers=None,
+                   shard_rounds=SHARD_ROUNDS, seed=0, on_progress=None, rules=engine.CLASSIC):
+    humans = humans or {}
+    strategies = list(strategies or STRATEGIES)
+    players = strategies + list(humans)
+    index = {name: i for i, name in enumerate(players)}
+
+    # Humans do not react to their opponent, so they only play the strategies
+    matchups = [(a, b) for i, a in enumerate(players) for b in players[i:]
+                if not (a in humans and b in humans)]
+    shards = []
+    for a, b in matchups:
+        for block, start in enumerate(range(0, rounds, shard_rounds)):
+            shards.append((a, b, min(shard_rounds, rounds - start), shard_seed(seed, index[a], index[b], block)))
+
+    counts = np.zeros((len(players), len(players), 3), dtype=np.int64)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(humans, rules.name)) as pool:
+        futures = [pool.submit(play_shard, *shard) for shard in shards]
+        for done, future in enumerate(as_completed(futures), 1):
+            a, b, (draws, a_wins, b_wins) = future.result()
+            i, j = index[a], index[b]
+            counts[i, j] += (draws, a_wins, b_wins)
+            if i != j:
+                counts[j, i] += (draws, b_wins, a_wins)
+            if on_progress is not None:
+                on_progress(done, len(shards))
+    elapsed = time.perf_counter() - started
+
+    totals = counts.sum(axis=2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        win_rate = np.where(totals > 0, counts[:, :, engine.WIN] / totals, np.nan)
+        draw_rate = np.where(totals > 0, counts[:, :, engine.DRAW] / totals, np.nan)
+    total_rounds = int(sum(shard[2] for shard in shards))
+    return {
+        "rules": rules.name,
+        "players": players,
+        "rounds_per_matchup": rounds,
+        "win_rate": [[None if np.isnan(v) else round(float(v), 5) for v in row] for row in win_rate],
+        "draw_rate": [[None if np.isnan(v) else round(float(v), 5) for v in row] for row in draw_rate],
+        "total_rounds": total_rounds,
+        "elapsed": round(elapsed, 3),
+        "rounds_per_sec": round(total_rounds / elapsed) if elapsed > 0 else 0,
+        "workers": workers or os.cpu_count(),
+    }
+
+
+# Function to print a result as a win-rate matrix (row player vs column player)
+def print_matrix(result):
+    players = result["players"]
+    width = max(len(name) for name in players)
+    print(" " * width + "".join(f"{i:>8}" for i in range(len(players))))
+    for i, name in enumerate(players):
+        cells = "".join("       -" if v is None else f"{v * 100:7.1f}%" for v in result["win_rate"][i])
+        print(f"{name:<{width}}{cells}   ({i})")
+    print(f"{result['total_rounds']:,} rounds in {result['elapsed']:.1f}s "
+          f"({result['rounds_per_sec']:,} rounds/s on {result['workers']} workers)")
+
+
+# Function to load a results file written by main()
+def load_results(path=RESULTS_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+
+class TournamentProcess:
+    # Runs the tournament in a separate interpreter so the GUI process never forks
+    def __init__(self, rounds, human_logs=(), out=RESULTS_FILE, rules=engine.CLASSIC):
+        self.out = out
+        self.progress = "starting"
+        command = [sys.executable, os.path.abspath(__file__), "--rounds", str(rounds), "--out", out,
+                   "--rules", rules.name]
+        for path in human_logs:
+            command += ["--human", path]
+        self._process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        self._reader = threading.Thread(target=self._read_output, daemon=True)
+        self._reader.start()
+
+    def _read_output(self):
+        for line in self._process.stdout:
+            if line.startswith("progress "):
+                self.progress = line.split()[1]
+        self._process.stdout.close()
+
+    @property
+    def done(self):
+        return self._process.poll() is not None
+
+    @property
+    def failed(self):
+        return self.done and self._process.returncode != 0
+
+    def cancel(self):
+        self._process.terminate()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play every opponent strategy against every other.")
+    parser.add_argument("--rounds", type=int, default=200_000, help="rounds per matchup")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--shard-rounds", type=int, default=SHARD_ROUNDS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--human", action="append", default=[], help="round log (.rpslog) of a human player")
+    parser.add_argument("--out", default=RESULTS_FILE, help="where to write the JSON results")
+    parser.add_argument("--rules", default=engine.CLASSIC.name, choices=list(engine.RULESETS),
+                        help="game variant to play")
+    args = parser.parse_args(argv)
+    rules = engine.RULESETS[args.rules]
+
+    def progress(done, total):
+        print(f"progress {done}/{total}", flush=True)
+
+    result = run_tournament(args.rounds, load_human_sequences(args.human, rules), workers=args.workers,
+                            shard_rounds=args.shard_rounds, seed=args.seed, on_progress=progress,
+                            rules=rules)
+    print_matrix(result)
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,78 @@
+import threading
+
+import dearpygui.dearpygui as dpg
+
+# Dirty-flag UI bindings.
+# Game code calls set() as often as it likes; values are only remembered and
+# the item is marked dirty. flush() runs once per frame, just before
+# render_dearpygui_frame, and pushes each changed item once. Values equal to
+# what the widget already shows are dropped, and item existence is cached.
+# The widget calls go to Dear PyGui unless another backend with the same
+# does_item_exist/configure_item calls is given (see headless.py).
+
+
+class UIBindings:
+    def __init__(self, on_dirty=None, backend=dpg):
+        self.on_dirty = on_dirty  # called whenever a new item becomes dirty
+        self.backend = backend
+        self._pending = {}
+        self._shown = {}
+        self._exists = {}
+        # Dear PyGui runs callbacks on their own thread, so set() and flush() can overlap
+        self._lock = threading.Lock()
+
+    def set(self, tag, **kwargs):
+        with self._lock:
+            pending = self._pending.get(tag)
+            if pending is not None:
+                pending.update(kwargs)
+                return
+            shown = self._shown.get(tag)
+            if shown is not None and all(shown.get(k) == v for k, v in kwargs.items()):
+                return
+            self._pending[tag] = dict(kwargs)
+        if self.on_dirty is not None:
+            self.on_dirty()
+
+    # Forget cached existence checks (call after items are created or deleted)
+    def invalidate(self):
+        with self._lock:
+            self._exists.clear()
+
+    # Forget what every widget shows so the next set() always pushes (e.g. after a view is rebuilt)
+    def forget(self, tag=None):
+        with self._lock:
+            if tag is None:
+                self._shown.clear()
+            else:
+                self._shown.pop(tag, None)
+
+    @property
+    def dirty(self):
+        return bool(self._pending)
+
+    # Push all changed values to their widgets; returns how many items were updated
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+
+            updated = 0
+            for tag, kwargs in pending.items():
+                exists = self._exists.get(tag)
+                if exists is None:
+                    exists = self._exists[tag] = self.backend.does_item_exist(tag)
+                if not exists:
+                    continue
+                shown = self._shown.setdefault(tag, {})
+                changed = {k: v for k, v in kwargs.items() if shown.get(k) != v}
+                if not changed:
+                    continue
+                try:
+                    self.backend.configure_item(tag, **changed)
+                    shown.update(changed)
+                    updated += 1
+                except Exception as e:
+                    print(f"Error configuring item {tag}: {e}")
+            return updated